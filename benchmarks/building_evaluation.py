@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: array evaluation of buildings against the per-building loop.
+
+Uses Open_eQuarter's building_evaluation if it is installed, otherwise a
+stand-in with the same signature that branches on the year of construction
+like the statistical tables do.
+
+Usage: python benchmarks/building_evaluation.py [n1 n2 ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.buildings import evaluation
+from reegis_hp.buildings.bulk import building_length
+
+
+def stand_in(population_density, area, perimeter=None, length=None,
+             floors=3, year_of_construction=1970):
+    if year_of_construction < 1950:
+        u_wall = 1.4
+    elif year_of_construction < 1980:
+        u_wall = 1.0
+    else:
+        u_wall = 0.4
+    height = floors * 3.3
+    wall = perimeter * height
+    roof = area
+    living_area = area * floors * 0.8
+    hlp = (wall * u_wall + roof * 0.6 + area * 0.5) * 3.5 * 24 / 1000
+    return {'wall_area': wall, 'roof_area': roof, 'living_area': living_area,
+            'heat_demand': hlp,
+            'density_factor': np.log(population_density)}
+
+
+def synthetic_buildings(n, seed=0):
+    rnd = np.random.RandomState(seed)
+    df = pd.DataFrame({
+        'population_density': rnd.randint(20, 200, n),
+        'area': rnd.uniform(50, 800, n),
+        'floors': rnd.randint(1, 8, n),
+        'year_of_construction': rnd.choice(
+            [1900, 1930, 1950, 1960, 1970, 1980, 1995, 2004, 2010], n)})
+    df['perimeter'] = 4.4 * np.sqrt(df['area'])
+    df['length'] = building_length(df['area'], df['perimeter'])
+    return df
+
+
+def main(sizes):
+    try:
+        evaluator = evaluation.default_evaluator()
+    except ImportError:
+        evaluator = stand_in
+    print('{0:>8} {1:>10} {2:>10} {3:>8}'.format(
+        'n', 'loop [s]', 'array [s]', 'speedup'))
+    for n in sizes:
+        df = synthetic_buildings(n)
+        start = time.perf_counter()
+        evaluation._call_rows(evaluator, df, list(evaluation.COLUMNS))
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        evaluation.evaluate_buildings(df, evaluator)
+        array = time.perf_counter() - start
+        print('{0:>8} {1:>10.3f} {2:>10.3f} {3:>8.1f}'.format(
+            n, loop, array, loop / array))
+    evaluation.compare_with_scalar(synthetic_buildings(1000), evaluator)
+    print('Array results match the scalar function.')
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: bulk against per-region queries on a SQLite stand-in database.
+
+Creates a stand-in database with a grid of square regions (nuts table, WKT
+polygons), power plants and energymap plants (lon/lat columns) and wind
+zones, adds a fixed latency to every query and fetches the polygons, power
+plants and energymap plants once per region and once in bulk.
+
+Usage: python benchmarks/data_access.py [regions] [latency in ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import data_access
+
+STANDIN = {
+    'nuts': {'table': 'nuts', 'geom': 'geom'},
+    'bnetza': {'table': 'bnetza', 'x': 'lon', 'y': 'lat'},
+    'energymap': {'table': 'energymap', 'x': 'lon', 'y': 'lat'},
+    'windzone': {'table': 'windzones', 'geom': 'geom'}}
+
+
+def box(x, y, size=1.0):
+    return 'POLYGON(({0} {1}, {2} {1}, {2} {3}, {0} {3}, {0} {1}))'.format(
+        x, y, x + size, y + size)
+
+
+def standin(filename, n_regions, plants_per_region=50, seed=0):
+    import sqlite3
+    rnd = np.random.RandomState(seed)
+    side = int(np.ceil(np.sqrt(n_regions)))
+    ids = ['R{0:04d}'.format(i) for i in range(n_regions)]
+    nuts = pd.DataFrame({'nuts_id': ids, 'geom': [
+        box(i % side, i // side) for i in range(n_regions)]})
+    n = n_regions * plants_per_region
+    bnetza = pd.DataFrame({
+        'auswertung': rnd.choice(['Braunkohle', 'Steinkohle', 'Erdgas'], n),
+        'ersatzbrennstoff': None,
+        'el_nennleistung': rnd.uniform(10, 500, n),
+        'lon': rnd.uniform(0, side, n), 'lat': rnd.uniform(0, side, n)})
+    energymap = pd.DataFrame({
+        'anlagentyp': rnd.choice(['Solarstrom', 'Windkraft'], n * 4),
+        'anuntertyp': None,
+        'p_nenn_kwp': rnd.uniform(0.01, 5, n * 4),
+        'lon': rnd.uniform(0, side, n * 4),
+        'lat': rnd.uniform(0, side, n * 4)})
+    zones = pd.DataFrame({'zone': [1, 2], 'geom': [
+        box(0, 0, side), box(side, 0, side)]})
+    with sqlite3.connect(filename) as conn:
+        nuts.to_sql('nuts', conn, index=False)
+        bnetza.to_sql('bnetza', conn, index=False)
+        energymap.to_sql('energymap', conn, index=False)
+        zones.to_sql('windzones', conn, index=False)
+    return ids
+
+
+def access(filename, latency):
+    from sqlalchemy import event
+    dal = data_access.DataAccess('sqlite:///' + filename, tables=STANDIN)
+
+    @event.listens_for(dal.engine, 'before_cursor_execute')
+    def round_trip(*args):
+        time.sleep(latency)
+
+    return dal
+
+
+def main(n_regions=200, latency_ms=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'standin.db')
+        ids = standin(filename, n_regions)
+        latency = latency_ms / 1000
+
+        dal = access(filename, latency)
+        start = time.time()
+        single = {}
+        for i in ids:
+            geom = dal.polygons([i])
+            single[i] = (dal.power_plants(geom)[i],
+                         dal.tagged_points('energymap', geom))
+        t_single = time.time() - start
+        print('Per region: {0} queries in {1:.2f} s.'.format(
+            dal.queries, t_single))
+
+        dal = access(filename, latency)
+        start = time.time()
+        geoms = dal.polygons(ids)
+        pps = dal.power_plants(geoms)
+        res = data_access.split(dal.tagged_points('energymap', geoms),
+                                names=geoms)
+        t_bulk = time.time() - start
+        print('Bulk: {0} queries in {1:.2f} s ({2:.0f}x faster).'.format(
+            dal.queries, t_bulk, t_single / t_bulk))
+
+        same = all(
+            np.allclose(np.sort(single[i][0]['cap']), np.sort(pps[i]['cap']))
+            and np.isclose(single[i][1]['cap'].sum(), res[i]['cap'].sum())
+            for i in ids)
+        print('Same plants per region: {0}'.format(same))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
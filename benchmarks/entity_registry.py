@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: model construction time against the number of entities.
+
+Mimics the bus look-ups of ``create_entity_objects`` in
+berlin_brdbg_example_opt.py (three look-ups per power plant) with a plain
+list scan and with the :class:`EntityIndex`. Needs neither oemof nor a
+database.
+
+Usage: python benchmarks/entity_registry.py [n1 n2 ...]
+"""
+import sys
+import time
+
+from reegis_hp.tools.entity_registry import EntityIndex
+
+FUELS = ['lignite', 'hard_coal', 'natural_gas', 'mineral_oil', 'biomass']
+
+
+class Region:
+    def __init__(self, name):
+        self.name = name
+
+
+class Entity:
+    def __init__(self, uid, type=None, regions=()):
+        self.uid = uid
+        self.type = type
+        self.regions = list(regions)
+
+
+def build(entities, n_plants, n_regions, scan):
+    regions = [Region('region_{0}'.format(r)) for r in range(n_regions)]
+    for region in regions:
+        entities.append(Entity(('bus', region.name, 'elec'), 'elec',
+                               [region]))
+    for p in range(n_plants):
+        region = regions[p % n_regions]
+        fuel = FUELS[p % len(FUELS)]
+        uid = ('bus', region.name, fuel)
+        if scan:
+            exists = len([e for e in entities if e.uid == uid]) > 0
+        else:
+            exists = entities.has(uid)
+        if not exists:
+            entities.append(Entity(uid, fuel, [region]))
+        if scan:
+            inputs = [e for e in entities if e.uid == uid]
+            outputs = [e for e in entities
+                       if e.uid == ('bus', region.name, 'elec')]
+        else:
+            inputs = entities.lookup(uid)
+            outputs = entities.lookup(('bus', region.name, 'elec'))
+        assert inputs and outputs
+        entities.append(Entity(('transformer', region.name, fuel, p), None,
+                               [region]))
+    orphans = [e for e in entities if e.type == 'elec'][:1]
+    if scan:
+        for e in orphans:
+            entities.remove(e)
+    else:
+        entities.remove_many(orphans)
+
+
+def main(sizes):
+    print('{0:>8} {1:>10} {2:>12} {3:>12} {4:>8}'.format(
+        'plants', 'entities', 'scan [s]', 'index [s]', 'speedup'))
+    for n in sizes:
+        n_regions = max(2, n // 100)
+        timings = []
+        for scan, container in ((True, []), (False, EntityIndex())):
+            start = time.perf_counter()
+            build(container, n, n_regions, scan)
+            timings.append(time.perf_counter() - start)
+        print('{0:>8} {1:>10} {2:>12.4f} {3:>12.4f} {4:>8.1f}'.format(
+            n, len(container), timings[0], timings[1],
+            timings[0] / max(timings[1], 1e-9)))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [100, 500, 1000, 2000, 4000])
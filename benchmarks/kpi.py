@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: key figures of many scenario results stores.
+
+Writes synthetic results stores (per region an elec bus with fixed sources,
+transformers per fuel, storage, transport and demand, and one global bus
+per fuel) and summarises all of them with kpi.summaries.
+
+Usage: python benchmarks/kpi.py [scenarios] [regions] [workers]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import kpi
+from reegis_hp.tools import results_store
+
+FUELS = {'lignite': 0.4, 'hard_coal': 0.33, 'natural_gas': 0.2}
+SOURCES = ['pv_pwr', 'wind_pwr']
+
+
+def synthetic_store(path, n_regions, seed=0):
+    rnd = np.random.RandomState(seed)
+    time_idx = pd.date_range('1/1/2010', periods=8760,
+                             freq=pd.offsets.Hour())
+    n = len(time_idx)
+    rows, series, regions = [], [], []
+
+    def add(bus, bus_type, direction, uid, values, **meta):
+        rows.append(dict(meta, bus_uid=str(bus), bus_type=bus_type,
+                         type=direction, obj_uid=str(uid)))
+        series.append(values)
+
+    fuel_use = {f: [] for f in FUELS}
+    for r in range(n_regions):
+        name = 'region_{0}'.format(r)
+        bus = ('bus', name, 'elec')
+        regions.append({'name': name, 'buses': [str(bus)]})
+        for stype in SOURCES:
+            val = rnd.uniform(0, 1, n)
+            cap = rnd.uniform(10, 100)
+            used = val * cap * rnd.uniform(0.8, 1)
+            uid = ('FixedSrc', name, stype)
+            add(bus, 'elec', 'input', uid, used, out_max=cap)
+            add(bus, 'elec', 'potential', uid, val * cap)
+        for fuel, share in FUELS.items():
+            cap = rnd.uniform(50, 500)
+            out = rnd.uniform(0, 1, n) * cap
+            uid = ('transformer', name, fuel)
+            add(bus, 'elec', 'input', uid, out, out_max=cap)
+            fuel_use[fuel].append((uid, out / 0.4))
+        for uid in (('sto_simple', name, 'elec'),
+                    ('transport', 'bus', name, 'elec', 'bus', 'x', 'elec')):
+            add(bus, 'elec', 'input', uid, rnd.uniform(0, 10, n))
+        add(bus, 'elec', 'output', ('sink', name, 'elec'),
+            rnd.uniform(0, 500, n))
+    for fuel, flows in fuel_use.items():
+        bus = ('bus', 'global', fuel)
+        for uid, values in flows:
+            add(bus, fuel, 'output', uid, values)
+
+    order = {'input': 0, 'output': 1, 'potential': 3}
+    arranged = sorted(zip(rows, series),
+                      key=lambda f: (f[0]['bus_uid'], order[f[0]['type']]))
+    blocks = {}
+    for row, (meta, values) in enumerate(arranged):
+        block = blocks.setdefault(meta['bus_uid'], {}).setdefault(
+            meta['type'], [row, row])
+        block[1] = row + 1
+    results_store.write_arrays(path, [a[0] for a in arranged],
+                               [a[1] for a in arranged], blocks, time_idx,
+                               regions)
+    return path
+
+
+def main(n_scenarios=200, n_regions=10, workers=1):
+    params = kpi.parameters(
+        co2_emissions={f: 0.3 for f in FUELS},
+        opex_var=dict({f: 22 for f in FUELS}, pv_pwr=1, wind_pwr=1),
+        price={f: 60 for f in FUELS})
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.time()
+        paths = {'s{0}'.format(s): synthetic_store(
+            '{0}/s{1}'.format(tmp, s), n_regions, seed=s)
+            for s in range(n_scenarios)}
+        print('Wrote {0} stores with {1} regions in {2:.1f} s.'.format(
+            n_scenarios, n_regions, time.time() - start))
+        start = time.time()
+        table = kpi.summaries(paths, params, workers=workers)
+        print('Summarised {0} stores ({1} rows) in {2:.2f} s.'.format(
+            n_scenarios, len(table), time.time() - start))
+        print(table.groupby(level=['scenario', 'component']).sum()[
+            ['energy', 'emissions', 'costs', 'curtailment']].head(8))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
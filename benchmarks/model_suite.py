@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for model build, LP generation, solve and storage.
+
+Every size runs in a fresh process so that the peak memory (max RSS) of
+one size is not inherited by the next. The records are written as json,
+one object per size. With --baseline the run is compared to an earlier
+json file and phases that got slower than --threshold are reported.
+
+Usage:
+    python benchmarks/model_suite.py -o bench.json
+    python benchmarks/model_suite.py --sizes 2x5x168 8x10x8760 \
+        --solver glpk --baseline old.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = ['1x2x24', '2x5x168', '4x10x168', '4x10x720', '8x20x720']
+
+
+def parse_size(size):
+    """'regions x plants x timesteps' -> dict."""
+    regions, plants, timesteps = (int(v) for v in size.split('x'))
+    return {'regions': regions, 'plants': plants, 'timesteps': timesteps}
+
+
+def peak_memory_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+def run_size(args):
+    size, solver, components = args
+    import pyomo.environ as po
+    from oemof.solph.optimization_model import OptimizationModel
+    from reegis_hp.tools import results_query
+    from reegis_hp.tools import results_store
+    from reegis_hp.tools import synthetic
+
+    record = dict(parse_size(size), solver=solver)
+    timer = time.perf_counter
+
+    start = timer()
+    es = synthetic.create_energy_system(
+        record['regions'], record['plants'], record['timesteps'],
+        solver=solver, **components)
+    record['build'] = timer() - start
+    record['entities'] = len(es.entities)
+
+    start = timer()
+    om = OptimizationModel(energysystem=es)
+    record['model'] = timer() - start
+
+    workdir = tempfile.mkdtemp()
+    start = timer()
+    om.write(os.path.join(workdir, 'problem.lp'))
+    record['lp_write'] = timer() - start
+    record['variables'] = sum(
+        1 for _ in om.component_data_objects(po.Var, active=True))
+    record['constraints'] = sum(
+        1 for _ in om.component_data_objects(po.Constraint, active=True))
+
+    start = timer()
+    es.optimize(om=om)
+    record['solve'] = timer() - start
+    record['objective'] = es.results.objective
+
+    start = timer()
+    es.dump(dpath=workdir, filename='es_dump.oemof')
+    record['dump'] = timer() - start
+    start = timer()
+    es.restore(dpath=workdir, filename='es_dump.oemof')
+    record['restore'] = timer() - start
+
+    store_path = os.path.join(workdir, 'store')
+    start = timer()
+    results_store.write(es, store_path)
+    record['store_write'] = timer() - start
+    start = timer()
+    results = results_query.FlowResults(
+        results_store.ResultsStore(store_path))
+    results.select(bus=('bus', 'region_0', 'elec'), direction='input')
+    record['store_read'] = timer() - start
+
+    record['peak_memory_mb'] = peak_memory_mb()
+    return record
+
+
+PHASES = ['build', 'model', 'lp_write', 'solve', 'dump', 'restore',
+          'store_write', 'store_read', 'peak_memory_mb']
+
+
+def compare(records, baseline, threshold):
+    """Return (size, phase, old, new) of all phases slower than threshold."""
+    old = {(b['regions'], b['plants'], b['timesteps']): b for b in baseline}
+    regressions = []
+    for r in records:
+        b = old.get((r['regions'], r['plants'], r['timesteps']))
+        if b is None:
+            continue
+        for phase in PHASES:
+            if b.get(phase) and r[phase] > b[phase] * (1 + threshold):
+                regressions.append(('{regions}x{plants}x{timesteps}'.format(
+                    **r), phase, b[phase], r[phase]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='regions x plants x timesteps, e.g. 2x5x168')
+    parser.add_argument('--solver', default='cbc')
+    parser.add_argument('--no-storage', action='store_true')
+    parser.add_argument('--no-heat', action='store_true')
+    parser.add_argument('-o', '--output', default='bench_output.json')
+    parser.add_argument('--baseline', help='json file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slow down, 0.2 means 20 %%')
+    args = parser.parse_args()
+    components = {'storage': not args.no_storage, 'heat': not args.no_heat,
+                  'chp': not args.no_heat}
+
+    records = []
+    for size in args.sizes:
+        # One process per size, the pool is only used to get a fresh one.
+        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+            record = pool.map(run_size, [(size, args.solver, components)])[0]
+        records.append(record)
+        print(json.dumps(record))
+    with open(args.output, 'w') as f:
+        json.dump(records, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(records, json.load(f), args.threshold)
+        for size, phase, old, new in regressions:
+            print('Regression {0} {1}: {2:.3g} -> {3:.3g}'.format(
+                size, phase, old, new))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
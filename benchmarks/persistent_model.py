@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cold rebuild against an incremental update of the model.
+
+For every size a synthetic system is solved, then the demand of the first
+region is scaled (series update) and the gas price is raised (cost update).
+The re-solve of the kept model is compared with optimize() from scratch.
+
+Usage: python benchmarks/persistent_model.py [--solver cbc] [timesteps ...]
+"""
+import argparse
+
+import numpy as np
+
+from reegis_hp.tools import persistent_model
+from reegis_hp.tools import synthetic
+
+
+def update_demand(model):
+    sink = str(('sink', 'region_0', 'elec'))
+    demand = np.asarray(model._entity(sink).val) * 1.1
+    model.set_series(sink, demand)
+
+
+def update_price(model):
+    commodity = str(('commodity', 'global', 'gas'))
+    model.set_cost(commodity, model._entity(commodity).opex_var * 1.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('timesteps', nargs='*', type=int,
+                        default=[168, 720, 2184])
+    parser.add_argument('--solver', default='cbc')
+    args = parser.parse_args()
+    print('{0:>9} {1:>8} {2:>9} {3:>13} {4:>12}'.format(
+        'timesteps', 'update', 'cold [s]', 'increm. [s]', 'rel. diff'))
+    for timesteps in args.timesteps:
+        for name, update in (('demand', update_demand),
+                             ('price', update_price)):
+            esystem = synthetic.create_energy_system(
+                n_regions=2, plants_per_region=5, timesteps=timesteps,
+                solver=args.solver)
+            r = persistent_model.compare(esystem, update, args.solver)
+            diff = abs(r['objective_cold'] - r['objective_incremental']) / (
+                abs(r['objective_cold']) or 1)
+            print('{0:>9} {1:>8} {2:>9.2f} {3:>13.2f} {4:>12.2e}'.format(
+                timesteps, name, r['cold'], r['incremental'], diff))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: figure time and file size against the length of the horizon.
+
+Writes a synthetic results store (one bus per region, five inputs and two
+outputs each) for every horizon and renders all region figures as pdf with
+and without downsampling.
+
+Usage: python benchmarks/plotting.py [years ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import plotting
+from reegis_hp.tools import results_store
+
+INPUTS = ['FixedSrc', 'transformer', 'sto_simple', 'transport', 'Commodity']
+OUTPUTS = ['sink', 'sto_simple']
+
+
+def synthetic_store(path, years, n_regions=4, seed=0):
+    rnd = np.random.RandomState(seed)
+    time_idx = pd.date_range('1/1/2010', periods=8760 * years, freq='h')
+    t = np.arange(len(time_idx))
+    rows, series, blocks, regions = [], [], {}, []
+    for r in range(n_regions):
+        name = 'region_{0}'.format(r)
+        bus = str(('bus', name, 'elec'))
+        regions.append({'name': name, 'buses': [bus]})
+        for direction, components in (('input', INPUTS),
+                                      ('output', OUTPUTS)):
+            blocks.setdefault(bus, {})[direction] = [
+                len(rows), len(rows) + len(components)]
+            for c in components:
+                rows.append({'bus_uid': bus, 'bus_type': 'elec',
+                             'type': direction,
+                             'obj_uid': str((c, name, 'elec'))})
+                series.append(np.abs(np.sin(t / 24 * np.pi) * 100 +
+                                     rnd.rand(len(t)) * 50))
+    results_store.write_arrays(path, rows, series, blocks, time_idx, regions)
+    return path
+
+
+def main(years):
+    workdir = tempfile.mkdtemp()
+    print('{0:>6} {1:>12} {2:>10} {3:>12} {4:>10}'.format(
+        'years', 'full [s]', 'full [MB]', 'reduced [s]', 'reduced [MB]'))
+    for y in years:
+        path = synthetic_store(os.path.join(workdir, str(y)), y)
+        line = [y]
+        for max_points in (None, 2000):
+            jobs = plotting.region_jobs(path, workdir, max_points=max_points)
+            start = time.perf_counter()
+            plotting.render_figures(jobs)
+            line.append(time.perf_counter() - start)
+            line.append(sum(os.path.getsize(j['filename'])
+                            for j in jobs) / 1e6)
+        print('{0:>6} {1:>12.2f} {2:>10.2f} {3:>12.2f} {4:>10.2f}'.format(
+            *line))
+
+
+if __name__ == '__main__':
+    main([int(y) for y in sys.argv[1:]] or [1, 3, 10])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: adjacency, build time and LP size against the number of regions.
+
+The regions are the cells of a square grid (every region has up to four
+neighbours with a common border, the cells that only share a corner are
+not connected). The STRtree adjacency is
+compared with testing all pairs. With oemof installed a synthetic energy
+system is built on the network and the LP file is written.
+
+Usage: python benchmarks/regions.py [n_regions ...]
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+import shapely
+
+from reegis_hp.tools import regions
+
+
+def grid(n):
+    side = int(n ** 0.5 + 0.999)
+    return {'region_{0}'.format(i): shapely.box(i % side, i // side,
+                                                i % side + 1, i // side + 1)
+            for i in range(n)}
+
+
+def all_pairs(geoms):
+    return sorted((a, b) if a < b else (b, a)
+                  for a, b in itertools.combinations(geoms, 2)
+                  if geoms[a].intersection(geoms[b]).length > 0)
+
+
+def build(links, n):
+    from oemof.solph.optimization_model import OptimizationModel
+    from reegis_hp.tools import synthetic
+
+    start = time.perf_counter()
+    es = synthetic.create_energy_system(n_regions=n, plants_per_region=3,
+                                        timesteps=24, links=links)
+    build_time = time.perf_counter() - start
+    om = OptimizationModel(energysystem=es)
+    path = os.path.join(tempfile.mkdtemp(), 'problem.lp')
+    om.write(path)
+    return build_time, os.path.getsize(path) / 1e6
+
+
+def main(sizes):
+    print('{0:>8} {1:>7} {2:>10} {3:>10} {4:>10} {5:>9}'.format(
+        'regions', 'links', 'tree [s]', 'pairs [s]', 'build [s]', 'LP [MB]'))
+    for n in sizes:
+        geoms = grid(n)
+        start = time.perf_counter()
+        pairs = regions.adjacency(geoms)
+        tree_time = time.perf_counter() - start
+        start = time.perf_counter()
+        assert all_pairs(geoms) == pairs
+        pairs_time = time.perf_counter() - start
+        try:
+            build_time, lp_size = build(regions.link_table(pairs), n)
+        except ImportError:
+            build_time = lp_size = float('nan')
+        print('{0:>8} {1:>7} {2:>10.3f} {3:>10.3f} {4:>10.2f} {5:>9.2f}'
+              .format(n, len(pairs), tree_time, pairs_time, build_time,
+                      lp_size))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [2, 50, 400])
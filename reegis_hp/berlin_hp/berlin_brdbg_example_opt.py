@@ -2,21 +2,31 @@
 # -*- coding: utf-8
 
 import logging
+import os
 import pandas as pd
-import numpy as np
 
-from oemof import db
-from oemof.db import tools
-from oemof.db import powerplants as db_pps
-from oemof.db import feedin_pg
 from oemof.tools import logger
 from oemof.core import energy_system as es
 from oemof.solph import predefined_objectives as predefined_objectives
+from oemof.solph.optimization_model import OptimizationModel
 from oemof.core.network.entities import Bus
 from oemof.core.network.entities.components import sources as source
 from oemof.core.network.entities.components import sinks as sink
 from oemof.core.network.entities.components import transformers as transformer
-from oemof.core.network.entities.components import transports as transport
+from reegis_hp.berlin_hp import region_data
+from reegis_hp.tools import cache
+from reegis_hp.tools import demand as demand_engine
+from reegis_hp.tools import entity_registry
+from reegis_hp.tools import instrumentation
+from reegis_hp.tools import kpi
+from reegis_hp.tools import powerplants
+from reegis_hp.tools import reduction as presolve
+from reegis_hp.tools import regions as network
+from reegis_hp.tools import results_query
+from reegis_hp.tools import results_store
+from reegis_hp.tools import solver
+from reegis_hp.tools import typical_periods as tsa
+from reegis_hp.tools import rolling_horizon
 import warnings
 warnings.simplefilter(action="ignore", category=RuntimeWarning)
 
@@ -58,6 +68,8 @@ define_elec_buildings = [
     {'annual_elec_demand': 2000,
      'selp_type': 'i0'}]
 
+# The model has no heat supply yet, so the heat demand is not computed. Pass
+# heat_buildings=define_heat_buildings to prepare_regions to add it.
 define_heat_buildings = [
     {'building_class': 11,
      'wind_class': 0,
@@ -146,15 +158,19 @@ resource_buses = {
 translator = lambda x: de_en[x]
 
 
-def get_demand():
-    'Dummy function until real function exists.'
-    demand_df = pd.DataFrame()
-    demand_df['elec'] = np.random.rand(8760) * 10 ** 11
-    return demand_df
+def entity_exists(esystem, uid):
+    return esystem.entities.has(uid)
 
 
-def entity_exists(esystem, uid):
-    return len([obj for obj in esystem.entities if obj.uid == uid]) > 0
+def create_fixed_source(esystem, region, feedin_df, cap, bustype):
+    'Create one FixedSource per feed-in type like feedin_pg does.'
+    for stype in feedin_df.keys():
+        source.FixedSource(
+            uid=('FixedSrc', region.name, stype),
+            outputs=esystem.entities.lookup(('bus', region.name, bustype)),
+            val=feedin_df[stype],
+            out_max=[cap[stype]],
+            regions=[region])
 
 
 def create_entity_objects(esystem, region, pp, tclass, bclass):
@@ -168,7 +184,6 @@ def create_entity_objects(esystem, region, pp, tclass, bclass):
             ('bus', 'global', pp[1].type)))
         location = 'global'
     else:
-        print()
         logging.debug('Creating Bus {0}.'.format(
             ('bus', region.name, pp[1].type)))
         bclass(uid=('bus', region.name, pp[1].type), type=pp[1].type,
@@ -176,137 +191,307 @@ def create_entity_objects(esystem, region, pp, tclass, bclass):
         location = region.name
         source.Commodity(
             uid='rgas',
-            outputs=[obj for obj in esystem.entities if obj.uid == (
-                'bus', location, pp[1].type)])
+            outputs=esystem.entities.lookup(('bus', location, pp[1].type)))
+
+    # Aggregated power plants carry their own efficiency (and class).
+    uid = ('transformer', region.name, pp[1].type)
+    if 'eta_class' in pp[1]:
+        uid += (pp[1].eta_class,)
 
     tclass(
-        uid=('transformer', region.name, pp[1].type),
-        inputs=[obj for obj in esystem.entities if obj.uid == (
-                'bus', location, pp[1].type)],
-        outputs=[obj for obj in region.entities if obj.uid == (
-                 'bus', region.name, 'elec')],
+        uid=uid,
+        inputs=esystem.entities.lookup(('bus', location, pp[1].type)),
+        outputs=esystem.entities.lookup(('bus', region.name, 'elec')),
         in_max=[None],
         out_max=[float(pp[1].cap)],
-        eta=[eta_elec[pp[1].type]],
+        eta=[float(pp[1].get('eta', eta_elec[pp[1].type]))],
         opex_var=opex_var[pp[1].type],
         regions=[region])
 
-logger.define_logging()
-year = 2010
-time_index = pd.date_range('1/1/{0}'.format(year), periods=8760, freq='H')
-overwrite = False
-overwrite = True
-conn = db.connection()
-
-# Create a simulation object
-simulation = es.Simulation(
-    timesteps=range(len(time_index)), verbose=True, solver='gurobi',
-    debug=True,
-    objective_options={'function': predefined_objectives.minimize_cost})
-
-# Create an energy system
-TwoRegExample = es.EnergySystem(time_idx=time_index, simulation=simulation)
-
-# Add regions to the energy system
-TwoRegExample.regions.append(es.Region(
-    geom=tools.get_polygon_from_nuts(conn, 'DE3'),
-    name='Berlin'))
-
-TwoRegExample.regions.append(es.Region(
-    geom=tools.get_polygon_from_nuts(conn, 'DE4'),
-    name='Brandenburg'))
-
-# Create global buses
-Bus(uid=('bus', 'global', 'coal'), type='coal', price=60, sum_out_limit=10e10,
-    excess=False)
-Bus(uid=('bus', 'global', 'lignite'), type='lignite', price=60,
-    sum_out_limit=10e10, excess=False)
-
-# Create entity objects for each region
-for region in TwoRegExample.regions:
-    logging.info('Processing region: {0} ({1})'.format(
-        region.name, region.code))
-
-    # Get demand time series and create buses. One bus for each demand series.
-    demand = get_demand()
-    for demandtype in demand.keys():
-        Bus(uid=('bus', region.name, demandtype), type=demandtype, price=60,
-            regions=[region], excess=False)
-        sink.Simple(
-            uid=('sink', region.name, demandtype),
-            inputs=[obj for obj in TwoRegExample.entities
-                    if obj.uid == ('bus', region.name, demandtype)],
-            val=demand[demandtype],
-            region=[region])
-
-    # Create source object
-    feedin_pg.Feedin().create_fixed_source(
-        conn, region=region, year=TwoRegExample.time_idx.year[0],
-        bustype='elec', **site)
-
-    # Get power plants from database and write them into a DataFrame
-    pps_df = db_pps.get_bnetza_pps(conn, region.geom)
-    print(pps_df)
-
-    # Add aditional power plants to the DataFrame
-    pps_df.loc[len(pps_df)] = 'natural_gas', np.nan, 10 ** 12
-
-    # TODO: Summerize power plants of the same type
-    for pwrp in pps_df.iterrows():
-        create_entity_objects(TwoRegExample, region, pwrp,
-                              tclass=transformer.Simple, bclass=Bus)
-
-    # create storage transformer object for storage
-#    transformer.Storage.optimization_options.update({'investment': True})
-    bel = [obj for obj in TwoRegExample.entities
-           if obj.uid == ('bus', region.name, demandtype)]
-    transformer.Storage(uid=('sto_simple', region.name, 'elec'),
-                        inputs=bel,
-                        outputs=bel,
-                        eta_in=1,
-                        eta_out=0.8,
-                        cap_loss=0.00,
-                        opex_fix=35,
-                        opex_var=0,
-                        capex=1000,
-                        cap_max=10 ** 12,
-                        cap_initial=0,
-                        c_rate_in=1/6,
-                        c_rate_out=1/6)
-
-# Connect the electrical bus of region StaDes und LanWit.
-bus1 = [obj for obj in TwoRegExample.entities if obj.uid == (
-    'bus', 'Berlin', 'elec')][0]
-bus2 = [obj for obj in TwoRegExample.entities if obj.uid == (
-    'bus', 'Brandenburg', 'elec')][0]
-TwoRegExample.connect(bus1, bus2, in_max=10 * 10 ** 12, out_max=0.9 * 10 ** 12,
-                      eta=0.9, transport_class=transport.Simple)
-
-#pv_lk_wtb = ([obj for obj in TwoRegExample.entities if obj.uid == (
-#    'FixedSrc', 'Landkreis Wittenberg', 'pv_pwr')][0])
-
-## Multiply PV with 25
-#pv_lk_wtb.val = pv_lk_wtb.val * 25
-
-# Remove orphan buses
-buses = [obj for obj in TwoRegExample.entities if isinstance(obj, Bus)]
-for bus in buses:
-    if len(bus.inputs) > 0 or len(bus.outputs) > 0:
-        logging.debug('Bus {0} has connections.'.format(bus.type))
-    else:
-        logging.debug('Bus {0} has no connections and will be deleted.'.format(
-            bus.type))
-        TwoRegExample.entities.remove(bus)
 
-TwoRegExample.simulation = es.Simulation(
-    solver='gurobi', timesteps=[t for t in range(8760)],
-    stream_solver_output=True, objective_options={
-        'function': predefined_objectives.minimize_cost})
-
-for entity in TwoRegExample.entities:
-    entity.uid = str(entity.uid)
-
-# Optimize the energy system
-TwoRegExample.optimize()
+year = 2010
 
-logging.info(TwoRegExample.dump())
+# Summarise power plants of the same type. Set eta_bins (e.g.
+# [0, 0.35, 0.42, 1]) to keep one transformer per efficiency class. To see
+# how far the objective moves, run once with aggregate_pps = False and set
+# reference_objective to the result.
+aggregate_pps = True
+eta_bins = None
+reference_objective = None
+
+# Solve on typical periods instead of the full year if n_typical_periods is
+# set (period_length: 24 for days, 168 for weeks). The flows are written to
+# results_file, frames of a full and a reduced run can be compared with
+# tsa.results_error().
+n_typical_periods = None
+period_length = 24
+results_file = None
+
+# Solve in overlapping windows (e.g. 168 hours plus 24 hours look-ahead) to
+# limit the memory to the window length.
+rolling_window = None
+rolling_overlap = 24
+
+# Regions (NUTS code, name), any number of them, e.g. all NUTS-3 regions.
+# The database inputs of all regions are fetched with one query per table
+# (region_data.prefetch_regions), the inputs are prepared in region_workers
+# processes (None: one per core).
+regions = [('DE3', 'Berlin'), ('DE4', 'Brandenburg')]
+region_workers = None
+
+# Neighbouring regions are connected by transports. Regions are neighbours
+# if their common border is at least min_border long (degrees), regions that
+# only share a corner are not connected (0 connects them as well). Capacity
+# and efficiency of single links are taken from transport_table, all other
+# links get the default values.
+min_border = network.MIN_BORDER
+transport_table = pd.DataFrame(
+    [('Berlin', 'Brandenburg', 10 * 10 ** 12, 0.9 * 10 ** 12, 0.9)],
+    columns=['region1', 'region2', 'in_max', 'out_max', 'eta'])
+transport_capacity = 10 ** 12
+transport_eta = 0.9
+
+# Database inputs are cached in cache_path. The connection is only opened if
+# an input is not in the cache. Use cache.DiskCache(cache_path).invalidate()
+# or .clear() if the database has changed.
+cache_path = cache.DEFAULT_PATH
+
+# The results are written to a memory-mapped store that is read by
+# berlin_brdbg_example_plot.py.
+results_path = os.path.join(results_store.DEFAULT_PATH, 'berlin_brdbg')
+
+# Key figures (energy, fuel, emissions, costs, full load hours, curtailment)
+# per region, component and fuel are written to kpi.csv in results_path.
+kpi_parameters = kpi.parameters(
+    co2_emissions=co2_emissions, price=price,
+    opex_var=dict(opex_var, pv_pwr=opex_var['solar_power'],
+                  wind_pwr=opex_var['wind_power']))
+
+# Reduce the topology before the optimisation: remove entities that cannot
+# reach a sink, merge parallel transformers and fold lossless pass-through
+# chains. The results are mapped back to the original entities.
+reduce_model = True
+
+# Solver backend: 'highs' and 'gurobi' get the model in memory, 'cbc' and
+# 'glpk' through an LP file. Set it to None to use the solver of the
+# simulation with the LP file of oemof.
+solver_backend = solver.Backend('highs', threads=None, time_limit=None,
+                                mip_gap=None)
+
+# Time the phases of the run and write them to report_file (json). Set
+# profile_phase (e.g. 'model build') to run one phase under cProfile, the
+# profile is written to the current directory (with or without a report).
+report_file = None
+profile_phase = None
+
+
+def optimize(regions=regions, year=year, region_workers=region_workers,
+             aggregate_pps=aggregate_pps, eta_bins=eta_bins,
+             reference_objective=reference_objective,
+             n_typical_periods=n_typical_periods, period_length=period_length,
+             results_file=results_file, rolling_window=rolling_window,
+             rolling_overlap=rolling_overlap, transport_table=transport_table,
+             transport_capacity=transport_capacity,
+             transport_eta=transport_eta, min_border=min_border,
+             cache_path=cache_path, results_path=results_path,
+             reduce_model=reduce_model,
+             solver_backend=solver_backend, report_file=report_file,
+             profile_phase=profile_phase):
+    r"""Build, optimise and store the model of the regions.
+
+    The parameters are the settings above, their module values are the
+    defaults. The results are written to the results store in
+    `results_path`.
+
+    Returns
+    -------
+    oemof.core.energy_system.EnergySystem
+    """
+    # 8784 hours in leap years, like the demand profiles.
+    time_index = demand_engine.time_index(year)
+    run = instrumentation.RunReport(
+        enabled=report_file is not None or profile_phase is not None,
+        profile=profile_phase)
+    run.info.update({'regions': regions, 'year': year,
+                     'aggregate_pps': aggregate_pps,
+                     'n_typical_periods': n_typical_periods,
+                     'rolling_window': rolling_window})
+
+    # Create a simulation object
+    simulation = es.Simulation(
+        timesteps=range(len(time_index)), verbose=True, solver='gurobi',
+        debug=True,
+        objective_options={'function': predefined_objectives.minimize_cost})
+
+    # Create an energy system
+    TwoRegExample = es.EnergySystem(time_idx=time_index, simulation=simulation)
+    entity_registry.index_entities(TwoRegExample)
+
+    # Fetch and compute the inputs of all regions in parallel
+    with run.phase('db fetch'):
+        region_inputs = region_data.prepare_regions(
+            regions, workers=region_workers, year=year,
+            site=dict(site, hoy=len(time_index)),
+            eta_default=eta_elec, aggregate_pps=aggregate_pps,
+            eta_bins=eta_bins, cache_path=cache_path,
+            elec_buildings=define_elec_buildings)
+
+    run.begin('entities')
+
+    # Add regions to the energy system
+    for data in region_inputs:
+        TwoRegExample.regions.append(es.Region(geom=data.geom, name=data.name))
+
+    # Create global buses
+    Bus(uid=('bus', 'global', 'coal'), type='coal', price=60,
+        sum_out_limit=10e10, excess=False)
+    Bus(uid=('bus', 'global', 'lignite'), type='lignite', price=60,
+        sum_out_limit=10e10, excess=False)
+
+    # Create entity objects for each region
+    for region, data in zip(TwoRegExample.regions, region_inputs):
+        logging.info('Processing region: {0} ({1})'.format(
+            region.name, region.code))
+
+        # Create buses, one bus for each demand series.
+        demand = data.demand
+        for demandtype in demand.keys():
+            Bus(uid=('bus', region.name, demandtype), type=demandtype,
+                price=60, regions=[region], excess=False)
+            sink.Simple(
+                uid=('sink', region.name, demandtype),
+                inputs=TwoRegExample.entities.lookup(
+                    ('bus', region.name, demandtype)),
+                val=demand[demandtype],
+                region=[region])
+
+        # Create source object
+        create_fixed_source(TwoRegExample, region, data.feedin, data.cap,
+                            'elec')
+
+        # Power plants (aggregated if aggregate_pps is True)
+        pps_df = data.pps
+        logging.debug('Power plants of {0}:\n{1}'.format(region.name, pps_df))
+
+        for pwrp in pps_df.iterrows():
+            create_entity_objects(TwoRegExample, region, pwrp,
+                                  tclass=transformer.Simple, bclass=Bus)
+
+        # create storage transformer object for storage
+    #    transformer.Storage.optimization_options.update({'investment': True})
+        bel = TwoRegExample.entities.lookup(('bus', region.name, 'elec'))
+        transformer.Storage(uid=('sto_simple', region.name, 'elec'),
+                            inputs=bel,
+                            outputs=bel,
+                            eta_in=1,
+                            eta_out=0.8,
+                            cap_loss=0.00,
+                            opex_fix=35,
+                            opex_var=0,
+                            capex=1000,
+                            cap_max=10 ** 12,
+                            cap_initial=0,
+                            c_rate_in=1/6,
+                            c_rate_out=1/6)
+
+    # Connect the electrical buses of neighbouring regions.
+    neighbours = network.adjacency(
+        {r.name: r.geom for r in TwoRegExample.regions},
+        min_border=min_border)
+    network.connect(TwoRegExample, network.link_table(
+        neighbours, transport_table, capacity=transport_capacity,
+        eta=transport_eta))
+
+    #pv_lk_wtb = ([obj for obj in TwoRegExample.entities if obj.uid == (
+    #    'FixedSrc', 'Landkreis Wittenberg', 'pv_pwr')][0])
+
+    ## Multiply PV with 25
+    #pv_lk_wtb.val = pv_lk_wtb.val * 25
+
+    # Remove orphan buses
+    buses = [obj for obj in TwoRegExample.entities if isinstance(obj, Bus)]
+    orphans = []
+    for bus in buses:
+        if len(bus.inputs) > 0 or len(bus.outputs) > 0:
+            logging.debug('Bus {0} has connections.'.format(bus.type))
+        else:
+            logging.debug(
+                'Bus {0} has no connections and will be deleted.'.format(
+                    bus.type))
+            orphans.append(bus)
+    TwoRegExample.entities.remove_many(orphans)
+
+    TwoRegExample.simulation = es.Simulation(
+        solver='gurobi', timesteps=[t for t in range(len(time_index))],
+        stream_solver_output=True, objective_options={
+            'function': predefined_objectives.minimize_cost})
+
+    for entity in TwoRegExample.entities:
+        entity.uid = str(entity.uid)
+    TwoRegExample.entities.reindex()
+    run.end(**instrumentation.entity_counts(TwoRegExample))
+
+    if reduce_model:
+        with run.phase('reduction'):
+            reduction = presolve.reduce(TwoRegExample)
+        run.info['reduction'] = reduction.report()
+
+    # Optimize the energy system
+    if n_typical_periods:
+        with run.phase('optimize'):
+            tp = tsa.reduce_energy_system(TwoRegExample, n_typical_periods,
+                                          period_length)
+            tsa.optimize(TwoRegExample, tp, solver_backend)
+            tsa.expand_energy_system(TwoRegExample, tp)
+    elif rolling_window:
+        with run.phase('optimize'):
+            rolling_horizon.optimize(TwoRegExample, rolling_window,
+                                     rolling_overlap, solver_backend)
+    else:
+        # Build the model separately to see model build and solver time.
+        with run.phase('model build') as phase:
+            om = OptimizationModel(energysystem=TwoRegExample)
+            if run.enabled:
+                phase.counts.update(instrumentation.model_counts(om))
+        with run.phase('solve'):
+            if solver_backend is None:
+                TwoRegExample.optimize(om=om)
+            else:
+                run.info['solver'] = solver.optimize(
+                    TwoRegExample, om, solver_backend)
+        del om
+
+    if reduce_model:
+        reduction.restore(TwoRegExample)
+
+    if results_file is not None:
+        tsa.results_to_frame(TwoRegExample).to_csv(results_file)
+
+    objective = TwoRegExample.results.objective
+    logging.info('Objective: {0}'.format(objective))
+    if reference_objective is not None and objective is not None:
+        logging.info(
+            'Objective shift due to power plant aggregation: {0}'.format(
+                powerplants.objective_shift(reference_objective, objective)))
+
+    with run.phase('write results'):
+        results_store.write(TwoRegExample, results_path)
+
+    with run.phase('kpi'):
+        key_figures = kpi.summary(results_query.FlowResults(
+            results_store.ResultsStore(results_path)), kpi_parameters)
+        kpi.write(key_figures, results_path)
+    logging.info('Key figures:\n{0}'.format(key_figures[
+        ['energy', 'emissions', 'costs']].groupby(level='region').sum()))
+    run.info['kpi'] = key_figures[['energy', 'fuel', 'emissions', 'costs',
+                                   'curtailment']].sum().to_dict()
+
+    run.info['objective'] = objective
+    run.write(report_file)
+
+    return TwoRegExample
+
+
+if __name__ == '__main__':
+    logger.define_logging()
+    optimize()
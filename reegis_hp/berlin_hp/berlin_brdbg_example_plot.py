@@ -2,11 +2,11 @@
 # -*- coding: utf-8
 
 import logging
-import matplotlib.pyplot as plt
+import os
 
-from oemof.outputlib import to_pandas as tpd
-from oemof.tools import logger
-from oemof.core import energy_system as es
+from reegis_hp.tools import plotting
+from reegis_hp.tools import results_query
+from reegis_hp.tools import results_store
 
 
 # The following dictionaries are a workaround due to issue #26
@@ -49,45 +49,74 @@ cdict["('sink', 'Landkreis Wittenberg', 'elec')"] = '#0cce1e'
 cdict["('sink', 'Stadt Dessau-Rosslau', 'elec')"] = '#0cce1e'
 
 
-# Define the oemof default logger
-logger.define_logging()
-
-# Create an energy system
-TwoRegExample = es.EnergySystem()
-
-# Restoring a dumped EnergySystem
-logging.info(TwoRegExample.restore())
-
-esplot = tpd.DataFramePlot(energy_system=TwoRegExample)
-
-fig = plt.figure(figsize=(24, 14))
-plt.rc('legend', **{'fontsize': 19})
-plt.rcParams.update({'font.size': 14})
-plt.style.use('ggplot')
-
-n = 1
-
-# Loop over the regions to plot them.
-for region in TwoRegExample.regions:
-    uid = str(('bus', region.name, 'elec'))
-
-    esplot.ax = fig.add_subplot(2, 1, n)
-    n += 1
-    handles, labels = esplot.io_plot(
-        uid, cdict,
-        date_from="2010-06-01 00:00:00",
-        date_to="2010-06-8 00:00:00",
-        line_kwa={'linewidth': 4})
-
-    new_labels = []
-    for lab in labels:
-        new_labels.append(rename.get(str(lab), lab))
-
-    esplot.ax.set_ylabel('Power in MW')
-    esplot.ax.set_xlabel('')
-    esplot.ax.set_title(region.name)
-
-    esplot.set_datetime_ticks(tick_distance=24, date_format='%d-%m-%Y')
-    esplot.outside_legend(handles=handles, labels=new_labels)
-
-plt.show()
+# Results written by berlin_brdbg_example_opt.py. Only the plotted buses and
+# time window are read from disk.
+results_path = os.path.join(results_store.DEFAULT_PATH, 'berlin_brdbg')
+date_from = "2010-06-01 00:00:00"
+date_to = "2010-06-8 00:00:00"
+
+# Curves are reduced to about max_points points (None: every hour).
+max_points = 2000
+
+
+def plot(path=results_path, date_from=date_from, date_to=date_to,
+         max_points=max_points, filename=None, headless=None):
+    r"""Plot the elec bus of every region of a results store.
+
+    The figure is written to `filename` if given, otherwise it is shown.
+    Without a display (or with `headless`) the Agg backend is used. To
+    write the figures of all regions to files in parallel use
+    :func:`plot_regions`.
+    """
+    plt = plotting.pyplot(headless)
+    store = results_store.ResultsStore(path)
+    results = results_query.FlowResults(store)
+
+    fig = plt.figure(figsize=(24, 14))
+    plt.rc('legend', **{'fontsize': 19})
+    plt.rcParams.update({'font.size': 14})
+    plt.style.use('ggplot')
+
+    n = 1
+
+    # Loop over the regions to plot them.
+    for region in store.regions:
+        bus = ('bus', region['name'], 'elec')
+
+        ax = fig.add_subplot(len(store.regions), 1, n)
+        n += 1
+        handles, labels = plotting.io_plot(
+            results, bus, ax, cdict, date_from=date_from, date_to=date_to,
+            max_points=max_points, line_kwa={'linewidth': 4})
+
+        new_labels = []
+        for lab in labels:
+            new_labels.append(rename.get('(val, {0})'.format(lab), lab))
+
+        ax.set_ylabel('Power in MW')
+        ax.set_xlabel('')
+        ax.set_title(region['name'])
+        plotting.outside_legend(ax, handles, new_labels)
+
+    if filename is None:
+        plt.show()
+    else:
+        fig.savefig(filename, bbox_inches='tight')
+        logging.info('Figure written to {0}.'.format(filename))
+    plt.close(fig)
+
+
+def plot_regions(directory, path=results_path, date_from=date_from,
+                 date_to=date_to, max_points=max_points, fmt='pdf',
+                 workers=None):
+    r"""Write one figure per region to `directory` in worker processes."""
+    os.makedirs(directory, exist_ok=True)
+    return plotting.render_figures(plotting.region_jobs(
+        path, directory, fmt=fmt, date_from=date_from, date_to=date_to,
+        max_points=max_points, cdict=cdict), workers=workers)
+
+
+if __name__ == '__main__':
+    from oemof.tools import logger
+    logger.define_logging()
+    plot()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Data phase of the region set-up of the Berlin/Brandenburg model.
+
+Fetching and computing the inputs of a region (geometry, demand, feed-in
+and power plants) does not depend on other regions, so all regions are
+prepared in a process pool. Only plain data is returned, the oemof entities
+are created afterwards in the main process.
+
+All queries run through one connection pool per process
+(reegis_hp.tools.data_access.DataAccess), for one region or in bulk for
+all regions (prefetch_regions). Both ways use the same functions and
+therefore the same cache keys.
+
+@author: uwe
+"""
+import logging
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from oemof.db import feedin_pg
+from oemof.core import energy_system as es
+
+from reegis_hp.tools import cache
+from reegis_hp.tools import data_access
+from reegis_hp.tools import demand as demand_engine
+from reegis_hp.tools import feedin
+from reegis_hp.tools import parallel
+from reegis_hp.tools import powerplants
+
+RegionData = namedtuple('RegionData', ['name', 'nuts', 'geom', 'demand',
+                                       'feedin', 'cap', 'pps'])
+
+
+# One demand engine and feed-in stage per process, the profiles and the
+# feed-in of the weather cells are shared by all regions.
+_engines = {}
+_feedin_stages = {}
+# Connection pool of the process (DataAccess), see _data_access.
+_pools = {}
+
+
+def _data_access(access=None):
+    r"""Return `access` or the connection pool of this process."""
+    if access is not None:
+        return access
+    if None not in _pools:
+        _pools[None] = data_access.DataAccess()
+    return _pools[None]
+
+
+def _init_worker(access):
+    access.after_fork()
+    _pools[None] = access
+
+
+def get_polygon(access, nuts):
+    r"""Polygon of a NUTS region."""
+    return access.polygons([nuts])[nuts]
+
+
+def get_weather(access, geom, year):
+    r"""List of the coastdat weather cells (FeedinWeather) of geom."""
+    weather = access.weather({'geom': geom}, year)['geom']
+    if not weather:
+        raise ValueError('No weather cell within the geometry.')
+    return weather
+
+
+def get_power_plants(access, geom):
+    r"""Power plants (type, subtype, cap) within geom, like get_bnetza_pps."""
+    return access.power_plants({'geom': geom})['geom']
+
+
+def get_temperature(weather):
+    r"""Hourly air temperature (degC), mean of all weather cells."""
+    temp = pd.concat([w.data['temp_air'] for w in weather], axis=1)
+    return temp.mean(axis=1) - 273.15
+
+
+def get_res_capacities(access, geom, year, weather=None):
+    r"""Installed wind and pv capacity and wind class of every weather cell
+    within geom (energymap plants, as used by feedin_pg).
+
+    The weather cells of geom are fetched if `weather` is None.
+    """
+    if weather is None:
+        weather = get_weather(access, geom, year)
+    return access.res_capacities({'geom': geom}, {'geom': weather})['geom']
+
+
+def get_feedin(weather, capacities, year, site, cache_path=None):
+    r"""Normalised feed-in and installed capacity per feed-in type."""
+    if cache_path not in _feedin_stages:
+        _feedin_stages[cache_path] = feedin.FeedinStage(cache_path)
+    return _feedin_stages[cache_path].aggregate(weather, year, site,
+                                                capacities)
+
+
+def get_demand(year, elec_buildings=(), heat_buildings=(), temperature=None,
+               region=None, cache_path=None):
+    r"""Electricity and heat demand of the building entries of a region."""
+    if cache_path not in _engines:
+        _engines[cache_path] = demand_engine.DemandEngine(cache_path)
+    return _engines[cache_path].region_demand(
+        year, elec_buildings, heat_buildings, temperature, region)
+
+
+def prepare_region(nuts, name, year, site, eta_default, aggregate_pps=True,
+                   eta_bins=None, cache_path=cache.DEFAULT_PATH,
+                   elec_buildings=(), heat_buildings=(), batched_feedin=True,
+                   access=None):
+    r"""Fetch and compute all inputs of one region.
+
+    The queries run on `access` (default: the connection pool of the
+    process), so it can run in a worker process. The demand is calculated
+    from the building entries (see reegis_hp.tools.demand). The feed-in is
+    computed with the feedinlib models per weather cell and technology and
+    cached per cell (reegis_hp.tools.feedin). With batched_feedin=False
+    ``Feedin().aggregate_cap_val`` of oemof.db is used instead.
+
+    Returns
+    -------
+    RegionData
+    """
+    access = _data_access(access)
+    inputs = cache.DiskCache(cache_path)
+
+    geom = inputs.call(get_polygon, access, nuts)
+    region = es.Region(geom=geom, name=name)
+
+    weather = None
+    if len(heat_buildings) or batched_feedin:
+        weather = inputs.call(get_weather, access, geom, year, tag=year)
+
+    temperature = get_temperature(weather) if len(heat_buildings) else None
+    demand = get_demand(year, elec_buildings, heat_buildings, temperature,
+                        name, cache_path)
+
+    if batched_feedin:
+        # The weather is not part of the key, it is given by geom and year.
+        key = cache.cache_key(get_res_capacities, (access, geom, year))
+        try:
+            capacities = inputs.get(key)
+        except KeyError:
+            capacities = get_res_capacities(access, geom, year, weather)
+            inputs.set(key, capacities,
+                       function=get_res_capacities.__qualname__)
+        feedin_df, cap = get_feedin(weather, capacities, year, site,
+                                    cache_path)
+    else:
+        # A connection of the pool, only taken if the value is not cached.
+        conn = cache.LazyConnection(access.connect)
+        try:
+            feedin_df, cap = inputs.call(
+                feedin_pg.Feedin().aggregate_cap_val, conn, region=region,
+                year=year, bustype='elec', **site)
+        finally:
+            if conn.connected:
+                conn.close()
+
+    if len(feedin_df) != len(demand):
+        raise ValueError('{0}: {1} hours of feed-in but {2} hours of '
+                         'demand.'.format(name, len(feedin_df), len(demand)))
+
+    # Get power plants from database and write them into a DataFrame
+    pps_df = inputs.call(get_power_plants, access, geom, tag=year)
+
+    # Add aditional power plants to the DataFrame
+    pps_df.loc[len(pps_df)] = 'natural_gas', np.nan, 10 ** 12
+
+    if aggregate_pps:
+        agg_df = powerplants.aggregate_power_plants(
+            pps_df, eta_default, eta_bins=eta_bins)
+        powerplants.log_report(powerplants.aggregation_report(
+            pps_df, agg_df, timesteps=len(demand)), name)
+        pps_df = agg_df
+    return RegionData(name, nuts, geom, demand, feedin_df, cap, pps_df)
+
+
+def prefetch_regions(regions, year, cache_path=cache.DEFAULT_PATH,
+                     access=None, weather=True, capacities=True):
+    r"""Fetch the database inputs of many regions in bulk into the cache.
+
+    The polygons, weather cells, wind and pv capacities and power plants of
+    all regions that are not cached yet are fetched with one query per
+    table (see reegis_hp.tools.data_access) and stored under the keys of
+    get_polygon, get_weather, get_res_capacities and get_power_plants, so
+    prepare_region only reads the cache.
+
+    Parameters
+    ----------
+    regions : list of tuple
+        (NUTS code, name) of every region.
+    access : reegis_hp.tools.data_access.DataAccess, optional
+        Default: the connection pool of the process.
+    weather, capacities : bool
+        Also fetch the weather cells and the wind and pv capacities.
+
+    Returns
+    -------
+    int
+        Number of regions fetched from the database.
+    """
+    access = _data_access(access)
+    inputs = cache.DiskCache(cache_path)
+
+    def cached(func, *args, tag=None):
+        return inputs.has(cache.cache_key(func, (access,) + args, tag=tag))
+
+    def store(value, func, *args, tag=None):
+        inputs.set(cache.cache_key(func, (access,) + args, tag=tag), value,
+                   function=func.__qualname__, evict=False)
+
+    nuts = [n for n, name in regions if not cached(get_polygon, n)]
+    start, queries = time.time(), access.queries
+    geoms = access.polygons(nuts) if nuts else {}
+    for n, geom in geoms.items():
+        store(geom, get_polygon, n)
+    for n, name in regions:
+        if n not in geoms:
+            geoms[n] = inputs.call(get_polygon, access, n)
+
+    missing = {}
+    for n, geom in geoms.items():
+        if not (cached(get_power_plants, geom, tag=year) and
+                (not weather or cached(get_weather, geom, year, tag=year)) and
+                (not capacities or cached(get_res_capacities, geom, year))):
+            missing[n] = geom
+    if missing:
+        for n, pps in access.power_plants(missing).items():
+            store(pps, get_power_plants, missing[n], tag=year)
+    if missing and (weather or capacities):
+        cells = access.weather(missing, year)
+        for n, region_cells in cells.items():
+            # Regions without cells are left to get_weather, which raises.
+            if region_cells:
+                store(region_cells, get_weather, missing[n], year, tag=year)
+        if capacities:
+            for n, caps in access.res_capacities(missing, cells).items():
+                store(caps, get_res_capacities, missing[n], year)
+    inputs.evict()
+    logging.info('Fetched {0} of {1} regions with {2} queries in {3:.1f} s.'
+                 .format(len(missing), len(regions),
+                         access.queries - queries, time.time() - start))
+    return len(missing)
+
+
+def _prepare(args):
+    nuts, name, kwargs = args
+    return prepare_region(nuts, name, **kwargs)
+
+
+def prepare_regions(regions, workers=None, bulk=True, access=None,
+                    **kwargs):
+    r"""Prepare several regions in parallel.
+
+    Parameters
+    ----------
+    regions : list of tuple
+        (NUTS code, name) of every region.
+    workers : int, optional
+        Number of worker processes (default: number of cores). With 1 the
+        regions are prepared in the main process.
+    bulk : bool
+        Fetch the database inputs of all regions first with one query per
+        table (see :func:`prefetch_regions`).
+    access : reegis_hp.tools.data_access.DataAccess, optional
+        Connection pool of the queries, every worker process gets its own
+        copy (default: the pool of the process).
+    kwargs :
+        Passed to :func:`prepare_region`.
+
+    Returns
+    -------
+    list of RegionData
+        In the order of `regions`.
+    """
+    start = time.time()
+    access = _data_access(access)
+    if bulk:
+        batched_feedin = kwargs.get('batched_feedin', True)
+        prefetch_regions(
+            regions, kwargs['year'],
+            cache_path=kwargs.get('cache_path', cache.DEFAULT_PATH),
+            access=access, capacities=batched_feedin,
+            weather=batched_feedin or bool(len(
+                kwargs.get('heat_buildings', ()))))
+    if workers == 1 or len(regions) == 1:
+        data = [prepare_region(nuts, name, access=access, **kwargs)
+                for nuts, name in regions]
+    else:
+        jobs = [(nuts, name, kwargs) for nuts, name in regions]
+        with parallel.process_pool(workers, initializer=_init_worker,
+                                   initargs=(access,)) as pool:
+            data = list(pool.map(_prepare, jobs))
+    logging.info('Prepared {0} regions in {1:.1f} s.'.format(
+        len(data), time.time() - start))
+    return data
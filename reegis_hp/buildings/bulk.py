@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Heat demand of all buildings of Berlin in one pass.
+
+Area, perimeter, number of floors and the address of every footprint of
+berlin.hausumringe are fetched with one set-based query, streamed in
+chunks, passed to the Open_eQuarter building evaluation in batches and the
+demand per building is appended to a csv file.
+
+Usage: python -m reegis_hp.buildings.bulk demand.csv
+
+@author: uwe
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.buildings import evaluation
+
+BUILDING_SQL = '''
+SELECT DISTINCT ON (haus.gid)
+    haus.gid,
+    st_area(st_transform(haus.geom, 3068)) AS area,
+    st_perimeter(st_transform(haus.geom, 3068)) AS perimeter,
+    ag.anzahldero AS floors,
+    ag.strassen_n AS street,
+    ag.hausnummer AS housenumber
+FROM berlin.hausumringe AS haus
+LEFT JOIN berlin.alkis_gebaeude AS ag
+    ON ST_contains(ag.geom, st_centroid(haus.geom))
+{where}
+ORDER BY haus.gid;
+'''
+
+# Values used if the database does not provide them.
+DEFAULTS = {'population_density': 52,
+            'year_of_construction': 1970,
+            'floors': 3}
+
+
+def building_query(gids=None):
+    """Return the query for all buildings or a list of gids."""
+    where = ''
+    if gids is not None:
+        where = 'WHERE haus.gid IN ({0})'.format(
+            ', '.join(str(int(g)) for g in gids))
+    return BUILDING_SQL.format(where=where)
+
+
+def iter_buildings(conn, chunk_size=20000, gids=None):
+    r"""Yield DataFrames of `chunk_size` buildings.
+
+    The query runs once, the rows are streamed with a server side cursor.
+    """
+    results = conn.execution_options(stream_results=True).execute(
+        building_query(gids))
+    columns = results.keys()
+    try:
+        while True:
+            rows = results.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=columns)
+    finally:
+        results.close()
+
+
+def building_length(area, perimeter):
+    r"""Length of the long side of a rectangle with the given area and
+    perimeter. Falls back to the side of a square if no such rectangle
+    exists.
+    """
+    half = np.asarray(perimeter, dtype=float) / 2
+    disc = half ** 2 - 4 * np.asarray(area, dtype=float)
+    return np.where(disc >= 0, (half + np.sqrt(np.clip(disc, 0, None))) / 2,
+                    np.sqrt(area))
+
+
+def prepare(df, defaults=None):
+    """Fill missing values and add the columns the evaluation needs."""
+    defaults = dict(DEFAULTS, **(defaults or {}))
+    df = df.copy()
+    df['floors'] = pd.to_numeric(df['floors'], errors='coerce').fillna(
+        defaults['floors'])
+    for key in ('population_density', 'year_of_construction'):
+        if key not in df:
+            df[key] = defaults[key]
+    df['length'] = building_length(df['area'], df['perimeter'])
+    return df
+
+
+def evaluate_batch(df, evaluator=None):
+    r"""Evaluate every building of a prepared DataFrame.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Output of :func:`prepare`.
+    evaluator : callable, optional
+        Function with the signature of Open_eQuarter's
+        ``building_evaluation.evaluate_building`` (default).
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per building (indexed by gid) with all values returned by
+        the evaluation.
+    """
+    return evaluation.evaluate_buildings(df, evaluator).set_index(df['gid'])
+
+
+def run(conn, filename, chunk_size=20000, defaults=None, evaluator=None,
+        gids=None):
+    r"""Evaluate all buildings and write the demand per building to a file.
+
+    Returns
+    -------
+    int
+        Number of evaluated buildings.
+    """
+    if evaluator is None:
+        evaluator = evaluation.default_evaluator()
+    start = time.time()
+    n = 0
+    for i, chunk in enumerate(iter_buildings(conn, chunk_size, gids)):
+        chunk = prepare(chunk, defaults)
+        demand = evaluate_batch(chunk, evaluator)
+        demand = pd.concat([chunk.set_index('gid')[
+            ['street', 'housenumber', 'area', 'perimeter', 'floors']],
+            demand], axis=1)
+        demand.to_csv(filename, mode='w' if i == 0 else 'a', header=i == 0)
+        n += len(chunk)
+        logging.info('{0} buildings evaluated ({1:.0f} buildings/s).'.format(
+            n, n / (time.time() - start)))
+    return n
+
+
+if __name__ == '__main__':
+    from oemof import db
+    from oemof.tools import logger
+
+    parser = argparse.ArgumentParser(
+        description='Evaluate the heat demand of all buildings.')
+    parser.add_argument('filename', help='output csv file')
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    logger.define_logging()
+    run(db.connection(), args.filename, chunk_size=args.chunk_size)
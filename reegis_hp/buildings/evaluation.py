@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Array based evaluation of building energy demand.
+
+The Open_eQuarter functions ``energy_demand.evaluate_building`` and
+``building_evaluation.evaluate_building`` are written for one building with
+scalar arguments. Their formulas are plain arithmetic on the geometry
+(area, perimeter, length, floors), only the statistical tables and
+correlations look up the year of construction and the population density.
+:func:`evaluate_buildings` calls the Open_eQuarter function with NumPy
+arrays. If a lookup needs a scalar the buildings are grouped by the lookup
+columns and the function is called once per group, with scalars for the
+lookup columns and arrays for the geometry. The formulas are not copied,
+so the results are the ones of the installed Open_eQuarter version.
+
+If a function cannot be evaluated on arrays the buildings are evaluated one
+by one and a warning is logged. :func:`compare_with_scalar` checks the
+array results against the scalar function on a sample.
+
+@author: uwe
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('population_density', 'area', 'perimeter', 'length', 'floors',
+           'year_of_construction')
+LOOKUP_COLUMNS = ('year_of_construction', 'population_density')
+
+
+def default_evaluator():
+    from Open_eQuarterPy.stat_util import building_evaluation as be
+    return be.evaluate_building
+
+
+def _to_frame(result, n, index):
+    """Turn a dict of scalars and arrays into a DataFrame of n rows."""
+    data = {}
+    for key, value in result.items():
+        value = np.asarray(value)
+        if value.ndim > 1 or (value.ndim == 1 and len(value) != n):
+            raise ValueError('Result {0} has shape {1}, expected {2} '
+                             'values.'.format(key, value.shape, n))
+        data[key] = np.broadcast_to(value, (n,))
+    return pd.DataFrame(data, index=index)
+
+
+def _call_grouped(evaluator, df, columns, lookup_columns):
+    if not lookup_columns:
+        groups = [((), df)]
+    else:
+        groups = df.groupby(lookup_columns, sort=False)
+    frames = []
+    for key, group in groups:
+        kwargs = {c: group[c].to_numpy() for c in columns
+                  if c not in lookup_columns}
+        kwargs.update((c, v.item() if hasattr(v, 'item') else v)
+                      for c, v in zip(lookup_columns, np.atleast_1d(key)))
+        with np.errstate(all='ignore'):
+            frames.append(_to_frame(evaluator(**kwargs), len(group),
+                                    group.index))
+    return pd.concat(frames).loc[df.index]
+
+
+def _call_rows(evaluator, df, columns):
+    rows = [evaluator(**dict(zip(columns, values)))
+            for values in df[list(columns)].itertuples(index=False)]
+    return pd.DataFrame(rows, index=df.index)
+
+
+def evaluate_buildings(df, evaluator=None, columns=COLUMNS,
+                       lookup_columns=LOOKUP_COLUMNS):
+    r"""Evaluate all buildings of a DataFrame with array arguments.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        One row per building with the input columns of the evaluator.
+    evaluator : callable, optional
+        Scalar building evaluation (default: Open_eQuarter's
+        ``building_evaluation.evaluate_building``).
+    columns : iterable of str
+        Columns passed as keyword arguments. Use ('population_density',
+        'area', 'floors', 'year_of_construction') for
+        ``energy_demand.evaluate_building``.
+    lookup_columns : iterable of str
+        Columns used for table lookups. If the evaluator fails on arrays
+        the buildings are grouped by the first, then by the first two ...
+        of these columns and the group values are passed as scalars.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One column per demand component, same index as `df`.
+    """
+    if evaluator is None:
+        evaluator = default_evaluator()
+    columns = [c for c in columns if c in df]
+    lookup_columns = [c for c in lookup_columns if c in columns]
+    for n in range(len(lookup_columns) + 1):
+        try:
+            return _call_grouped(evaluator, df, columns, lookup_columns[:n])
+        except (ValueError, TypeError, KeyError, AttributeError,
+                ZeroDivisionError) as e:
+            error = e
+            logging.debug('Evaluation with scalar {0} failed: {1}'.format(
+                lookup_columns[:n], e))
+    logging.warning('{0} cannot be evaluated on arrays ({1}), the '
+                    'buildings are evaluated one by one.'.format(
+                        getattr(evaluator, '__name__', evaluator), error))
+    return _call_rows(evaluator, df, columns)
+
+
+def compare_with_scalar(df, evaluator=None, columns=COLUMNS, sample=100,
+                        rtol=1e-6, seed=0):
+    r"""Compare the array evaluation with the scalar function on a sample.
+
+    Returns
+    -------
+    pandas.Series
+        Maximum relative deviation per demand component. Raises an
+        AssertionError if a deviation exceeds `rtol`.
+    """
+    if evaluator is None:
+        evaluator = default_evaluator()
+    sample = df.sample(min(sample, len(df)), random_state=seed)
+    columns = [c for c in columns if c in df]
+    vectorized = evaluate_buildings(sample, evaluator, columns)
+    scalar = _call_rows(evaluator, sample, columns)
+    numeric = scalar.select_dtypes('number').columns
+    diff = (vectorized[numeric].astype(float) - scalar[numeric]).abs() / (
+        scalar[numeric].abs().where(scalar[numeric] != 0, 1))
+    deviation = diff.max()
+    if (deviation > rtol).any():
+        raise AssertionError('Array evaluation deviates from the scalar '
+                             'function:\n{0}'.format(deviation[
+                                 deviation > rtol]))
+    return deviation
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Offline spatial join of building footprints and ALKIS buildings.
+
+Reproduces the PostGIS join
+
+    SELECT haus.gid, ag.gid FROM berlin.alkis_gebaeude AS ag,
+        berlin.hausumringe AS haus
+    WHERE ST_contains(ag.geom, st_centroid(haus.geom))
+
+on exported files (see reegis_hp.tools.db_export), so it runs on nodes
+without a database. The ALKIS polygons are indexed in an STRtree, the
+centroids of the footprints are matched chunk by chunk with vectorized
+point in polygon tests (shapely >= 2.0).
+
+@author: uwe
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import shapely
+
+PAIR_SQL = '''
+SELECT haus.gid AS gid, ag.{alkis_id} AS alkis_gid
+FROM berlin.alkis_gebaeude AS ag, berlin.hausumringe AS haus
+WHERE ST_contains(ag.geom, st_centroid(haus.geom)) AND haus.gid IN ({gids})
+ORDER BY haus.gid, ag.{alkis_id};
+'''
+
+
+def read_table(filename, chunksize=None, columns=None):
+    r"""Read a csv or parquet export, optionally in chunks.
+
+    Returns a DataFrame or, if `chunksize` is given, an iterator of
+    DataFrames. Parquet files are read batch by batch, so only one chunk
+    is in memory.
+    """
+    if filename.endswith('.parquet'):
+        if chunksize is None:
+            return pd.read_parquet(filename, columns=columns)
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(filename).iter_batches(
+            batch_size=chunksize, columns=columns)
+        return (batch.to_pandas() for batch in batches)
+    return pd.read_csv(filename, chunksize=chunksize, usecols=columns)
+
+
+def geometries(series):
+    """Convert a column of (hex) WKB or EWKB as exported by PostGIS."""
+    return shapely.from_wkb(series.to_numpy())
+
+
+class AlkisIndex:
+    r"""STRtree over the ALKIS building polygons.
+
+    Parameters
+    ----------
+    polygons : array of shapely geometries
+    ids : array
+        Identifier of every polygon (e.g. the gid of alkis_gebaeude).
+    """
+
+    def __init__(self, polygons, ids):
+        self.polygons = np.asarray(polygons)
+        self.ids = np.asarray(ids)
+        start = time.time()
+        self.tree = shapely.STRtree(self.polygons)
+        logging.info('STRtree of {0} polygons built in {1:.1f} s.'.format(
+            len(self.polygons), time.time() - start))
+
+    @classmethod
+    def from_file(cls, filename, id_col='gid', geom_col='geom'):
+        df = read_table(filename, columns=[id_col, geom_col])
+        return cls(geometries(df[geom_col]), df[id_col])
+
+    def match(self, footprints, ids):
+        r"""Return all (footprint id, ALKIS id) pairs where the ALKIS polygon
+        contains the centroid of the footprint.
+        """
+        centroids = shapely.centroid(np.asarray(footprints))
+        # 'within' tests point within polygon, i.e. ST_contains(poly, point)
+        point_idx, poly_idx = self.tree.query(centroids, predicate='within')
+        pairs = pd.DataFrame({'gid': np.asarray(ids)[point_idx],
+                              'alkis_gid': self.ids[poly_idx]})
+        return pairs.sort_values(['gid', 'alkis_gid']).reset_index(drop=True)
+
+
+def join_files(footprint_file, alkis_file, filename, chunksize=100000,
+               id_col='gid', geom_col='geom', alkis_id_col='gid'):
+    r"""Match all footprints of a file and write the pairs to a csv file.
+
+    Returns
+    -------
+    int
+        Number of pairs.
+    """
+    index = AlkisIndex.from_file(alkis_file, alkis_id_col, geom_col)
+    start = time.time()
+    n = 0
+    n_pairs = 0
+    for i, chunk in enumerate(read_table(footprint_file, chunksize,
+                                         columns=[id_col, geom_col])):
+        pairs = index.match(geometries(chunk[geom_col]), chunk[id_col])
+        pairs.to_csv(filename, mode='w' if i == 0 else 'a', header=i == 0,
+                     index=False)
+        n += len(chunk)
+        n_pairs += len(pairs)
+        logging.info('{0} footprints matched ({1:.0f}/s).'.format(
+            n, n / (time.time() - start)))
+    return n_pairs
+
+
+def compare_with_sql(conn, pairs, footprint_ids, sample=1000, seed=0,
+                     alkis_id='gid'):
+    r"""Compare the pairs of a sample of footprints with the PostGIS join.
+
+    Parameters
+    ----------
+    footprint_ids : array like
+        Ids of all footprints. The sample is drawn from all of them, so
+        footprints without a local match are compared as well.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Pairs found by only one of both methods (empty if identical).
+    """
+    gids = pd.Series(pd.unique(np.asarray(footprint_ids)))
+    gids = gids.sample(min(sample, len(gids)), random_state=seed)
+    results = conn.execute(PAIR_SQL.format(
+        gids=', '.join(str(int(g)) for g in gids), alkis_id=alkis_id))
+    sql = pd.DataFrame(results.fetchall(), columns=results.keys())
+    local = pairs[pairs['gid'].isin(gids)]
+    diff = local.merge(sql, how='outer', on=['gid', 'alkis_gid'],
+                       indicator=True)
+    return diff[diff['_merge'] != 'both']
+
+
+if __name__ == '__main__':
+    from oemof.tools import logger
+
+    parser = argparse.ArgumentParser(
+        description='Match building footprints with ALKIS buildings.')
+    parser.add_argument('footprints', help='export of berlin.hausumringe')
+    parser.add_argument('alkis', help='export of berlin.alkis_gebaeude')
+    parser.add_argument('filename', help='output csv file')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    args = parser.parse_args()
+
+    logger.define_logging()
+    join_files(args.footprints, args.alkis, args.filename,
+               chunksize=args.chunk_size)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface of reegis_hp (console script ``reegis-hp``).
+
+    reegis-hp optimize --regions DE3:Berlin DE4:Brandenburg --solver cbc
+    reegis-hp plot --output berlin.pdf
+    reegis-hp plot --directory figures --workers 4
+    reegis-hp export buildings.parquet --sql "SELECT * FROM berlin.gebaeude"
+
+Building the parser does not import numpy, pandas, oemof or matplotlib, so
+``--help`` starts fast. Every command imports its modules when
+it runs; plot uses the Agg backend without a display or with --headless.
+
+@author: uwe
+"""
+import argparse
+import os
+import sys
+
+from reegis_hp.tools import small_requests
+from reegis_hp.tools import solver
+
+RESULTS = os.path.join('~', '.oemof', 'results', 'berlin_brdbg')
+
+
+def _region(value):
+    nuts, sep, name = value.partition(':')
+    if not sep or not nuts or not name:
+        raise argparse.ArgumentTypeError(
+            'Use NUTS:name, e.g. DE3:Berlin, not {0}.'.format(value))
+    return nuts, name
+
+
+def _define_logging():
+    from oemof.tools import logger
+    logger.define_logging()
+
+
+def optimize(args):
+    from reegis_hp.berlin_hp import berlin_brdbg_example_opt as model
+
+    backend = None
+    if args.solver != 'oemof':
+        backend = solver.Backend(args.solver, threads=args.threads,
+                                 time_limit=args.time_limit,
+                                 mip_gap=args.mip_gap)
+    settings = {'solver_backend': backend,
+                'reduce_model': not args.no_reduce,
+                'aggregate_pps': not args.no_aggregate}
+    for key in ('regions', 'year', 'region_workers', 'n_typical_periods',
+                'period_length', 'rolling_window', 'rolling_overlap',
+                'min_border', 'results_path', 'cache_path', 'report_file',
+                'profile_phase'):
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+    for key in ('results_path', 'cache_path', 'report_file'):
+        if key in settings:
+            settings[key] = os.path.expanduser(settings[key])
+    model.optimize(**settings)
+
+
+def plot(args):
+    from reegis_hp.berlin_hp import berlin_brdbg_example_plot as figures
+
+    settings = {'path': os.path.expanduser(args.results_path),
+                'max_points': args.max_points or None}
+    for key in ('date_from', 'date_to'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    if args.directory is not None:
+        figures.plot_regions(args.directory, fmt=args.format,
+                             workers=args.workers, **settings)
+    else:
+        figures.plot(filename=args.output,
+                     headless=True if args.headless else None, **settings)
+
+
+def parser():
+    r"""Return the argument parser of all commands."""
+    main = argparse.ArgumentParser(
+        prog='reegis-hp', description='Local heat and power systems.')
+    commands = main.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    opt = commands.add_parser(
+        'optimize', help='build, solve and store the regional model',
+        description='Build, solve and store the model of the regions. '
+                    'Missing options use the settings of '
+                    'berlin_brdbg_example_opt.py.')
+    opt.add_argument('--regions', nargs='+', type=_region,
+                     metavar='NUTS:NAME', help='e.g. DE3:Berlin')
+    opt.add_argument('--year', type=int)
+    opt.add_argument('--workers', dest='region_workers', type=int,
+                     help='processes preparing the regions')
+    opt.add_argument('--solver', default='highs',
+                     choices=sorted(solver.INTERFACES) + ['oemof'],
+                     help="'oemof' uses the LP file of oemof "
+                          "(default: %(default)s)")
+    opt.add_argument('--threads', type=int)
+    opt.add_argument('--time-limit', type=float, help='seconds')
+    opt.add_argument('--mip-gap', type=float, help='relative MIP gap')
+    opt.add_argument('--typical-periods', dest='n_typical_periods',
+                     type=int, help='solve on this many typical periods')
+    opt.add_argument('--period-length', type=int, help='hours')
+    opt.add_argument('--rolling-window', type=int, help='hours')
+    opt.add_argument('--rolling-overlap', type=int, help='hours')
+    opt.add_argument('--min-border', type=float,
+                     help='minimum common border of neighbouring regions '
+                          '(degrees), 0 also connects regions that only '
+                          'share a corner')
+    opt.add_argument('--no-reduce', action='store_true',
+                     help='skip the topology reduction')
+    opt.add_argument('--no-aggregate', action='store_true',
+                     help='one transformer per power plant')
+    opt.add_argument('--results', dest='results_path',
+                     help='results store directory (default: {0})'.format(
+                         RESULTS))
+    opt.add_argument('--cache', dest='cache_path',
+                     help='cache directory of the database inputs')
+    opt.add_argument('--report', dest='report_file',
+                     help='write the timings of the run to this json file')
+    opt.add_argument('--profile', dest='profile_phase',
+                     help="run a phase under cProfile, e.g. 'model build'")
+    opt.set_defaults(func=optimize)
+
+    fig = commands.add_parser(
+        'plot', help='plot the elec buses of a results store',
+        description='Plot the elec buses of all regions of a results store.')
+    fig.add_argument('--results', dest='results_path', default=RESULTS,
+                     help='results store directory (default: %(default)s)')
+    fig.add_argument('--from', dest='date_from', help='e.g. 2010-06-01')
+    fig.add_argument('--to', dest='date_to', help='e.g. 2010-06-08')
+    fig.add_argument('--max-points', type=int, default=2000,
+                     help='points per curve, 0 for all '
+                          '(default: %(default)s)')
+    fig.add_argument('--output',
+                     help='write the figure to this file instead of showing '
+                          'it')
+    fig.add_argument('--directory',
+                     help='write one figure per region to this directory')
+    fig.add_argument('--format', default='pdf',
+                     help='file format of --directory (default: %(default)s)')
+    fig.add_argument('--workers', type=int,
+                     help='processes rendering the figures of --directory')
+    fig.add_argument('--headless', action='store_true',
+                     help='use the Agg backend')
+    fig.set_defaults(func=plot)
+
+    export = small_requests.add_arguments(commands.add_parser(
+        'export', help='export the result of a query to csv or parquet',
+        description='Export the result of a query to a file.'))
+    export.set_defaults(func=small_requests.export)
+    return main
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    _define_logging()
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,6 +26,8 @@ from oemof.core.network.entities.buses import HeatBus
 from oemof.core.network.entities.components import sinks as sink
 from oemof.core.network.entities.components import sources as source
 from oemof.core.network.entities.components import transformers as transformer
+from reegis_hp.tools import results_store
+from reegis_hp.tools import solver
 
 
 def fix_labels(labels, replace_underscore=True):
@@ -240,10 +242,11 @@ storage = transformer.Storage(uid='sto_simple',
 ###############################################################################
 logging.info('Start optimisation....')
 print(time.time() - start)
-energysystem.optimize()
+solver.optimize(energysystem, backend=solver.Backend('highs'))
+print(time.time() - start)
+results_store.write(energysystem, os.path.join(
+    results_store.DEFAULT_PATH, 'reegis_example'))
 print(time.time() - start)
-energysystem.dump()
-logging.info(energysystem.restore())
 
 # Creation of a multi-indexed pandas dataframe
 esplot = tpd.DataFramePlot(energy_system=energysystem)
@@ -307,6 +310,6 @@ esplot.ax.set_ylabel('Power in MW')
 esplot.ax.set_xlabel('Date')
 esplot.set_datetime_ticks(tick_distance=24, date_format='%d-%m-%Y')
 
-fig.savefig(os.path.join('/home/uwe/', 'test' + '.pdf'))
+fig.savefig(os.path.join(os.path.expanduser('~'), 'test.pdf'))
 plt.show(fig)
 plt.close(fig)
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent local cache for database backed inputs.
+
+Results of expensive database functions (regions, power plant tables,
+feed-in series) are stored on disk, keyed by a hash of the function name,
+its arguments and an optional tag (e.g. the year). Tables and series are
+stored as parquet files (pickle if no parquet engine is installed),
+geometries as WKB. The database connection is opened lazily, so a run that
+only hits the cache does not need a database at all.
+
+Usage::
+
+    from oemof import db
+    from reegis_hp.tools import cache
+
+    conn = cache.LazyConnection(db.connection)
+    store = cache.DiskCache()
+    geom = store.call(tools.get_polygon_from_nuts, conn, 'DE3')
+
+@author: uwe
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.oemof', 'cache')
+
+# Estimated size of every cache directory of this process, see
+# DiskCache.evict.
+_sizes = {}
+
+
+class LazyConnection:
+    r"""Proxy that opens the database connection on first use.
+
+    Parameters
+    ----------
+    factory : callable
+        Returns a connection, e.g. ``oemof.db.connection`` or a function
+        returning a connection to a local stand-in database.
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        self._factory = factory
+        self._args = args
+        self._kwargs = kwargs
+        self._conn = None
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            logging.info('Opening database connection.')
+            self._conn = self._factory(*self._args, **self._kwargs)
+        return getattr(self._conn, name)
+
+
+def _is_geometry(obj):
+    return hasattr(obj, 'wkb') and hasattr(obj, 'geom_type')
+
+
+def fingerprint(obj):
+    r"""Return a stable, hashable description of an argument.
+
+    Geometries are described by their WKB, regions by name and geometry,
+    tables by their column and index names and the hash of every row (in
+    order). Database connections and connection pools (objects with a
+    connect method, e.g. DataAccess) are ignored.
+    """
+    if (isinstance(obj, LazyConnection) or hasattr(obj, 'execute') or
+            hasattr(type(obj), 'connect')):
+        return None
+    if _is_geometry(obj):
+        return ('geometry', obj.wkb.hex())
+    if hasattr(obj, 'geom') and hasattr(obj, 'name'):
+        return ('region', obj.name, fingerprint(obj.geom))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        rows = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+        names = (list(obj.columns) if isinstance(obj, pd.DataFrame)
+                 else obj.name)
+        return ('table', repr(names), repr(list(obj.index.names)),
+                hashlib.sha256(rows.tobytes()).hexdigest())
+    if isinstance(obj, dict):
+        return tuple(sorted((str(k), fingerprint(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(fingerprint(v) for v in obj)
+    return repr(obj)
+
+
+def cache_key(func, args=(), kwargs=None, tag=None):
+    """Return the hex digest identifying a function call."""
+    description = (func.__module__, func.__qualname__, fingerprint(args),
+                   fingerprint(kwargs or {}), fingerprint(tag))
+    return hashlib.sha256(repr(description).encode('utf-8')).hexdigest()
+
+
+def _write_table(obj, path):
+    """Store a DataFrame or Series, parquet preferred. Returns file name."""
+    frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+    try:
+        frame.to_parquet(path + '.parquet')
+        return os.path.basename(path) + '.parquet'
+    except (ImportError, ValueError, TypeError):
+        obj.to_pickle(path + '.pkl')
+        return os.path.basename(path) + '.pkl'
+
+
+def _write_part(obj, path):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return {'kind': 'series' if isinstance(obj, pd.Series) else 'table',
+                'file': _write_table(obj, path)}
+    if _is_geometry(obj):
+        with open(path + '.wkb', 'wb') as f:
+            f.write(obj.wkb)
+        return {'kind': 'geometry', 'file': os.path.basename(path) + '.wkb'}
+    with open(path + '.pkl', 'wb') as f:
+        pickle.dump(obj, f)
+    return {'kind': 'pickle', 'file': os.path.basename(path) + '.pkl'}
+
+
+def _read_part(part, directory):
+    path = os.path.join(directory, part['file'])
+    if part['kind'] == 'geometry':
+        from shapely import wkb
+        with open(path, 'rb') as f:
+            return wkb.loads(f.read())
+    if part['kind'] in ('table', 'series'):
+        if path.endswith('.parquet'):
+            obj = pd.read_parquet(path)
+            return obj.iloc[:, 0] if part['kind'] == 'series' else obj
+        return pd.read_pickle(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class DiskCache:
+    r"""Content addressed on-disk cache with size bounded eviction.
+
+    Parameters
+    ----------
+    path : str
+        Cache directory (default: ~/.oemof/cache).
+    max_size : int
+        Maximum size in bytes. The least recently used entries are removed
+        if the cache grows beyond this size.
+
+    The size of the cache is scanned once per process and directory and
+    then counted up by set(), the cache is only scanned again if this
+    count exceeds max_size. Entries stored by other processes are
+    counted by their next scan.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_size=2 * 1024 ** 3):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def _size_key(self):
+        return os.path.abspath(self.path)
+
+    def has(self, key):
+        """Return True if the key is cached (without reading the value)."""
+        return os.path.isfile(os.path.join(self._entry(key), 'manifest.json'))
+
+    def get(self, key):
+        """Return the cached value or raise KeyError."""
+        directory = self._entry(key)
+        manifest = os.path.join(directory, 'manifest.json')
+        if not os.path.isfile(manifest):
+            raise KeyError(key)
+        with open(manifest) as f:
+            meta = json.load(f)
+        # Touch the manifest to mark the entry as recently used.
+        os.utime(manifest)
+        parts = [_read_part(p, directory) for p in meta['parts']]
+        return tuple(parts) if meta['tuple'] else parts[0]
+
+    def set(self, key, value, function='', evict=True):
+        """Store a value (a single object or a tuple of objects).
+
+        Use evict=False to store many entries and call evict() once.
+        """
+        directory = self._entry(key)
+        # Unique temporary directory, several processes may share the cache.
+        tmp = '{0}.{1}.tmp'.format(directory, os.getpid())
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        is_tuple = isinstance(value, tuple)
+        parts = [_write_part(v, os.path.join(tmp, 'part{0}'.format(n)))
+                 for n, v in enumerate(value if is_tuple else (value,))]
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+            json.dump({'function': function, 'created': time.time(),
+                       'tuple': is_tuple, 'parts': parts}, f)
+        size = sum(os.path.getsize(os.path.join(tmp, n))
+                   for n in os.listdir(tmp))
+        shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # Another process stored the same entry in the meantime.
+            shutil.rmtree(tmp, ignore_errors=True)
+        if self._size_key() in _sizes:
+            _sizes[self._size_key()] += size
+        if evict:
+            self.evict()
+
+    def call(self, func, *args, tag=None, **kwargs):
+        r"""Return ``func(*args, **kwargs)`` from the cache or compute it.
+
+        Database connections among the arguments are not part of the key,
+        `tag` (e.g. the year of the data) is.
+        """
+        key = cache_key(func, args, kwargs, tag)
+        try:
+            value = self.get(key)
+            logging.debug('Cache hit for {0}.'.format(func.__qualname__))
+            return value
+        except KeyError:
+            pass
+        logging.info('Cache miss for {0}, calling it.'.format(
+            func.__qualname__))
+        value = func(*args, **kwargs)
+        self.set(key, value, function=func.__qualname__)
+        return value
+
+    def entries(self):
+        """Return a DataFrame with function, size and last use of all
+        entries.
+
+        Entries removed by another process during the scan and entries
+        that are still being written are skipped.
+        """
+        rows = []
+        for key in os.listdir(self.path):
+            if key.endswith('.tmp'):
+                continue
+            manifest = os.path.join(self._entry(key), 'manifest.json')
+            try:
+                with open(manifest) as f:
+                    function = json.load(f)['function']
+                size = sum(os.path.getsize(os.path.join(self._entry(key), n))
+                           for n in os.listdir(self._entry(key)))
+                last_used = os.path.getmtime(manifest)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            rows.append({'key': key, 'function': function, 'size': size,
+                         'last_used': last_used})
+        return pd.DataFrame(rows, columns=['key', 'function', 'size',
+                                           'last_used'])
+
+    def size(self):
+        """Total size of the cache in bytes."""
+        return int(self.entries()['size'].sum())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits.
+
+        Nothing is done (and the cache is not scanned) while the counted
+        size is below max_size.
+        """
+        if _sizes.get(self._size_key(), np.inf) <= self.max_size:
+            return
+        entries = self.entries().sort_values('last_used', ascending=False)
+        total = entries['size'].cumsum()
+        fits = total <= self.max_size
+        _sizes[self._size_key()] = int(entries.loc[fits, 'size'].sum())
+        for key in entries.loc[~fits, 'key']:
+            logging.info('Evicting cache entry {0}.'.format(key))
+            try:
+                shutil.rmtree(self._entry(key))
+            except FileNotFoundError:
+                # Removed by another process in the meantime.
+                pass
+
+    def invalidate(self, func=None):
+        r"""Remove all entries of a function (or all entries if None).
+
+        `func` may be the function itself or its qualified name.
+        """
+        name = getattr(func, '__qualname__', func)
+        entries = self.entries()
+        if name is not None:
+            entries = entries[entries['function'] == name]
+        for key in entries['key']:
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+        if self._size_key() in _sizes:
+            _sizes[self._size_key()] -= int(entries['size'].sum())
+        return len(entries)
+
+    def clear(self):
+        """Remove all entries."""
+        return self.invalidate()
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk database access for many regions.
+
+The oemof.db functions fetch one region per call (get_polygon_from_nuts,
+get_bnetza_pps, get_energymap_pps per weather cell, get_windzone per cell,
+coastdat.get_weather), so the number of round trips grows with the number
+of regions and cells. DataAccess fetches every table once for all regions:
+
+* the region polygons with one ``IN`` query,
+* the points of a plant table (power plants, energymap) within the
+  bounding box of all regions in one query,
+* the weather cells of the union of all regions with one get_weather call.
+
+The rows are tagged by region (and weather cell) locally with an STRtree of
+the polygons and split with a groupby. The queries run on a bounded
+connection pool (pool_size + max_overflow connections) and the independent
+tables are fetched in parallel threads. Call after_fork() in a forked
+worker process before using a DataAccess of the parent.
+
+The table and column names are set in TABLES and can be changed per
+instance (`tables`), e.g. for a local stand-in database::
+
+    access = DataAccess('sqlite:///standin.db', tables={
+        'nuts': {'geom': 'geom'},
+        'bnetza': {'x': 'lon', 'y': 'lat'}})
+    geoms = access.polygons(['DE3', 'DE4'])
+    pps = access.power_plants(geoms)
+
+@author: uwe
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+# Table, key and geometry columns (SQL expressions) of the oemof.db
+# functions get_polygon_from_nuts, get_bnetza_pps, get_energymap_pps and
+# get_windzone. Polygons are read as WKT in EPSG:4326, points as x (lon) and
+# y (lat). The plant types are translated like in oemof.db (translate).
+TABLES = {
+    'nuts': {'table': 'oemof.geo_nuts_rg_2013', 'id': 'nuts_id',
+             'geom': 'ST_AsText(ST_Transform(geom, 4326))'},
+    'bnetza': {'table': 'oemof_test.geo_power_plant_bnetza_2014',
+               'columns': {'type': 'auswertung',
+                           'subtype': 'ersatzbrennstoff',
+                           'cap': 'el_nennleistung'},
+               'x': 'ST_X(ST_Transform(geom, 4326))',
+               'y': 'ST_Y(ST_Transform(geom, 4326))'},
+    'energymap': {'table': 'oemof_test.energy_map',
+                  'columns': {'type': 'anlagentyp', 'subtype': 'anuntertyp',
+                              'cap': 'p_nenn_kwp'},
+                  'x': 'ST_X(geom)', 'y': 'ST_Y(geom)'},
+    'windzone': {'table': 'oemof_test.windzones', 'id': 'zone',
+                 'geom': 'ST_AsText(geom)'}}
+
+# Feed-in type of the (translated) plant types of the energymap table.
+RES_TYPES = {'solar_power': 'pv_pwr', 'wind_power': 'wind_pwr'}
+
+
+def translate(df, column='type'):
+    r"""Translate the German plant types like the oemof.db functions."""
+    from oemof.db import powerplants
+    df[column] = df[column].apply(powerplants.translator)
+    return df
+
+
+def tag(x, y, geoms):
+    r"""Assign points to the polygons containing them.
+
+    Points on the boundary of a polygon do not belong to it (like
+    ST_Contains), so a point on the border of two regions is not counted
+    twice.
+
+    Parameters
+    ----------
+    x, y : array like
+        Coordinates of the points.
+    geoms : dict
+        Polygon per name.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        (point positions, names). A point in several polygons appears once
+        per polygon, points outside of all polygons are missing.
+    """
+    names = np.asarray(list(geoms), dtype=object)
+    if not len(names) or not len(x):
+        return np.zeros(0, dtype=int), names[:0]
+    tree = shapely.STRtree(np.asarray(list(geoms.values())))
+    points = shapely.points(np.asarray(x, dtype=float),
+                            np.asarray(y, dtype=float))
+    found, polygon = tree.query(points, predicate='within')
+    return found, names[polygon]
+
+
+def split(df, by='region', names=()):
+    r"""Split a tagged table into one table per value of `by`.
+
+    Every name of `names` gets a (maybe empty) table.
+    """
+    tables = {n: df.iloc[:0].drop(columns=by) for n in names}
+    for name, group in df.groupby(by, sort=False):
+        tables[name] = group.drop(columns=by).reset_index(drop=True)
+    return tables
+
+
+class DataAccess:
+    r"""Bulk queries over a bounded connection pool.
+
+    Parameters
+    ----------
+    url : str, optional
+        SQLAlchemy url, default: the url of the oemof.db configuration.
+    pool_size : int
+        Connections kept open.
+    max_overflow : int
+        Further connections opened under load (closed afterwards).
+    pool_timeout : float
+        Seconds to wait for a free connection.
+    tables : dict, optional
+        Changes of TABLES per table.
+    """
+
+    def __init__(self, url=None, pool_size=4, max_overflow=0,
+                 pool_timeout=30, tables=None):
+        self.url = url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.tables = {name: dict(spec) for name, spec in TABLES.items()}
+        for name, spec in (tables or {}).items():
+            self.tables.setdefault(name, {}).update(spec)
+        self.queries = 0
+        self._engine = None
+
+    @property
+    def engine(self):
+        """SQLAlchemy engine with a QueuePool, created on first use."""
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            from sqlalchemy.pool import QueuePool
+            url = self.url
+            if url is None:
+                from oemof import db
+                url = db.url()
+            self._engine = create_engine(
+                url, poolclass=QueuePool, pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout)
+        return self._engine
+
+    def connect(self):
+        """Return a connection of the pool (close it to give it back)."""
+        return self.engine.connect()
+
+    def after_fork(self):
+        """Give up the connections inherited from the parent process."""
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+
+    def dispose(self):
+        """Close all connections of the pool."""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def read(self, sql, expanding=(), **params):
+        r"""Run a query on a pooled connection and return a DataFrame.
+
+        Parameters listed in `expanding` are lists for ``IN :name``.
+        """
+        from sqlalchemy import bindparam, text
+        query = text(sql)
+        if expanding:
+            query = query.bindparams(
+                *[bindparam(p, expanding=True) for p in expanding])
+        start = time.time()
+        with self.connect() as conn:
+            df = pd.read_sql(query, conn, params=params)
+        self.queries += 1
+        logging.debug('{0} rows in {1:.2f} s: {2}'.format(
+            len(df), time.time() - start, ' '.join(sql.split())))
+        return df
+
+    def polygons(self, ids, table='nuts'):
+        r"""Polygons (union of all rows) per id with one query.
+
+        Returns
+        -------
+        dict
+            Geometry per id, in the order of `ids`.
+        """
+        spec = self.tables[table]
+        df = self.read(
+            'SELECT {id} AS id, {geom} AS wkt FROM {table} '
+            'WHERE {id} IN :ids'.format(**spec), expanding=['ids'],
+            ids=list(ids))
+        df['geom'] = shapely.from_wkt(df['wkt'].to_numpy())
+        geoms = {}
+        for key, group in df.groupby('id', sort=False):
+            geoms[key] = shapely.union_all(group['geom'].to_numpy())
+        missing = [i for i in ids if i not in geoms]
+        if missing:
+            raise KeyError('No polygon for {0} in {1}.'.format(
+                missing, spec['table']))
+        return {i: geoms[i] for i in ids}
+
+    def areas(self, table):
+        r"""All polygons of a small table (e.g. wind zones) as a dict."""
+        spec = self.tables[table]
+        df = self.read('SELECT {id} AS id, {geom} AS wkt FROM {table}'.format(
+            **spec))
+        return dict(zip(df['id'], shapely.from_wkt(df['wkt'].to_numpy())))
+
+    def points(self, table, bounds):
+        r"""All rows of a point table within a bounding box, one query.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The columns of the table spec and x, y.
+        """
+        spec = self.tables[table]
+        select = ', '.join('{0} AS {1}'.format(expr, name)
+                           for name, expr in spec['columns'].items())
+        sql = ('SELECT {select}, {x} AS x, {y} AS y FROM {table} '
+               'WHERE {x} BETWEEN :xmin AND :xmax '
+               'AND {y} BETWEEN :ymin AND :ymax').format(
+            select=select, **spec)
+        xmin, ymin, xmax, ymax = bounds
+        return self.read(sql, xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax)
+
+    def tagged_points(self, table, geoms):
+        r"""Rows of a point table within the regions with a region column.
+        """
+        bounds = shapely.total_bounds(np.asarray(list(geoms.values())))
+        df = self.points(table, bounds)
+        rows, names = tag(df['x'], df['y'], geoms)
+        df = df.iloc[rows].reset_index(drop=True)
+        df['region'] = names
+        return df
+
+    def power_plants(self, geoms):
+        r"""Power plants of all regions (one query).
+
+        Returns
+        -------
+        dict
+            Table with the columns type (translated), subtype and cap per
+            region, like ``get_bnetza_pps``.
+        """
+        df = translate(self.tagged_points('bnetza', geoms))
+        return split(df.drop(columns=['x', 'y']), names=geoms)
+
+    def weather(self, geoms, year):
+        r"""Weather cells (FeedinWeather) of all regions, one get_weather
+        call for the union of the regions.
+
+        Returns
+        -------
+        dict
+            List of the cells intersecting the region per region.
+        """
+        from oemof.db import coastdat
+        union = shapely.union_all(np.asarray(list(geoms.values())))
+        start = time.time()
+        with self.connect() as conn:
+            cells = coastdat.get_weather(conn, union, year)
+        self.queries += 1
+        if not isinstance(cells, list):
+            cells = [cells]
+        logging.info('Fetched {0} weather cells in {1:.1f} s.'.format(
+            len(cells), time.time() - start))
+        polygons = np.asarray([w.geometry for w in cells])
+        tree = shapely.STRtree(polygons)
+        weather = {}
+        for name, geom in geoms.items():
+            found = np.sort(tree.query(geom, predicate='intersects'))
+            # Cells that only touch the border do not belong to the region.
+            found = found[~shapely.touches(polygons[found], geom)]
+            weather[name] = [cells[i] for i in found]
+        return weather
+
+    def res_capacities(self, geoms, weather):
+        r"""Installed wind and pv capacity and wind class per weather cell
+        of all regions (one query for the plants, one for the wind zones).
+
+        Parameters
+        ----------
+        weather : dict
+            Weather cells per region (see :meth:`weather`).
+
+        Returns
+        -------
+        dict
+            Table with the columns cell, pv_pwr, wind_pwr and wind_class
+            per region, like region_data.get_res_capacities.
+        """
+        with ThreadPoolExecutor(2) as pool:
+            plants = pool.submit(self.tagged_points, 'energymap', geoms)
+            zones = pool.submit(self.areas, 'windzone')
+            plants, zones = plants.result(), zones.result()
+        plants['kind'] = translate(plants)['type'].map(RES_TYPES)
+        plants = plants[plants['kind'].notnull()]
+        plants = split(plants, names=weather)
+        tables = {}
+        for name, cells in weather.items():
+            own = plants[name]
+            rows, cell = tag(own['x'], own['y'],
+                             {w.name: w.geometry for w in cells})
+            cap = pd.DataFrame({'cell': cell,
+                                'kind': own['kind'].to_numpy()[rows],
+                                'cap': pd.to_numeric(
+                                    own['cap']).to_numpy()[rows]})
+            cap = cap.pivot_table(index='cell', columns='kind',
+                                  values='cap', aggfunc='sum')
+            cap = cap.reindex(index=[w.name for w in cells],
+                              columns=['pv_pwr', 'wind_pwr']).fillna(0)
+            cap.columns.name = None
+            centroids = shapely.centroid(
+                np.asarray([w.geometry for w in cells]))
+            zone_rows, zone = tag(shapely.get_x(centroids),
+                                  shapely.get_y(centroids), zones)
+            wind_class = np.zeros(len(cells), dtype=int)
+            wind_class[zone_rows] = zone.astype(int)
+            cap['wind_class'] = wind_class
+            tables[name] = cap.rename_axis('cell').reset_index()
+        return tables
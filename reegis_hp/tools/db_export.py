@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming export of database queries to csv or parquet files.
+
+The rows are fetched with a server side cursor in batches of a fixed size
+and every batch is written to the file before the next one is fetched, so
+the memory does not depend on the size of the table.
+
+All batches of a parquet file are written with one schema. Without an
+explicit schema the type of a column is taken from the first batch with a
+value in it (up to 10 batches are kept for that), columns without any
+value are strings.
+
+@author: uwe
+"""
+import logging
+import os
+import time
+
+import pandas as pd
+
+
+def _write_csv(path, schema=None):
+    first = [True]
+
+    def write(df):
+        df.to_csv(path, mode='w' if first[0] else 'a', header=first[0],
+                  index=False)
+        first[0] = False
+
+    return write, lambda: None
+
+
+def _write_parquet(path, schema=None, pending_batches=10):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    state = {'schema': schema, 'writer': None}
+    pending = []
+
+    def fields():
+        # Type of every column: the first pending batch with a value in it.
+        found = {}
+        for df in pending:
+            for f in pa.Schema.from_pandas(df, preserve_index=False):
+                if f.name not in found or pa.types.is_null(
+                        found[f.name].type):
+                    found[f.name] = f
+        return list(found.values())
+
+    def flush():
+        if state['schema'] is None:
+            # Columns without any value are strings.
+            state['schema'] = pa.schema([
+                f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                for f in fields()])
+        if state['writer'] is None:
+            state['writer'] = pq.ParquetWriter(path, state['schema'])
+        while pending:
+            # Every batch is cast to the schema of the file, a batch with
+            # other types (e.g. NULLs in an integer column) would break the
+            # writer.
+            try:
+                table = pa.Table.from_pandas(
+                    pending.pop(0), schema=state['schema'],
+                    preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise TypeError('Batch does not match the parquet schema '
+                                '{0}: {1}. Pass the schema.'.format(
+                                    state['schema'], e))
+            state['writer'].write_table(table)
+
+    def write(df):
+        pending.append(df)
+        # Batches are kept until every column has a value (at most
+        # pending_batches), so a column that starts with NULLs gets the
+        # type of its values.
+        if (state['schema'] is not None or
+                len(pending) >= pending_batches or
+                not any(pa.types.is_null(f.type) for f in fields())):
+            flush()
+
+    def close():
+        try:
+            if pending:
+                flush()
+        finally:
+            if state['writer'] is not None:
+                state['writer'].close()
+
+    return write, close
+
+
+WRITERS = {'csv': _write_csv, 'parquet': _write_parquet}
+
+
+def export_query(conn, sql, filename, batch_size=50000, fmt=None,
+                 log_every=10, schema=None):
+    r"""Stream the result of a query to a file.
+
+    Parameters
+    ----------
+    conn : sqlalchemy connection
+        E.g. ``oemof.db.connection()``.
+    sql : str
+        The query.
+    filename : str
+        Output file. The format is taken from the extension if `fmt` is
+        not given (.csv or .parquet).
+    batch_size : int
+        Number of rows fetched and written at once.
+    fmt : str, optional
+        'csv' or 'parquet'.
+    log_every : int
+        Log the progress every `log_every` batches.
+    schema : pyarrow.Schema, optional
+        Schema of a parquet file, default: the types of the first batch.
+
+    Returns
+    -------
+    int
+        Number of exported rows.
+    """
+    if fmt is None:
+        fmt = 'parquet' if filename.endswith('.parquet') else 'csv'
+    write, close = WRITERS[fmt](filename, schema)
+
+    logging.info("SQL query: {0}".format(sql))
+    start = time.time()
+    # stream_results makes psycopg2 use a named (server side) cursor.
+    results = conn.execution_options(stream_results=True).execute(sql)
+    columns = results.keys()
+    rows = 0
+    batches = 0
+    try:
+        while True:
+            batch = results.fetchmany(batch_size)
+            if not batch:
+                break
+            write(pd.DataFrame(batch, columns=columns))
+            rows += len(batch)
+            batches += 1
+            if batches % log_every == 0:
+                elapsed = time.time() - start
+                logging.info('{0} rows exported ({1:.0f} rows/s).'.format(
+                    rows, rows / elapsed if elapsed else 0))
+        if not rows:
+            # An empty result still gets a file with the column names.
+            write(pd.DataFrame(columns=list(columns)))
+    finally:
+        results.close()
+        close()
+    elapsed = time.time() - start
+    logging.info('Exported {0} rows to {1} in {2:.1f} s ({3:.0f} rows/s, '
+                 '{4:.1f} MB).'.format(
+                     rows, filename, elapsed, rows / elapsed if elapsed else 0,
+                     os.path.getsize(filename) / 1e6))
+    return rows
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Standard load profiles of electricity (SLP) and heat (SHLP) demand.
+
+Every building entry of the run scripts (define_elec_buildings,
+define_heat_buildings) has an annual demand and a profile type. All entries
+with the same profile share one normalised profile, so the demand of
+thousands of buildings is a matrix product:
+
+    (regions x profiles) annual demand  @  (profiles x hours) profiles
+
+The profiles are the BDEW profiles of demandlib, which ships the
+coefficient tables:
+
+* electricity: ``bdew.ElecSlp`` (h0, g0 ... g6, l0 ... l2, h0_dyn) and the
+  step profile of ``particular_profiles.IndustrialLoadProfile`` (i0),
+  summed to hours;
+* heat: ``bdew.HeatBuilding`` (efh, mfh, ghd ...) with the allocation
+  temperature, weekday factors and the temperature dependent hourly
+  factors.
+
+demandlib computes one profile at a time. The profiles are memoised per
+(year, holidays) and (temperature series, profile type, wind and building
+class) in memory and, with a cache path, in the DiskCache on disk.
+
+@author: uwe
+"""
+import calendar
+import logging
+
+import numpy as np
+import pandas as pd
+from demandlib import bdew, particular_profiles
+
+from reegis_hp.tools import cache
+
+
+def hours_of_year(year):
+    return 8784 if calendar.isleap(year) else 8760
+
+
+def time_index(year):
+    r"""Hourly time index of the whole year (8784 hours in leap years)."""
+    return pd.date_range('1/1/{0}'.format(year), periods=hours_of_year(year),
+                         freq=pd.offsets.Hour())
+
+
+def _holidays(holidays):
+    """demandlib expects a dict {date: name}."""
+    return {pd.Timestamp(day).date(): 'holiday' for day in holidays}
+
+
+def elec_profiles(year, holidays=()):
+    r"""Normalised (sum one) hourly electricity profiles of a year.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One column per selp_type (the BDEW types of demandlib and i0).
+    """
+    slp = bdew.ElecSlp(year, holidays=_holidays(holidays))
+    df = slp.slp_frame.copy()
+    df['i0'] = particular_profiles.IndustrialLoadProfile(
+        slp.date_time_index, holidays=_holidays(holidays)).simple_profile(1)
+    df = df.resample(pd.offsets.Hour()).sum()
+    return df / df.sum()
+
+
+def heat_profile(temperature, shlp_type, wind_class=0, building_class=0,
+                 holidays=()):
+    r"""Normalised (sum one) hourly heat profile.
+
+    Parameters
+    ----------
+    temperature : pandas.Series
+        Hourly air temperature in degC with a DatetimeIndex.
+    shlp_type : str
+        BDEW type of demandlib (e.g. efh, mfh, ghd).
+    """
+    profile = bdew.HeatBuilding(
+        temperature.index, temperature=temperature, shlp_type=shlp_type,
+        wind_class=wind_class, building_class=building_class,
+        annual_heat_demand=1, holidays=_holidays(holidays),
+        name=shlp_type).get_bdew_profile()
+    profile = np.asarray(profile, dtype=float)
+    return pd.Series(profile / profile.sum(), index=temperature.index)
+
+
+def _buildings(buildings):
+    if isinstance(buildings, pd.DataFrame):
+        return buildings
+    return pd.DataFrame(list(buildings))
+
+
+class DemandEngine:
+    r"""Demand series of many buildings with memoised profiles.
+
+    Parameters
+    ----------
+    cache_path : str, optional
+        Store the profiles in a DiskCache as well, so that later runs and
+        other processes reuse them.
+    """
+
+    def __init__(self, cache_path=None):
+        self.store = cache.DiskCache(cache_path) if cache_path else None
+        self._memo = {}
+
+    def _profile(self, func, *args, **kwargs):
+        key = cache.cache_key(func, args, kwargs)
+        if key not in self._memo:
+            if self.store is not None:
+                self._memo[key] = self.store.call(func, *args, **kwargs)
+            else:
+                self._memo[key] = func(*args, **kwargs)
+        return self._memo[key]
+
+    def elec_profile(self, year, selp_type, holidays=()):
+        profiles = self._profile(elec_profiles, year,
+                                 holidays=tuple(holidays))
+        if selp_type not in profiles:
+            raise ValueError('Unknown selp_type {0}, use one of {1}.'.format(
+                selp_type, list(profiles.columns)))
+        return profiles[selp_type]
+
+    def heat_profile(self, temperature, shlp_type, wind_class=0,
+                     building_class=0, holidays=()):
+        return self._profile(heat_profile, temperature, shlp_type,
+                             wind_class=wind_class,
+                             building_class=building_class,
+                             holidays=tuple(holidays))
+
+    def profiles(self, buildings, carrier, year, temperature=None,
+                 holidays=()):
+        r"""Return the profile matrix and the profile of every building.
+
+        Returns
+        -------
+        tuple
+            (profiles x hours array, profile number of every building)
+        """
+        df = _buildings(buildings)
+        if carrier == 'elec':
+            columns = ['selp_type']
+            make = lambda k: self.elec_profile(year, k[0], holidays)
+        else:
+            if temperature is None:
+                raise ValueError('Heat profiles need a temperature series.')
+            df = df.assign(wind_class=df.get('wind_class', 0),
+                           building_class=df.get('building_class', 0))
+            columns = ['shlp_type', 'wind_class', 'building_class']
+            make = lambda k: self.heat_profile(
+                temperature, k[0], int(k[1]), int(k[2]), holidays)
+        if len(df) == 0:
+            return np.zeros((0, hours_of_year(year))), np.zeros(0, int)
+        codes = df.groupby(columns, sort=False).ngroup().to_numpy()
+        unique = df[columns].drop_duplicates().itertuples(index=False)
+        matrix = np.vstack([make(tuple(k)).to_numpy() for k in unique])
+        return matrix, codes
+
+    def building_matrix(self, buildings, carrier, year, temperature=None,
+                        holidays=()):
+        r"""Hourly demand of every building (buildings x hours)."""
+        df = _buildings(buildings)
+        matrix, codes = self.profiles(df, carrier, year, temperature,
+                                      holidays)
+        annual = df['annual_{0}_demand'.format(carrier)].to_numpy(float)
+        return annual[:, np.newaxis] * matrix[codes]
+
+    def aggregate(self, buildings, carrier, year, temperature=None,
+                  holidays=(), by='region'):
+        r"""Hourly demand per group of buildings (e.g. per region).
+
+        The annual demand is summed per group and profile first, so the
+        buildings x hours matrix is never built.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One column per group (one column `carrier` without `by`).
+        """
+        df = _buildings(buildings)
+        matrix, codes = self.profiles(df, carrier, year, temperature,
+                                      holidays)
+        annual = df['annual_{0}_demand'.format(carrier)].to_numpy(float)
+        if by is not None and by in df:
+            groups, group_codes = np.unique(df[by].to_numpy(),
+                                            return_inverse=True)
+        else:
+            groups, group_codes = [carrier], np.zeros(len(df), dtype=int)
+        weights = np.zeros((len(groups), len(matrix)))
+        np.add.at(weights, (group_codes, codes), annual)
+        return pd.DataFrame((weights @ matrix).T, index=time_index(year),
+                            columns=list(groups))
+
+    def region_demand(self, year, elec_buildings=(), heat_buildings=(),
+                      temperature=None, region=None, holidays=()):
+        r"""Electricity and heat demand of one region.
+
+        Building entries with a `region` column are filtered by `region`,
+        entries without it count for every region.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Columns 'elec' and (with heat buildings) 'heat'.
+        """
+        demand = pd.DataFrame(index=time_index(year))
+        for carrier, buildings in (('elec', elec_buildings),
+                                   ('heat', heat_buildings)):
+            df = _buildings(buildings)
+            if region is not None and 'region' in df:
+                df = df[df['region'] == region]
+            if len(df) == 0:
+                continue
+            demand[carrier] = self.aggregate(
+                df, carrier, year, temperature, holidays, by=None)[carrier]
+        logging.debug('Demand of {0}: {1}'.format(region, demand.sum()))
+        return demand
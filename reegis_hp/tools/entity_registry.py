@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed entity container for oemof energy systems.
+
+The example scripts look up buses with list comprehensions over all entities
+of the energy system. Replacing ``EnergySystem.entities`` with an
+:class:`EntityIndex` keeps the list behaviour (``EnergySystem.add`` still
+calls ``append``) but answers look-ups by uid, type and region in constant
+time.
+
+@author: uwe
+"""
+
+
+def _region_names(entity):
+    return [getattr(r, 'name', r) for r in getattr(entity, 'regions', [])]
+
+
+class EntityIndex(list):
+    r"""A list of entities with hash indices on uid, type and region.
+
+    All mutating list methods keep the indices in sync. If the uid of an
+    entity is changed in place (e.g. ``entity.uid = str(entity.uid)``) call
+    :meth:`reindex` afterwards.
+
+    Entities with the same uid are allowed (the scripts create more than one
+    'rgas' commodity), :meth:`lookup` returns all of them.
+    """
+
+    def __init__(self, entities=()):
+        super().__init__()
+        self._clear_index()
+        self.extend(entities)
+
+    def __reduce__(self):
+        # EnergySystem.dump() pickles the entity list, make sure the indices
+        # are rebuilt on restore.
+        return self.__class__, (list(self),)
+
+    # ---- index maintenance ----------------------------------------------
+    def _clear_index(self):
+        self._by_uid = {}
+        self._by_type = {}
+        self._by_region = {}
+
+    def _add_to_index(self, entity):
+        key = id(entity)
+        self._by_uid.setdefault(entity.uid, {})[key] = entity
+        self._by_type.setdefault(getattr(entity, 'type', None), {})[
+            key] = entity
+        for name in _region_names(entity):
+            self._by_region.setdefault(name, {})[key] = entity
+
+    def _remove_from_index(self, entity):
+        key = id(entity)
+        for index, names in (
+                (self._by_uid, [entity.uid]),
+                (self._by_type, [getattr(entity, 'type', None)]),
+                (self._by_region, _region_names(entity))):
+            for name in names:
+                bucket = index.get(name, {})
+                bucket.pop(key, None)
+                if not bucket:
+                    index.pop(name, None)
+
+    def reindex(self):
+        """Rebuild all indices, e.g. after uids have been changed in place."""
+        self._clear_index()
+        for entity in self:
+            self._add_to_index(entity)
+
+    # ---- look-ups ---------------------------------------------------------
+    def lookup(self, uid):
+        """Return a list of all entities with the given uid."""
+        return list(self._by_uid.get(uid, {}).values())
+
+    def get(self, uid, default=None):
+        """Return the first entity with the given uid or `default`."""
+        for entity in self._by_uid.get(uid, {}).values():
+            return entity
+        return default
+
+    def has(self, uid):
+        """Return True if at least one entity with the given uid exists."""
+        return uid in self._by_uid
+
+    def by_type(self, type):
+        """Return all entities whose `type` attribute equals `type`."""
+        return list(self._by_type.get(type, {}).values())
+
+    def by_region(self, name):
+        """Return all entities attached to the region with the given name."""
+        return list(self._by_region.get(name, {}).values())
+
+    def remove_many(self, entities):
+        """Remove several entities in one pass over the list."""
+        drop = {id(e) for e in entities}
+        kept = [e for e in self if id(e) not in drop]
+        for entity in self:
+            if id(entity) in drop:
+                self._remove_from_index(entity)
+        super().__setitem__(slice(None), kept)
+
+    # ---- list interface ---------------------------------------------------
+    def append(self, entity):
+        super().append(entity)
+        self._add_to_index(entity)
+
+    def extend(self, entities):
+        for entity in entities:
+            self.append(entity)
+
+    def __iadd__(self, entities):
+        self.extend(entities)
+        return self
+
+    def insert(self, i, entity):
+        super().insert(i, entity)
+        self._add_to_index(entity)
+
+    def remove(self, entity):
+        super().remove(entity)
+        self._remove_from_index(entity)
+
+    def pop(self, i=-1):
+        entity = super().pop(i)
+        self._remove_from_index(entity)
+        return entity
+
+    def clear(self):
+        super().clear()
+        self._clear_index()
+
+    def __setitem__(self, i, value):
+        old = self[i] if isinstance(i, slice) else [self[i]]
+        for entity in old:
+            self._remove_from_index(entity)
+        super().__setitem__(i, value)
+        new = self[i] if isinstance(i, slice) else [self[i]]
+        for entity in new:
+            self._add_to_index(entity)
+
+    def __delitem__(self, i):
+        old = self[i] if isinstance(i, slice) else [self[i]]
+        super().__delitem__(i)
+        for entity in old:
+            self._remove_from_index(entity)
+
+
+def index_entities(esystem):
+    r"""Replace the entity list of `esystem` by an :class:`EntityIndex`.
+
+    Call this directly after creating the energy system. Entities created
+    afterwards are indexed automatically because oemof registers them with
+    ``esystem.entities.append``.
+
+    Returns
+    -------
+    EntityIndex
+    """
+    if not isinstance(esystem.entities, EntityIndex):
+        esystem.entities = EntityIndex(esystem.entities)
+    return esystem.entities
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Batched wind and pv feed-in of many weather cells.
+
+``feedin_pg.Feedin().aggregate_cap_val`` creates the feedinlib power plants
+and computes the feed-in of every weather cell for every region, so cells
+shared by neighbouring regions and every later run compute the same series
+again. Here the cells are grouped by technology (wind: turbine type, hub
+height and rotor diameter of the wind class; pv: module and orientation).
+The feedinlib power plant of a technology is created once and its
+normalised feed-in (per W installed) is computed only for the cells that
+are not cached yet. The series are cached per (year, cell, technology) and
+scaled with the installed capacity of the cells in one matrix product.
+
+The feedinlib models scale linearly with the installed capacity, so the
+result is the one of ``aggregate_cap_val`` with the same capacities and
+wind classes.
+
+@author: uwe
+"""
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import cache
+
+Technology = namedtuple('Technology', ['kind', 'model', 'height', 'rotor',
+                                       'tilt', 'azimuth', 'albedo'])
+
+
+def technologies(site):
+    r"""Technology per (feed-in type, wind class) of a site dict.
+
+    Wind classes are taken from h_hub_dc, d_rotor_dc and wka_model_dc, the
+    plain h_hub, d_rotor and wka_model are the default (like feedin_pg).
+    """
+    classes = (set(site.get('wka_model_dc', {})) |
+               set(site.get('h_hub_dc', {})) |
+               set(site.get('d_rotor_dc', {})) | {0})
+    techs = {}
+    for wc in sorted(classes):
+        techs[('wind_pwr', wc)] = Technology(
+            'wind', site.get('wka_model_dc', {}).get(wc, site['wka_model']),
+            site.get('h_hub_dc', {}).get(wc, site['h_hub']),
+            site.get('d_rotor_dc', {}).get(wc, site['d_rotor']),
+            None, None, None)
+    techs[('pv_pwr', 0)] = Technology(
+        'pv', site['module_name'], None, None, site['tilt'],
+        site['azimuth'], site['albedo'])
+    return techs
+
+
+def power_plant(tech, plants, site=None):
+    r"""feedinlib power plant of a technology.
+
+    Parameters
+    ----------
+    plants : module
+        Module with the classes WindPowerPlant and Photovoltaic
+        (feedinlib.powerplants).
+    site : dict, optional
+        Further attributes of the plant.
+    """
+    attributes = dict(site or {})
+    if tech.kind == 'wind':
+        attributes.update(wind_conv_type=tech.model, h_hub=tech.height,
+                          d_rotor=tech.rotor)
+        return plants.WindPowerPlant(**attributes)
+    attributes.update(module_name=tech.model, tilt=tech.tilt,
+                      azimuth=tech.azimuth, albedo=tech.albedo)
+    return plants.Photovoltaic(**attributes)
+
+
+def normalised_feedin(plant, tech, weather):
+    r"""Feed-in of one weather cell per W installed."""
+    if tech.kind == 'wind':
+        return plant.feedin(weather=weather, installed_capacity=1)
+    return plant.feedin(weather=weather, peak_power=1)
+
+
+class FeedinStage:
+    r"""Normalised feed-in of weather cells with a cache per cell.
+
+    Parameters
+    ----------
+    cache_path : str, optional
+        DiskCache directory, without it the series are only kept in memory.
+    plants : module, optional
+        Power plant classes (default: feedinlib.powerplants).
+    """
+
+    def __init__(self, cache_path=None, plants=None):
+        self.store = cache.DiskCache(cache_path) if cache_path else None
+        if plants is None:
+            from feedinlib import powerplants as plants
+        self.plants = plants
+        self._memo = {}
+        self._power_plants = {}
+
+    def _key(self, year, cell, tech):
+        return cache.cache_key(FeedinStage.normalised,
+                               (year, str(cell), tuple(tech)))
+
+    def _get(self, key):
+        if key in self._memo:
+            return self._memo[key]
+        if self.store is not None:
+            try:
+                self._memo[key] = self.store.get(key)
+                return self._memo[key]
+            except KeyError:
+                pass
+        return None
+
+    def power_plant(self, tech, site=None):
+        """Power plant of a technology, created once."""
+        if tech not in self._power_plants:
+            self._power_plants[tech] = power_plant(tech, self.plants, site)
+        return self._power_plants[tech]
+
+    def normalised(self, weather, year, tech, site=None):
+        r"""Normalised feed-in of all cells for one technology.
+
+        Only cells that are not cached are computed.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One column per cell (name of the weather object).
+        """
+        series = {}
+        missing = []
+        for w in weather:
+            value = self._get(self._key(year, w.name, tech))
+            if value is None:
+                missing.append(w)
+            else:
+                series[w.name] = value
+        if missing:
+            plant = self.power_plant(tech, site)
+            for w in missing:
+                s = pd.Series(np.asarray(normalised_feedin(plant, tech, w),
+                                         dtype=float), index=w.data.index)
+                key = self._key(year, w.name, tech)
+                self._memo[key] = s
+                if self.store is not None:
+                    self.store.set(key, s, function='feedin', evict=False)
+                series[w.name] = s
+            if self.store is not None:
+                self.store.evict()
+            logging.debug('Computed {0} of {1} cells for {2}.'.format(
+                len(missing), len(weather), tech.model))
+        return pd.DataFrame(series)[[w.name for w in weather]]
+
+    def aggregate(self, weather, year, site, capacities):
+        r"""Feed-in of a region like ``Feedin().aggregate_cap_val``.
+
+        Parameters
+        ----------
+        weather : list of FeedinWeather
+        capacities : pandas.DataFrame
+            Installed capacity per cell with the columns cell (name of the
+            weather object), wind_pwr, pv_pwr and wind_class.
+
+        Returns
+        -------
+        tuple
+            (feed-in per W installed per type, installed capacity per type).
+            A type without capacity has no feed-in (zero, not NaN).
+        """
+        techs = technologies(site)
+        capacities = capacities.set_index('cell')
+        weather = [w for w in weather if w.name in capacities.index]
+        if not weather:
+            raise ValueError('None of the weather cells has a capacity '
+                             'entry.')
+        index = weather[0].data.index
+        feedin = pd.DataFrame(index=index)
+        cap = {}
+        for stype in ('pv_pwr', 'wind_pwr'):
+            groups = {}
+            for w in weather:
+                wc = 0
+                if stype == 'wind_pwr' and 'wind_class' in capacities:
+                    wc = capacities.loc[w.name, 'wind_class']
+                key = (stype, wc) if (stype, wc) in techs else (stype, 0)
+                groups.setdefault(key, []).append(w)
+            total = np.zeros(len(index))
+            for key, cells in groups.items():
+                norm = self.normalised(cells, year, techs[key], site)
+                total += norm.to_numpy() @ capacities.loc[
+                    norm.columns, stype].to_numpy(dtype=float)
+            cap[stype] = float(capacities[stype].sum())
+            feedin[stype] = total / cap[stype] if cap[stype] else total
+        return feedin, pd.Series(cap)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Timed phases, memory sampling and profiling of optimisation runs.
+
+Usage::
+
+    run = instrumentation.RunReport(enabled=True, profile='solve')
+    with run.phase('db fetch'):
+        ...
+    with run.phase('model build') as p:
+        om = OptimizationModel(energysystem=esystem)
+        p.counts.update(instrumentation.model_counts(om))
+    run.write('run_report.json')
+
+Every phase logs one line when it ends. If the report is disabled phase()
+returns a shared do-nothing context, so the phases can stay in the scripts.
+
+@author: uwe
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def current_memory_mb():
+    r"""Resident memory of the process in MB (peak memory if unknown)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return peak_memory_mb()
+
+
+def peak_memory_mb():
+    r"""Peak resident memory of the process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+def entity_counts(esystem):
+    r"""Number of entities per class and in total."""
+    counts = Counter(type(e).__name__ for e in esystem.entities)
+    counts['entities'] = len(esystem.entities)
+    return dict(counts)
+
+
+def model_counts(om):
+    r"""Number of variables and constraints of a pyomo model."""
+    import pyomo.environ as po
+    return {
+        'variables': sum(1 for _ in om.component_data_objects(
+            po.Var, active=True)),
+        'constraints': sum(1 for _ in om.component_data_objects(
+            po.Constraint, active=True))}
+
+
+class _NoPhase:
+    r"""Context of a disabled report."""
+
+    @property
+    def counts(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Phase:
+    r"""One timed phase of a run. Use RunReport.phase() to create it."""
+
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+        self.counts = {}
+        self.profiler = None
+
+    def __enter__(self):
+        report = self.report
+        report._stack.append(self.name)
+        self.path = '/'.join(report._stack)
+        self.start = time.time()
+        self.memory_start = current_memory_mb()
+        self.outer_peak = report._sampler.peak
+        report._sampler.reset()
+        if report.profile in (self.name, self.path):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+        duration = time.time() - self.start
+        report = self.report
+        report._stack.pop()
+        record = {
+            'name': self.path,
+            'start': self.start - report.start,
+            'duration': duration,
+            'memory_start_mb': self.memory_start,
+            'memory_peak_mb': max(report._sampler.peak, current_memory_mb()),
+            'counts': dict(self.counts),
+            'failed': exc[0] is not None}
+        if self.profiler is not None:
+            record['profile'] = report.save_profile(self.profiler, self.path)
+        report.phases.append(record)
+        # Phases may be nested, the peak is passed to the parent phase.
+        report._sampler.peak = max(self.outer_peak, record['memory_peak_mb'])
+        logging.info('Phase {0}: {1:.2f} s, {2:.0f} MB peak{3}'.format(
+            self.path, duration, record['memory_peak_mb'],
+            ''.join(', {0}: {1}'.format(k, v)
+                    for k, v in sorted(self.counts.items()))))
+        return False
+
+
+class _Sampler(threading.Thread):
+    r"""Background thread sampling the resident memory."""
+
+    def __init__(self, interval):
+        threading.Thread.__init__(self, daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def reset(self):
+        self.peak = current_memory_mb()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_memory_mb())
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class RunReport:
+    r"""Collect timed phases of a run and write them as a json report.
+
+    Parameters
+    ----------
+    enabled : bool
+        If False, phase() does nothing.
+    profile : str, optional
+        Name (or nested path like 'optimize/solve') of one phase to run
+        under cProfile. The profile is written next to the report.
+    interval : float
+        Memory sampling interval in seconds.
+    directory : str, optional
+        Directory of the profile files (default: current directory).
+    """
+
+    def __init__(self, enabled=True, profile=None, interval=0.1,
+                 directory=None):
+        self.enabled = enabled
+        self.profile = profile
+        self.directory = directory or os.getcwd()
+        self.start = time.time()
+        self.phases = []
+        self.info = {}
+        self._stack = []
+        self._open = []
+        self._sampler = _Sampler(interval)
+        if enabled:
+            self._sampler.start()
+
+    def phase(self, name):
+        r"""Return a context that times the phase `name`."""
+        if not self.enabled:
+            return _NO_PHASE
+        return Phase(self, name)
+
+    def begin(self, name):
+        r"""Start the phase `name` without a with block."""
+        phase = self.phase(name).__enter__()
+        self._open.append(phase)
+        return phase
+
+    def end(self, **counts):
+        r"""End the last phase started with begin()."""
+        phase = self._open.pop()
+        phase.counts.update(counts)
+        phase.__exit__(None, None, None)
+
+    def save_profile(self, profiler, name):
+        r"""Write the cProfile stats of a phase and return their summary."""
+        filename = os.path.join(self.directory, 'profile_{0}.prof'.format(
+            name.replace('/', '_').replace(' ', '_')))
+        profiler.dump_stats(filename)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(
+            'cumulative').print_stats(20)
+        return {'file': filename, 'top': stream.getvalue().splitlines()}
+
+    def report(self):
+        r"""Return the report as a dict."""
+        return {'started': time.strftime(
+                    '%Y-%m-%d %H:%M:%S', time.localtime(self.start)),
+                'duration': time.time() - self.start,
+                'peak_memory_mb': peak_memory_mb(),
+                'info': self.info,
+                'phases': self.phases}
+
+    def write(self, filename=None):
+        r"""Stop the memory sampling and write the json report.
+
+        Nothing is written if the report is disabled or `filename` is None
+        (e.g. a run that only profiles a phase).
+        """
+        if not self.enabled:
+            return
+        self._sampler.stop()
+        if self.profile is not None and not any(
+                'profile' in p for p in self.phases):
+            logging.warning('No phase {0} to profile, the phases are {1}.'
+                            .format(self.profile,
+                                    [p['name'] for p in self.phases]))
+        if filename is None:
+            return
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=1, default=str)
+        logging.info('Run report written to {0}.'.format(filename))
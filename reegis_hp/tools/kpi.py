@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Key figures of optimised energy systems: energy, fuel use, emissions,
+costs, full load hours and curtailment.
+
+The flows of a results store are one (flows x time steps) array, so the
+time dimension is reduced once for all flows (one row sum over the array).
+Everything else works on one value per flow: the flows are grouped by
+their key (region, component, carrier) and combined with the parameters
+per carrier (fuel). Fuel use is the flow from a fuel bus into a component,
+energy the flow from a component into a bus of a product carrier (elec,
+heat).
+
+    params = kpi.parameters(co2_emissions=co2_emissions, opex_var=opex_var,
+                            price=price)
+    table = kpi.summary(results_query.FlowResults(store), params)
+    kpi.write(table, store.path)
+
+Many scenario stores are summarised with :func:`summaries`.
+
+@author: uwe
+"""
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import parallel
+from reegis_hp.tools import results_query
+from reegis_hp.tools import results_store
+
+PRODUCTS = ('elec', 'heat')
+GROUPS = ('region', 'component', 'carrier')
+SUMMARY = 'kpi.csv'
+
+
+def parameters(co2_emissions=None, opex_var=None, price=None):
+    r"""Table of the parameters per carrier.
+
+    Parameters
+    ----------
+    co2_emissions : dict, optional
+        Emissions per MWh of fuel, e.g. t/MWh.
+    opex_var : dict, optional
+        Variable costs per MWh of energy.
+    price : dict, optional
+        Price per MWh of fuel.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by carrier, unknown values are 0.
+    """
+    table = pd.DataFrame({'co2_emissions': pd.Series(co2_emissions or {},
+                                                     dtype=float),
+                          'opex_var': pd.Series(opex_var or {}, dtype=float),
+                          'price': pd.Series(price or {}, dtype=float)})
+    return table.fillna(0)
+
+
+def flow_table(results, date_from=None, date_to=None):
+    r"""One row per flow with its key, meta data and sum over the window.
+
+    The potential of an input is the sum of its 'potential' flow (see
+    results_store.collect_flows) over the same window as the energy.
+
+    Parameters
+    ----------
+    results : reegis_hp.tools.results_query.FlowResults
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    table = pd.DataFrame(results.keys, columns=results_query.FIELDS)
+    meta = pd.DataFrame(results.store.flows)
+    table['bus_type'] = meta['bus_type']
+    table['out_max'] = meta['out_max'] if 'out_max' in meta else np.nan
+    cols = results.store.window(date_from, date_to)
+    table['total'] = np.asarray(results.store.values[:, cols]).sum(axis=1)
+    flow = pd.MultiIndex.from_frame(meta[['bus_uid', 'obj_uid']])
+    potential = (table['direction'] == 'potential').to_numpy()
+    table['potential'] = flow.map(pd.Series(
+        table['total'].to_numpy()[potential], index=flow[potential]))
+    table.loc[table['direction'] != 'input', 'potential'] = np.nan
+    return table
+
+
+def grouped(results, by=GROUPS, date_from=None, date_to=None, **criteria):
+    r"""Sum the flows matching the criteria per group.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Time steps x groups.
+    """
+    frame = results.select(date_from=date_from, date_to=date_to, **criteria)
+    keys = frame.columns.to_frame(index=False)[list(by)]
+    codes = keys.groupby(list(by), dropna=False, sort=True).ngroup()
+    groups = keys.drop_duplicates().assign(code=codes).sort_values('code')
+    indicator = np.zeros((len(frame.columns), len(groups)))
+    indicator[np.arange(len(codes)), codes.to_numpy()] = 1
+    columns = pd.MultiIndex.from_frame(groups[list(by)]) if len(by) > 1 \
+        else pd.Index(groups[by[0]])
+    return pd.DataFrame(frame.to_numpy() @ indicator, index=frame.index,
+                        columns=columns)
+
+
+def summary(results, params=None, by=GROUPS, products=PRODUCTS,
+            date_from=None, date_to=None):
+    r"""Key figures per group of flows.
+
+    Parameters
+    ----------
+    results : reegis_hp.tools.results_query.FlowResults
+    params : pandas.DataFrame, optional
+        Parameters per carrier (see :func:`parameters`).
+    by : tuple
+        Key fields to group by.
+    products : tuple
+        Bus types that count as energy, the outputs of all other buses are
+        fuel.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns energy, fuel, capacity, potential, emissions, costs,
+        full_load_hours, curtailment.
+    """
+    table = flow_table(results, date_from, date_to)
+    product = table['bus_type'].isin(products)
+    energy = product & (table['direction'] == 'input')
+    fuel = ~product & (table['direction'] == 'output')
+    table = table[energy | fuel].assign(
+        energy=table['total'].where(energy, 0),
+        fuel=table['total'].where(fuel, 0),
+        capacity=table['out_max'].where(energy),
+        potential=table['potential'].where(energy))
+    kpi = table.groupby(list(by), dropna=False)[
+        ['energy', 'fuel', 'capacity', 'potential']].sum(min_count=1)
+
+    carrier = kpi.index.get_level_values('carrier') if 'carrier' in by \
+        else None
+    params = parameters() if params is None else params
+    if carrier is None:
+        factors = pd.DataFrame(0.0, index=kpi.index, columns=params.columns)
+    else:
+        factors = params.reindex(carrier).fillna(0).set_axis(kpi.index)
+    kpi['emissions'] = kpi['fuel'] * factors['co2_emissions']
+    kpi['costs'] = (kpi['energy'] * factors['opex_var'] +
+                    kpi['fuel'] * factors['price'])
+    kpi['full_load_hours'] = kpi['energy'] / kpi['capacity'].where(
+        kpi['capacity'] > 0)
+    kpi['curtailment'] = (kpi['potential'] - kpi['energy']).clip(lower=0)
+    return kpi
+
+
+def _summary(path, params, kwargs):
+    return summary(results_query.FlowResults(
+        results_store.ResultsStore(path)), params, **kwargs)
+
+
+def summaries(paths, params=None, workers=1, **kwargs):
+    r"""Summaries of many results stores in one table.
+
+    Parameters
+    ----------
+    paths : dict or list
+        Store directory per scenario name (a list uses the directory names).
+    workers : int or None
+        Processes, 1 summarises in this process.
+    kwargs :
+        Passed to :func:`summary`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by scenario and the groups.
+    """
+    if not isinstance(paths, dict):
+        paths = {os.path.basename(os.path.normpath(p)): p for p in paths}
+    start = time.time()
+    names = list(paths)
+    if workers == 1:
+        tables = [_summary(paths[n], params, kwargs) for n in names]
+    else:
+        with parallel.process_pool(workers) as pool:
+            tables = list(pool.map(_summary, [paths[n] for n in names],
+                                   [params] * len(names),
+                                   [kwargs] * len(names)))
+    logging.info('Summarised {0} scenarios in {1:.2f} s.'.format(
+        len(names), time.time() - start))
+    return pd.concat(tables, keys=names, names=['scenario'])
+
+
+def write(table, path, filename=SUMMARY):
+    r"""Write a summary (rounded to 3 decimals) as csv to `path`."""
+    filename = os.path.join(path, filename)
+    table.round(3).to_csv(filename)
+    logging.info('Key figures written to {0}.'.format(filename))
+    return filename
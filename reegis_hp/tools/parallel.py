@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Process pools for the run scripts.
+
+@author: uwe
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(workers=None, **kwargs):
+    r"""Return a ProcessPoolExecutor with `workers` processes.
+
+    The workers are forked where possible, so they start without importing
+    oemof and pyomo again and share the data already loaded by the parent.
+    The run scripts are guarded by ``if __name__ == '__main__'``, so the
+    spawn start method (the only one on Windows) works as well. Further
+    keyword arguments (e.g. initializer) are passed to the executor.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        'fork' if 'fork' in methods else None)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               **kwargs)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Keep the optimisation model of an energy system alive between runs.
+
+``EnergySystem.optimize()`` builds a new model for every call. If only a
+demand series or a cost coefficient changes, the model can be kept and
+only the changed values are updated:
+
+* series of sinks and fixed sources are fixed values (or bounds) of the
+  flow variables ``om.w``, so they are set on these variables;
+* a variable cost (e.g. opex_var) is a coefficient of the output flows in
+  the objective, so the objective is rebuilt from its cached linear terms
+  with the new coefficients.
+
+The model is solved again with a persistent solver interface (gurobi or
+cplex) if available, which keeps the last basis, otherwise the previous
+solution is passed as a warm start if the solver accepts one.
+
+    model = persistent_model.PersistentModel(energysystem)
+    model.solve()
+    model.set_series('demand_elec', new_demand)
+    model.set_cost('rgas', 12e10)
+    model.solve()
+
+@author: uwe
+"""
+import logging
+import time
+
+import pyomo.environ as po
+from pyomo.core.util import quicksum
+from pyomo.repn import generate_standard_repn
+
+from oemof.solph.optimization_model import OptimizationModel
+
+
+class PersistentModel:
+    r"""Optimisation model of an energy system that is updated in place.
+
+    Parameters
+    ----------
+    esystem : oemof.core.energy_system.EnergySystem
+    solver : str, optional
+        Name of the solver (default: solver of the simulation).
+    persistent : bool
+        Use the persistent interface '<solver>_persistent' if pyomo has one.
+
+    Attributes
+    ----------
+    timings : list of dict
+        Phase and duration of every build, update and solve.
+    """
+
+    def __init__(self, esystem, solver=None, persistent=True):
+        self.esystem = esystem
+        self.timings = []
+        self.solver_name = solver or esystem.simulation.solver
+        start = time.time()
+        self.om = OptimizationModel(energysystem=esystem)
+        self._timing('build', start)
+        self._terms = None
+        self._objective = next(self.om.component_data_objects(
+            po.Objective, active=True))
+
+        self.persistent = False
+        if persistent:
+            name = '{0}_persistent'.format(self.solver_name)
+            try:
+                solver = po.SolverFactory(name)
+                self.persistent = solver.available(exception_flag=False)
+            except Exception:
+                self.persistent = False
+        if self.persistent:
+            self.solver = solver
+            start = time.time()
+            self.solver.set_instance(self.om)
+            self._timing('set instance', start)
+        else:
+            self.solver = po.SolverFactory(self.solver_name)
+        self.solved = False
+
+    def _timing(self, phase, start):
+        self.timings.append({'phase': phase, 'time': time.time() - start})
+
+    def _entity(self, uid):
+        for e in self.esystem.entities:
+            if e.uid == uid:
+                return e
+        raise KeyError('No entity with uid {0}.'.format(uid))
+
+    def _flows(self, entity):
+        r"""Flow variables of an entity (input flows of sinks)."""
+        if entity.outputs:
+            keys = [(entity.uid, entity.outputs[0].uid)]
+        else:
+            keys = [(entity.inputs[0].uid, entity.uid)]
+        return [self.om.w[a, b, t] for a, b in keys
+                for t in self.om.timesteps]
+
+    def set_series(self, uid, values):
+        r"""Set a new series (val) of a sink or fixed source.
+
+        For a fixed source the values are multiplied with out_max like
+        oemof does.
+        """
+        start = time.time()
+        entity = self._entity(uid)
+        entity.val = values
+        scale = entity.out_max[0] if entity.outputs else 1
+        for var, value in zip(self._flows(entity), values):
+            value = float(value) * scale
+            if var.fixed:
+                var.fix(value)
+            elif var.lb is not None and var.lb == var.ub:
+                var.setlb(value)
+                var.setub(value)
+            else:
+                var.setub(value)
+            if self.persistent:
+                self.solver.update_var(var)
+        self._timing('set series {0}'.format(uid), start)
+
+    def _linear_terms(self):
+        if self._terms is None:
+            repn = generate_standard_repn(self._objective.expr,
+                                          quadratic=False)
+            if not repn.is_linear():
+                raise ValueError('The objective is not linear.')
+            self._terms = {
+                'constant': repn.constant,
+                'vars': list(repn.linear_vars),
+                'coefs': list(repn.linear_coefs),
+                'position': {id(v): i for i, v in enumerate(
+                    repn.linear_vars)}}
+        return self._terms
+
+    def set_cost(self, uid, value, attr='opex_var'):
+        r"""Set a variable cost of an entity and update the objective.
+
+        The difference to the old value is added to the coefficients of
+        the output flows of the entity.
+        """
+        start = time.time()
+        entity = self._entity(uid)
+        delta = value - (getattr(entity, attr) or 0)
+        setattr(entity, attr, value)
+        terms = self._linear_terms()
+        for var in self._flows(entity):
+            position = terms['position'].get(id(var))
+            if position is None:
+                terms['position'][id(var)] = len(terms['vars'])
+                terms['vars'].append(var)
+                terms['coefs'].append(delta)
+            else:
+                terms['coefs'][position] += delta
+
+        self._objective.deactivate()
+        if self.om.find_component('persistent_objective') is not None:
+            self.om.del_component('persistent_objective')
+        self.om.persistent_objective = po.Objective(
+            expr=terms['constant'] + quicksum(
+                c * v for c, v in zip(terms['coefs'], terms['vars'])),
+            sense=self._objective.sense)
+        self._objective = self.om.persistent_objective
+        if self.persistent:
+            self.solver.set_objective(self._objective)
+        self._timing('set cost {0}'.format(uid), start)
+
+    def solve(self, **kwargs):
+        r"""Solve the model and write the results to the energy system.
+
+        From the second solve on the last solution is used as warm start.
+        """
+        start = time.time()
+        options = dict(kwargs)
+        if self.persistent:
+            options.setdefault('save_results', False)
+        elif self.solved and self.solver.warm_start_capable():
+            options.setdefault('warmstart', True)
+        results = self.solver.solve(self.om, **options)
+        if self.persistent:
+            self.solver.load_vars()
+        self._timing('solve', start)
+        logging.info('Solved ({0}) in {1:.2f} s: {2}'.format(
+            'warm' if self.solved else 'cold', self.timings[-1]['time'],
+            results.solver.termination_condition))
+        self.solved = True
+        self.esystem.results = self.om.results()
+        # The objective may have been replaced by set_cost().
+        self.esystem.results.objective = po.value(self._objective)
+        return results
+
+
+def compare(esystem, update, solver=None):
+    r"""Time a cold rebuild against an incremental update.
+
+    Parameters
+    ----------
+    esystem : oemof.core.energy_system.EnergySystem
+    update : callable
+        ``update(model)`` applies the changes to a PersistentModel, e.g.
+        ``lambda m: m.set_series('demand_elec', new_demand)``.
+
+    Returns
+    -------
+    dict
+        Times of the cold and the incremental run and both objectives.
+    """
+    model = PersistentModel(esystem, solver=solver)
+    model.solve()
+    n = len(model.timings)
+    start = time.time()
+    update(model)
+    model.solve()
+    incremental = time.time() - start
+    objective = esystem.results.objective
+
+    # Cold: the entities carry the new values now, so build from scratch.
+    start = time.time()
+    esystem.optimize()
+    cold = time.time() - start
+    return {'cold': cold, 'incremental': incremental,
+            'objective_cold': esystem.results.objective,
+            'objective_incremental': objective,
+            'phases': model.timings[n:]}
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Window aware, downsampled bus plots for long horizons.
+
+``DataFramePlot.io_plot`` builds a frame of all time steps of all entities
+and draws every hourly point. For full-year or multi-year runs this is the
+slowest step and the pdf files get huge. The functions below read only the
+requested time window of one bus from a results store, reduce it to about
+as many points as the figure has pixels (keeping peaks) and draw the inputs
+as stacked areas and the outputs as lines like io_plot does.
+
+render_figures() draws many figures headless (Agg) in worker processes.
+matplotlib is only imported by pyplot() and the render functions.
+
+@author: uwe
+"""
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from reegis_hp.tools import parallel
+from reegis_hp.tools import results_query
+from reegis_hp.tools import results_store
+
+
+def minmax_indices(y, n_bins):
+    r"""Return the positions of the minimum and maximum of every bin.
+
+    The shape of the curve (including all peaks) is kept with at most
+    2 * n_bins points. Of a 2-D array (time steps x curves) the positions
+    of the minimum and maximum of every curve are kept.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * n_bins:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_bins + 1).astype(int)
+    idx = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        part = y[start:stop]
+        idx.extend((start + np.ravel(part.argmin(axis=0)),
+                    start + np.ravel(part.argmax(axis=0))))
+    return np.unique(np.concatenate(idx))
+
+
+def lttb_indices(y, n_out):
+    r"""Largest-Triangle-Three-Buckets downsampling of an equidistant series.
+
+    Returns the positions of `n_out` points (first and last included).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        nxt_start, nxt_stop = edges[i + 1], (
+            edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nxt_start:nxt_stop].mean()
+        avg_y = y[nxt_start:nxt_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) -
+                      (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def downsample(df, n_points, method='minmax'):
+    r"""Reduce a frame to the rows that keep the shape of every column.
+
+    Every column and the sum of all columns (the top of stacked areas) is
+    downsampled on its own to about `n_points` points and the union of the
+    chosen rows is kept, so the frame has between `n_points` and
+    (columns + 1) * `n_points` rows. All columns share the rows, so stacked
+    areas stay consistent. `method` is 'minmax' (min and max per bin) or
+    'lttb'.
+    """
+    if n_points is None or len(df) <= n_points or df.shape[1] == 0:
+        return df
+    values = df.to_numpy()
+    curves = np.column_stack([values, values.sum(axis=1)])
+    if method == 'lttb':
+        idx = np.unique(np.concatenate(
+            [lttb_indices(curve, n_points) for curve in curves.T]))
+    else:
+        idx = minmax_indices(curves, n_points // 2)
+    return df.iloc[idx]
+
+
+def io_plot(results, bus, ax, cdict=None, date_from=None, date_to=None,
+            max_points=2000, method='minmax', line_kwa=None, rename=None):
+    r"""Plot the inputs (stacked areas) and outputs (lines) of a bus.
+
+    Parameters
+    ----------
+    results : reegis_hp.tools.results_query.FlowResults
+    bus : uid of the bus
+    ax : matplotlib axes
+    cdict : dict
+        Colour per component uid.
+    date_from, date_to : str, optional
+        Time window, only this part is read from the store.
+    max_points : int or None
+        Upper limit of points per curve (None: no downsampling).
+    rename : dict, optional
+        Legend label per component uid.
+
+    Returns
+    -------
+    tuple
+        (handles, labels) as returned by io_plot of oemof.
+    """
+    cdict = cdict or {}
+    rename = rename or {}
+    colours = lambda df: [cdict.get(c, '#999999') for c in df.columns]
+    inputs = downsample(results.select(
+        bus=bus, direction='input', date_from=date_from, date_to=date_to,
+        columns='uid'), max_points, method)
+    outputs = downsample(results.select(
+        bus=bus, direction='output', date_from=date_from, date_to=date_to,
+        columns='uid'), max_points, method)
+    if inputs.shape[1]:
+        ax.stackplot(inputs.index, inputs.to_numpy().T,
+                     colors=colours(inputs), labels=list(inputs.columns),
+                     linewidth=0)
+    for column, colour in zip(outputs.columns, colours(outputs)):
+        ax.plot(outputs.index, outputs[column].to_numpy(), color=colour,
+                label=column, **(line_kwa or {}))
+    handles, labels = ax.get_legend_handles_labels()
+    return handles, [rename.get(lab, lab) for lab in labels]
+
+
+def outside_legend(ax, handles, labels, **kwargs):
+    """Place the legend right of the axes."""
+    kwargs.setdefault('loc', 'center left')
+    kwargs.setdefault('bbox_to_anchor', (1, 0.5))
+    return ax.legend(handles, labels, **kwargs)
+
+
+def has_display():
+    """Return False on Linux/Unix without an X11 or Wayland display."""
+    if os.name != 'posix' or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY') or
+                os.environ.get('WAYLAND_DISPLAY'))
+
+
+def pyplot(headless=None):
+    r"""Import and return matplotlib.pyplot.
+
+    With `headless` the Agg backend is used. None uses Agg if there is no
+    display and no backend is set in MPLBACKEND.
+    """
+    import matplotlib
+    if headless is None:
+        headless = not has_display() and not os.environ.get('MPLBACKEND')
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_figure(job):
+    r"""Draw one bus plot into a file without a display.
+
+    `job` is a dict with the keys path (results store), bus and filename
+    and optionally date_from, date_to, title, cdict, rename, max_points,
+    method and figsize.
+    """
+    plt = pyplot(headless=True)
+
+    start = time.time()
+    results = results_query.FlowResults(
+        results_store.ResultsStore(job['path']))
+    fig = plt.figure(figsize=job.get('figsize', (24, 7)))
+    ax = fig.add_subplot(1, 1, 1)
+    handles, labels = io_plot(
+        results, job['bus'], ax, job.get('cdict'), job.get('date_from'),
+        job.get('date_to'), job.get('max_points', 2000),
+        job.get('method', 'minmax'), rename=job.get('rename'))
+    outside_legend(ax, handles, labels)
+    ax.set_title(job.get('title', str(job['bus'])))
+    ax.set_ylabel('Power in MW')
+    fig.savefig(job['filename'], bbox_inches='tight')
+    plt.close(fig)
+    return job['filename'], time.time() - start
+
+
+def render_figures(jobs, workers=None):
+    r"""Render many bus plots in parallel worker processes.
+
+    Returns
+    -------
+    list of tuple
+        (filename, seconds) of every job.
+    """
+    start = time.time()
+    if workers == 1:
+        done = [render_figure(job) for job in jobs]
+    else:
+        with parallel.process_pool(workers) as pool:
+            done = list(pool.map(render_figure, jobs))
+    logging.info('Rendered {0} figures in {1:.1f} s.'.format(
+        len(done), time.time() - start))
+    return done
+
+
+def region_jobs(path, directory, carrier='elec', fmt='pdf', **kwargs):
+    """Create one render job for the bus of every region of a store."""
+    store = results_store.ResultsStore(path)
+    return [dict(kwargs, path=path, bus=('bus', r['name'], carrier),
+                 title=r['name'],
+                 filename=os.path.join(directory, '{0}_{1}.{2}'.format(
+                     r['name'], carrier, fmt)))
+            for r in store.regions]
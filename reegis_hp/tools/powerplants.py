@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Aggregation of power plant tables before creating transformer objects.
+
+The BNetzA table contains one row per power plant. Creating one transformer
+per row adds two flow variables per plant and time step to the linear
+problem although most plants of one fuel in a region are nearly identical.
+
+@author: uwe
+"""
+import logging
+import numpy as np
+import pandas as pd
+
+
+def efficiency_class_labels(bins):
+    """Return a label for each interval defined by the bin edges."""
+    return ['eta{0:.0f}-{1:.0f}'.format(lo * 100, hi * 100)
+            for lo, hi in zip(bins[:-1], bins[1:])]
+
+
+def aggregate_power_plants(pps_df, eta_default, eta_bins=None,
+                           type_col='type', cap_col='cap', eta_col='eta',
+                           region_col='region'):
+    r"""Summarise power plants of the same type (and region) to clusters.
+
+    Parameters
+    ----------
+    pps_df : pandas.DataFrame
+        One row per power plant as returned by ``get_bnetza_pps``.
+    eta_default : dict
+        Electrical efficiency per type, used if the table has no efficiency
+        column or the value is missing.
+    eta_bins : list of float, optional
+        Bin edges of efficiency classes. If given, plants of one type are
+        split into one cluster per efficiency class. Efficiencies outside
+        the edges are counted to the first or last class.
+    type_col, cap_col, eta_col, region_col : str
+        Column names. The region column is optional.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per cluster with the columns type (region, eta_class), cap
+        (sum of the capacities), eta (capacity weighted efficiency) and
+        n_plants.
+    """
+    df = pd.DataFrame({'type': pps_df[type_col],
+                       'cap': pd.to_numeric(pps_df[cap_col])})
+    eta = (pd.to_numeric(pps_df[eta_col]) if eta_col in pps_df
+           else pd.Series(np.nan, index=pps_df.index))
+    df['eta'] = eta.fillna(df['type'].map(eta_default))
+    keys = ['type']
+    if region_col in pps_df:
+        df['region'] = pps_df[region_col]
+        keys.insert(0, 'region')
+    if eta_bins is not None:
+        outside = (df['eta'] < eta_bins[0]) | (df['eta'] > eta_bins[-1])
+        if outside.any():
+            logging.warning('{0} power plants with an efficiency outside of '
+                            '{1} to {2} are counted to the edge classes.'
+                            .format(outside.sum(), eta_bins[0],
+                                    eta_bins[-1]))
+        df['eta_class'] = pd.cut(df['eta'].clip(eta_bins[0], eta_bins[-1]),
+                                 bins=eta_bins,
+                                 labels=efficiency_class_labels(eta_bins),
+                                 include_lowest=True).astype(str)
+        keys.append('eta_class')
+    df['weighted_eta'] = df['cap'] * df['eta']
+    df['n_plants'] = 1
+
+    agg = df.groupby(keys, sort=True).agg(
+        {'cap': 'sum', 'weighted_eta': 'sum', 'eta': 'mean',
+         'n_plants': 'sum'})
+    # Use the capacity weighted efficiency, the plain mean only for clusters
+    # without capacity.
+    weighted = agg['weighted_eta'] / agg['cap'].where(agg['cap'] > 0)
+    agg['eta'] = weighted.fillna(agg['eta'])
+    return agg.drop('weighted_eta', axis=1).reset_index()
+
+
+def aggregation_report(pps_df, agg_df, timesteps=8760, flows_per_plant=2,
+                       cap_col='cap'):
+    r"""Return a dictionary describing how much the model shrinks.
+
+    Every transformer.Simple adds one input and one output flow per time
+    step, so the number of saved variables is
+    ``flows_per_plant * (plants - clusters) * timesteps``.
+    """
+    n_before = len(pps_df)
+    n_after = len(agg_df)
+    cap_before = float(pd.to_numeric(pps_df[cap_col]).sum())
+    cap_after = float(agg_df['cap'].sum())
+    return {
+        'plants': n_before,
+        'transformers': n_after,
+        'reduction': 1 - n_after / n_before if n_before else 0,
+        'variables_saved': flows_per_plant * (n_before - n_after) * timesteps,
+        'capacity_before': cap_before,
+        'capacity_after': cap_after,
+        }
+
+
+def objective_shift(objective_full, objective_aggregated):
+    """Return the absolute and relative deviation of the objective value."""
+    diff = objective_aggregated - objective_full
+    rel = diff / objective_full if objective_full else np.nan
+    return {'absolute': diff, 'relative': rel}
+
+
+def log_report(report, region=None):
+    logging.info(
+        'Power plants{0}: {plants} plants -> {transformers} transformers '
+        '({reduction:.0%} less, {variables_saved} variables saved, '
+        'capacity {capacity_before:.4g} -> {capacity_after:.4g}).'.format(
+            '' if region is None else ' ({0})'.format(region), **report))
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Topology reduction of an energy system before the optimisation.
+
+The entity graph (bus -> component -> bus) is built once and reduced in
+three steps:
+
+1. components that cannot deliver energy to any sink (or to a bus with
+   excess) are removed with the buses only they feed,
+2. parallel transformers with the same buses, efficiency and costs are
+   merged into one with the summed capacity,
+3. pass-through chains ``bus1 -> component -> bus2`` are folded if bus2 has
+   no excess and no other input, the component has no losses, costs or
+   limits and neither bus has a price or an output limit; the consumers of
+   bus2 take from bus1 directly.
+
+reduce() returns a Reduction that restores the original topology and maps
+the results back to the original entities (removed entities get zero
+flows, merged transformers share the flow by capacity, folded chains get
+the flows through them), so dump() and the plots work unchanged.
+
+@author: uwe
+"""
+import logging
+from collections import Counter
+
+import numpy as np
+
+
+def _classes():
+    from oemof.core.network.entities import Bus
+    from oemof.core.network.entities.components import sinks
+    from oemof.core.network.entities.components import transformers
+    from oemof.core.network.entities.components import transports
+    return Bus, sinks, transformers, transports
+
+
+def _first(value):
+    if isinstance(value, (list, tuple)):
+        return value[0] if len(value) == 1 else tuple(value)
+    return value
+
+
+def graph_size(esystem):
+    r"""Number of entities per class and number of edges."""
+    counts = Counter(type(e).__name__ for e in esystem.entities)
+    counts['edges'] = sum(len(e.outputs) for e in esystem.entities)
+    counts['entities'] = len(esystem.entities)
+    return dict(counts)
+
+
+class Reduction:
+    r"""Record of a reduction, see :func:`reduce`."""
+
+    def __init__(self, esystem):
+        self.entities = list(esystem.entities)
+        self.links = {e: (list(e.inputs), list(e.outputs))
+                      for e in self.entities}
+        self.attributes = []
+        self.removed = []
+        self.merged = {}
+        self.folded = []
+        self.size_before = graph_size(esystem)
+        self.size_after = None
+
+    def set(self, entity, attr, value):
+        self.attributes.append((entity, attr, getattr(entity, attr)))
+        setattr(entity, attr, value)
+
+    def report(self):
+        r"""Size before and after the reduction per class."""
+        keys = sorted(set(self.size_before) | set(self.size_after or {}))
+        return {k: (self.size_before.get(k, 0),
+                    (self.size_after or {}).get(k, 0)) for k in keys}
+
+    def restore(self, esystem):
+        r"""Restore the original entities and expand the results."""
+        results = esystem.results
+        if results is not None:
+            self._expand(results, len(esystem.time_idx))
+        for entity, attr, value in reversed(self.attributes):
+            setattr(entity, attr, value)
+        for entity, (inputs, outputs) in self.links.items():
+            entity.inputs[:] = inputs
+            entity.outputs[:] = outputs
+        esystem.entities[:] = self.entities
+        reindex = getattr(esystem.entities, 'reindex', None)
+        if reindex is not None:
+            reindex()
+
+    def _expand(self, results, n):
+        def flow(a, b):
+            return np.asarray(results[a][b], dtype=float)
+
+        def put(a, b, values):
+            results.setdefault(a, {})[b] = np.asarray(
+                values, dtype=float).tolist()
+
+        # Undo in reverse order, a folded chain may contain merged entities.
+        for bus1, component, bus2, consumers in reversed(self.folded):
+            total = np.zeros(n)
+            for consumer in consumers:
+                values = flow(bus1, consumer)
+                del results[bus1][consumer]
+                put(bus2, consumer, values)
+                total += values
+            put(bus1, component, total)
+            put(component, bus2, total)
+        for rep, members in self.merged.items():
+            inputs, outputs = self.links[rep]
+            flows = {(b, 'in'): flow(b, rep) for b in inputs}
+            flows.update({(b, 'out'): flow(rep, b) for b in outputs})
+            for member, share in members:
+                for (b, direction), values in flows.items():
+                    if direction == 'in':
+                        put(b, member, values * share)
+                    else:
+                        put(member, b, values * share)
+        for entity in self.removed:
+            inputs, outputs = self.links[entity]
+            for b in inputs:
+                put(b, entity, np.zeros(n))
+            for b in outputs:
+                put(entity, b, np.zeros(n))
+
+
+def _detach(entity):
+    for b in entity.inputs:
+        if entity in b.outputs:
+            b.outputs.remove(entity)
+    for b in entity.outputs:
+        if entity in b.inputs:
+            b.inputs.remove(entity)
+
+
+def remove_dead_ends(esystem, reduction):
+    r"""Remove entities that cannot deliver energy to a sink.
+
+    A component is removed only if none of its outputs leads to a sink (or
+    a bus with excess). A bus is removed only if it is fed by removed
+    components alone, so live components keep all their outputs (e.g. the
+    heat bus of a chp without heat demand, which still limits the chp).
+    """
+    Bus, sinks, transformers, transports = _classes()
+    targets = [e for e in esystem.entities if isinstance(e, sinks.Simple) or
+               (isinstance(e, Bus) and getattr(e, 'excess', False))]
+    alive = set(targets)
+    stack = list(targets)
+    while stack:
+        entity = stack.pop()
+        for source in entity.inputs:
+            if source not in alive:
+                alive.add(source)
+                stack.append(source)
+    dead = set(e for e in esystem.entities
+               if e not in alive and not isinstance(e, Bus))
+    dead.update(e for e in esystem.entities
+                if isinstance(e, Bus) and e not in alive and
+                all(i in dead for i in e.inputs))
+    dead = [e for e in esystem.entities if e in dead]
+    for entity in dead:
+        _detach(entity)
+    _remove(esystem, dead)
+    reduction.removed.extend(dead)
+    return len(dead)
+
+
+def _remove(esystem, entities):
+    remove_many = getattr(esystem.entities, 'remove_many', None)
+    if remove_many is not None:
+        remove_many(entities)
+    else:
+        drop = set(map(id, entities))
+        esystem.entities[:] = [e for e in esystem.entities
+                               if id(e) not in drop]
+
+
+def merge_parallel(esystem, reduction):
+    r"""Merge transformers with the same buses, efficiency and costs."""
+    Bus, sinks, transformers, transports = _classes()
+    groups = {}
+    for e in esystem.entities:
+        # Transformers with an own series (ub_out) are kept.
+        if type(e) is not transformers.Simple or (
+                getattr(e, 'ub_out', None) is not None):
+            continue
+        key = (tuple(map(id, e.inputs)), tuple(map(id, e.outputs)),
+               _first(e.eta), getattr(e, 'opex_var', None),
+               getattr(e, 'opex_fix', None), getattr(e, 'capex', None))
+        groups.setdefault(key, []).append(e)
+    merged = []
+    for members in groups.values():
+        capacities = [_first(m.out_max) for m in members]
+        if len(members) < 2 or any(
+                c is None or not np.isfinite(c) for c in capacities):
+            continue
+        rep, total = members[0], float(sum(capacities))
+        reduction.merged[rep] = [(m, c / total) for m, c in
+                                 zip(members, capacities)]
+        reduction.set(rep, 'out_max', [total])
+        if all(_first(m.in_max) is not None for m in members):
+            reduction.set(rep, 'in_max', [float(sum(
+                _first(m.in_max) for m in members))])
+        for m in members[1:]:
+            _detach(m)
+            merged.append(m)
+    _remove(esystem, merged)
+    return len(merged)
+
+
+def _is_lossless(component):
+    eta = _first(getattr(component, 'eta', 1))
+    out_max = _first(getattr(component, 'out_max', None))
+    in_max = _first(getattr(component, 'in_max', None))
+    return ((eta is None or eta == 1) and
+            not getattr(component, 'opex_var', 0) and
+            len(component.inputs) == 1 and len(component.outputs) == 1 and
+            all(v is None or not np.isfinite(v) for v in (out_max, in_max)))
+
+
+def _constrained(bus):
+    r"""True if the bus has a price, an output limit or no plain balance.
+    """
+    limit = _first(getattr(bus, 'sum_out_limit', None))
+    return bool(getattr(bus, 'price', None) or
+                getattr(bus, 'shortage', False) or
+                getattr(bus, 'balanced', True) is False or
+                (limit is not None and np.isfinite(limit)))
+
+
+def fold_pass_through(esystem, reduction):
+    r"""Fold lossless chains bus1 -> component -> bus2.
+
+    Buses with a price, an output limit or other balance settings are not
+    folded, their constraints would change.
+    """
+    Bus, sinks, transformers, transports = _classes()
+    folded = []
+    for bus2 in [e for e in esystem.entities if isinstance(e, Bus)]:
+        if getattr(bus2, 'excess', False) or len(bus2.inputs) != 1:
+            continue
+        component = bus2.inputs[0]
+        if type(component) not in (transformers.Simple, transports.Simple):
+            continue
+        if not _is_lossless(component) or component in reduction.merged:
+            continue
+        bus1 = component.inputs[0]
+        if bus1 is bus2 or type(bus1) is not type(bus2) or (
+                getattr(bus1, 'type', None) != getattr(bus2, 'type', None)):
+            continue
+        if _constrained(bus1) or _constrained(bus2):
+            continue
+        consumers = list(bus2.outputs)
+        if any(bus1 in c.inputs for c in consumers):
+            continue
+        for consumer in consumers:
+            consumer.inputs[consumer.inputs.index(bus2)] = bus1
+            bus1.outputs.append(consumer)
+        _detach(component)
+        bus2.outputs[:] = []
+        reduction.folded.append((bus1, component, bus2, consumers))
+        folded.extend([component, bus2])
+    _remove(esystem, folded)
+    return len(folded) // 2
+
+
+def reduce(esystem):
+    r"""Reduce the topology of an energy system in place.
+
+    Returns
+    -------
+    Reduction
+        Call its restore(esystem) after the optimisation.
+    """
+    reduction = Reduction(esystem)
+    dead = remove_dead_ends(esystem, reduction)
+    merged = merge_parallel(esystem, reduction)
+    folded = fold_pass_through(esystem, reduction)
+    reduction.size_after = graph_size(esystem)
+    logging.info(
+        'Reduction: {0} dead ends removed, {1} transformers merged, {2} '
+        'chains folded. Entities {3} -> {4}, edges {5} -> {6}.'.format(
+            dead, merged, folded, reduction.size_before['entities'],
+            reduction.size_after['entities'], reduction.size_before['edges'],
+            reduction.size_after['edges']))
+    return reduction
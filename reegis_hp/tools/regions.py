@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Neighbourhood of regions and the transport network between them.
+
+The neighbours of all regions are found in one bulk query of an STRtree of
+the region polygons, so only regions with overlapping bounding boxes are
+tested and the work grows with the number of regions and not with the
+number of pairs. Transports (transport.Simple) are created between
+neighbours only, with the capacity and efficiency of a link table.
+
+    pairs = regions.adjacency({r.name: r.geom for r in esystem.regions})
+    links = regions.link_table(pairs, table=capacities)
+    regions.connect(esystem, links)
+
+@author: uwe
+"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import shapely
+
+DEFAULT_CAPACITY = 10 ** 12
+DEFAULT_ETA = 0.9
+# Minimum length of a common border (units of the polygons, degrees for
+# EPSG:4326). Any positive length separates regions that only share a
+# corner.
+MIN_BORDER = 1e-6
+
+
+def adjacency(geoms, tolerance=0, min_border=MIN_BORDER):
+    r"""Return all pairs of neighbouring regions.
+
+    Parameters
+    ----------
+    geoms : dict
+        Polygon per region name.
+    tolerance : float
+        Regions closer than this are neighbours (closes slivers between
+        polygons of different sources).
+    min_border : float
+        Minimum length of the common border. With the default, regions
+        that only share a corner are not neighbours, 0 accepts them.
+
+    Returns
+    -------
+    list of tuple
+        (name1, name2) with name1 < name2, sorted.
+    """
+    start = time.time()
+    names = list(geoms)
+    polygons = np.asarray([geoms[n] for n in names])
+    tree = shapely.STRtree(polygons)
+    if tolerance:
+        query, found = tree.query(polygons, predicate='dwithin',
+                                  distance=tolerance)
+    else:
+        query, found = tree.query(polygons, predicate='intersects')
+    keep = query < found
+    query, found = query[keep], found[keep]
+    if min_border:
+        # The part of the boundary within `tolerance` of the other one is
+        # up to 2 * tolerance longer than the common border (at its ends).
+        border = shapely.length(shapely.intersection(
+            shapely.boundary(polygons[query]),
+            shapely.buffer(shapely.boundary(polygons[found]),
+                           tolerance or 1e-9))) - 2 * tolerance
+        query, found = query[border >= min_border], found[border >= min_border]
+    pairs = sorted(tuple(sorted((names[a], names[b])))
+                   for a, b in zip(query, found))
+    logging.info('Found {0} neighbours of {1} regions in {2:.2f} s.'.format(
+        len(pairs), len(names), time.time() - start))
+    return pairs
+
+
+def link_table(pairs, table=None, capacity=DEFAULT_CAPACITY, eta=DEFAULT_ETA):
+    r"""Capacity and efficiency of every link.
+
+    Parameters
+    ----------
+    pairs : list of tuple
+        Neighbouring regions (see :func:`adjacency`).
+    table : pandas.DataFrame, optional
+        Columns region1, region2 and optionally in_max, out_max and eta. The
+        order of the two regions does not matter. Missing links or values
+        get the defaults.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns region1, region2, in_max, out_max, eta.
+    """
+    links = pd.DataFrame(pairs, columns=['region1', 'region2'])
+    links['in_max'] = float(capacity)
+    links['out_max'] = float(capacity)
+    links['eta'] = float(eta)
+    if table is not None and len(table):
+        given = table.copy()
+        swap = given['region1'] > given['region2']
+        given.loc[swap, ['region1', 'region2']] = given.loc[
+            swap, ['region2', 'region1']].to_numpy()
+        given = given.set_index(['region1', 'region2'])
+        links = links.set_index(['region1', 'region2'])
+        for column in ('in_max', 'out_max', 'eta'):
+            if column in given:
+                values = given[column].reindex(links.index)
+                links[column] = values.fillna(links[column])
+        links = links.reset_index()
+    return links
+
+
+def connect(esystem, links, carrier='elec'):
+    r"""Create transports between the buses of neighbouring regions.
+
+    ``esystem.connect`` creates one transport per direction, the bus of a
+    region is ('bus', name, carrier) like in the run scripts.
+    """
+    from oemof.core.network.entities.components import transports as transport
+
+    def bus(name):
+        uid = ('bus', name, carrier)
+        entity = esystem.entities.get(uid)
+        return entity if entity is not None else esystem.entities.get(
+            str(uid))
+
+    start = time.time()
+    for link in links.itertuples(index=False):
+        bus1, bus2 = bus(link.region1), bus(link.region2)
+        if bus1 is None or bus2 is None:
+            logging.warning('No {0} bus for the link {1} - {2}.'.format(
+                carrier, link.region1, link.region2))
+            continue
+        esystem.connect(bus1, bus2, in_max=link.in_max,
+                        out_max=link.out_max, eta=link.eta,
+                        transport_class=transport.Simple)
+    logging.info('Connected {0} neighbours in {1:.2f} s.'.format(
+        len(links), time.time() - start))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed access to the flows of a results store.
+
+The uids of the Berlin/Brandenburg model are tuples like
+('transformer', 'Berlin', 'lignite') that are turned into strings before
+the optimisation. FlowResults parses them once and indexes every flow by a
+structured key (component, region, carrier, bus, direction, uid), so plots
+and analyses can select flows without scanning all entities or rewriting
+label strings. The full uid keeps flows apart that share the other fields
+(transports from different regions into one bus, transformers of different
+efficiency classes).
+
+    results = FlowResults(ResultsStore(path))
+    df = results.select(bus=('bus', 'Berlin', 'elec'), direction='input',
+                        date_from='2010-06-01', date_to='2010-06-08')
+
+@author: uwe
+"""
+import ast
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+FlowKey = namedtuple('FlowKey', ['component', 'region', 'carrier', 'bus',
+                                 'direction', 'uid'])
+
+FIELDS = FlowKey._fields
+
+
+def parse_uid(uid):
+    """Turn a stringified tuple uid back into a tuple."""
+    if isinstance(uid, str) and uid.startswith('('):
+        try:
+            return ast.literal_eval(uid)
+        except (ValueError, SyntaxError):
+            pass
+    return uid
+
+
+def flow_key(meta):
+    r"""Build the FlowKey of a flow from the meta data of the store.
+
+    Tuple uids are read as (component, region, carrier). For transports
+    ('transport', 'bus', region1, carrier, 'bus', region2, carrier) the
+    region of the bus the flow belongs to is used. Plain string uids (e.g.
+    'pv' in example.py) become the component, region and carrier are None.
+    The parsed uid is the last field, so every flow has its own key.
+    """
+    uid = parse_uid(meta['obj_uid'])
+    bus = parse_uid(meta['bus_uid'])
+    if isinstance(uid, tuple) and uid[0] == 'transport':
+        region = bus[1] if isinstance(bus, tuple) else None
+        return FlowKey('transport', region, meta.get('bus_type'), bus,
+                       meta['type'], uid)
+    if isinstance(uid, tuple):
+        parts = uid + (None,) * (3 - len(uid))
+        return FlowKey(parts[0], parts[1], parts[2], bus, meta['type'], uid)
+    return FlowKey(uid, None, None, bus, meta['type'], uid)
+
+
+class FlowResults:
+    r"""Structured index over the rows of a results store.
+
+    Parameters
+    ----------
+    store : reegis_hp.tools.results_store.ResultsStore
+        File based (memory-mapped) or in-memory store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.keys = [flow_key(meta) for meta in store.flows]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        if len(self._rows) != len(self.keys):
+            seen = set()
+            duplicates = [k for k in self.keys if k in seen or seen.add(k)]
+            raise ValueError('Flows with the same key: {0}'.format(
+                duplicates))
+        self._index = {field: {} for field in FIELDS}
+        for row, key in enumerate(self.keys):
+            for field, value in zip(FIELDS, key):
+                self._index[field].setdefault(value, []).append(row)
+
+    @property
+    def time_idx(self):
+        return self.store.time_idx
+
+    def get(self, key, date_from=None, date_to=None):
+        """Return one flow as a (read-only view of a) 1-D array."""
+        return self.store.values[self._rows[key],
+                                 self.store.window(date_from, date_to)]
+
+    def rows(self, **criteria):
+        r"""Return the rows matching all criteria.
+
+        A slice is returned if the rows are contiguous (e.g. all inputs of a
+        bus), otherwise a sorted array of row numbers.
+        """
+        selected = None
+        for field, value in criteria.items():
+            if field not in self._index:
+                raise KeyError('Unknown field {0}, use one of {1}.'.format(
+                    field, FIELDS))
+            if field == 'bus':
+                value = parse_uid(value)
+            rows = set(self._index[field].get(value, []))
+            selected = rows if selected is None else selected & rows
+        if selected is None:
+            return slice(0, len(self.keys))
+        rows = np.array(sorted(selected), dtype=int)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return slice(int(rows[0]), int(rows[-1]) + 1)
+        return rows
+
+    def select(self, date_from=None, date_to=None, columns='key',
+               **criteria):
+        r"""Return all flows matching the criteria as one aligned frame.
+
+        Parameters
+        ----------
+        date_from, date_to : str or datetime, optional
+            Time window (inclusive).
+        columns : str
+            'key' for FlowKey columns (MultiIndex), 'uid' for the uid of the
+            connected component.
+        criteria :
+            Any of component, region, carrier, bus, direction, uid.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Time steps x flows. For contiguous rows the data is a view of
+            the (memory-mapped) store.
+        """
+        rows = self.rows(**criteria)
+        cols = self.store.window(date_from, date_to)
+        if isinstance(rows, slice):
+            data = self.store.values[rows, cols].T
+            keys = self.keys[rows]
+            metas = self.store.flows[rows]
+        else:
+            # Only the selected rows and time steps are read.
+            steps = np.arange(cols.start, cols.stop)
+            data = self.store.values[np.ix_(rows, steps)].T
+            keys = [self.keys[r] for r in rows]
+            metas = [self.store.flows[r] for r in rows]
+        if columns == 'uid':
+            names = pd.Index([m['obj_uid'] for m in metas])
+        else:
+            names = pd.MultiIndex.from_tuples(keys, names=FIELDS) if keys \
+                else pd.MultiIndex.from_tuples([], names=FIELDS)
+        return pd.DataFrame(data, index=self.time_idx[cols], columns=names,
+                            copy=False)
+
+    def values(self, field):
+        """Return all distinct values of a key field, e.g. all regions."""
+        return [v for v in self._index[field]]
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped results store.
+
+``EnergySystem.dump()`` pickles the whole energy system and ``restore()``
+has to unpickle all of it, even if only one week of one bus is plotted. The
+results store writes every flow of the results as one row of a float64 array
+(flows x time steps) to an .npy file and the meta data (uids, buses, time
+index) to a small json file. Readers map the array into memory and only
+touch the rows and columns of the requested buses and time window.
+
+Rows are sorted by bus and direction, so all inputs (or outputs) of a bus
+are one contiguous block of rows.
+
+@author: uwe
+"""
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.oemof', 'results')
+
+FLOWS = 'flows.npy'
+INDEX = 'index.json'
+
+
+def _bus_class():
+    from oemof.core.network.entities import Bus
+    return Bus
+
+
+def collect_flows(esystem):
+    r"""Return the flows of the results as (meta data, values) pairs.
+
+    Every bus gets its inputs ('input'), its outputs ('output') and the
+    state of charge of connected storages ('other'). The meta data of the
+    inputs has the capacity (see :func:`_parameters`) if known. Inputs
+    with a normalised series (val) get their potential feed-in (val times
+    capacity) as a flow of the type 'potential'.
+    """
+    Bus = _bus_class()
+    results = esystem.results
+    flows = []
+    for bus in esystem.entities:
+        if not isinstance(bus, Bus):
+            continue
+        meta = {'bus_uid': str(bus.uid), 'bus_type': bus.type}
+        for i in bus.inputs:
+            flows.append((dict(meta, type='input', obj_uid=str(i.uid),
+                               **_parameters(i, bus)),
+                          results[i][bus]))
+        for o in bus.outputs:
+            flows.append((dict(meta, type='output', obj_uid=str(o.uid)),
+                          results[bus][o]))
+        for i in bus.inputs:
+            if 'soc' in results.get(i, {}):
+                flows.append((dict(meta, type='other', obj_uid=str(i.uid)),
+                              results[i]['soc']))
+        for i in bus.inputs:
+            out_max = _parameters(i, bus).get('out_max')
+            val = getattr(i, 'val', None)
+            if val is not None and out_max is not None:
+                flows.append((dict(meta, type='potential',
+                                   obj_uid=str(i.uid)),
+                              np.asarray(val, dtype=float) * out_max))
+    return flows
+
+
+def _parameters(entity, bus):
+    r"""Installed capacity (out_max) of the output of an entity into `bus`.
+
+    Entities with several outputs (e.g. CHP plants) have one out_max per
+    output.
+    """
+    parameters = {}
+    out_max = getattr(entity, 'out_max', None)
+    if isinstance(out_max, (list, tuple)):
+        outputs = [o is bus for o in getattr(entity, 'outputs', [])]
+        if len(out_max) == 1:
+            out_max = out_max[0]
+        elif len(out_max) == len(outputs) and any(outputs):
+            out_max = out_max[outputs.index(True)]
+        else:
+            out_max = None
+    if isinstance(out_max, (int, float)) and np.isfinite(out_max):
+        parameters['out_max'] = float(out_max)
+    return parameters
+
+
+def _time_meta(time_idx):
+    freq = getattr(time_idx, 'freqstr', None)
+    if freq is not None:
+        return {'start': str(time_idx[0]), 'freq': freq,
+                'periods': len(time_idx)}
+    return {'timestamps': [str(t) for t in time_idx]}
+
+
+def arrange(esystem):
+    r"""Sort the flows by bus and direction.
+
+    Returns
+    -------
+    tuple
+        (list of meta data, list of series, blocks) where blocks maps every
+        bus uid and direction to its [first, last + 1] row.
+    """
+    flows = collect_flows(esystem)
+    order = {'input': 0, 'output': 1, 'other': 2, 'potential': 3}
+    flows.sort(key=lambda f: (f[0]['bus_uid'], order[f[0]['type']]))
+    blocks = {}
+    for row, (meta, series) in enumerate(flows):
+        block = blocks.setdefault(meta['bus_uid'], {}).setdefault(
+            meta['type'], [row, row])
+        block[1] = row + 1
+    return [f[0] for f in flows], [f[1] for f in flows], blocks
+
+
+def _regions(esystem):
+    return [{'name': r.name,
+             'buses': [str(e.uid) for e in r.entities
+                       if isinstance(e, _bus_class())]}
+            for r in esystem.regions]
+
+
+def write(esystem, path=DEFAULT_PATH):
+    r"""Write the results of an optimised energy system to `path`.
+
+    Returns
+    -------
+    str
+        The path.
+    """
+    rows, series, blocks = arrange(esystem)
+    return write_arrays(path, rows, series, blocks, esystem.time_idx,
+                        _regions(esystem))
+
+
+def write_arrays(path, rows, series, blocks, time_idx, regions=()):
+    r"""Write already arranged flows (see :func:`arrange`) to `path`.
+
+    `series` is any iterable of 1-D sequences of the length of `time_idx`,
+    `regions` a list of dicts with the keys name and buses.
+    """
+    os.makedirs(path, exist_ok=True)
+    n = len(time_idx)
+    values = np.lib.format.open_memmap(
+        os.path.join(path, FLOWS), mode='w+', dtype=np.float64,
+        shape=(len(rows), n))
+    for row, flow in enumerate(series):
+        values[row] = np.asarray(flow, dtype=np.float64)
+    values.flush()
+    del values
+
+    with open(os.path.join(path, INDEX), 'w') as f:
+        json.dump({'time': _time_meta(time_idx), 'flows': rows,
+                   'blocks': blocks, 'regions': list(regions)}, f)
+    logging.info('Stored {0} flows of {1} time steps in {2}.'.format(
+        len(rows), n, path))
+    return path
+
+
+class ResultsStore:
+    r"""Lazy reader of a results store.
+
+    Parameters
+    ----------
+    path : str
+        Directory written by :func:`write`.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(os.path.join(path, INDEX)) as f:
+            index = json.load(f)
+        self.flows = index['flows']
+        self.blocks = index['blocks']
+        self.regions = index['regions']
+        self._time = index['time']
+        self._values = None
+        self._time_idx = None
+
+    @classmethod
+    def from_energy_system(cls, esystem):
+        """Create an in-memory store from an optimised energy system."""
+        store = cls.__new__(cls)
+        store.path = None
+        store.flows, series, store.blocks = arrange(esystem)
+        store.regions = _regions(esystem)
+        store._time = _time_meta(esystem.time_idx)
+        store._values = np.array(series, dtype=np.float64).reshape(
+            len(series), len(esystem.time_idx))
+        store._time_idx = esystem.time_idx
+        return store
+
+    @property
+    def values(self):
+        """Memory-mapped (flows x time steps) array."""
+        if self._values is None:
+            self._values = np.load(os.path.join(self.path, FLOWS),
+                                   mmap_mode='r')
+        return self._values
+
+    @property
+    def time_idx(self):
+        if self._time_idx is None:
+            if 'timestamps' in self._time:
+                self._time_idx = pd.DatetimeIndex(self._time['timestamps'])
+            else:
+                self._time_idx = pd.date_range(
+                    self._time['start'], periods=self._time['periods'],
+                    freq=self._time['freq'])
+        return self._time_idx
+
+    def window(self, date_from=None, date_to=None):
+        """Return the slice of time steps between two dates (inclusive)."""
+        idx = self.time_idx
+        start = 0 if date_from is None else idx.searchsorted(
+            pd.Timestamp(date_from))
+        stop = len(idx) if date_to is None else idx.searchsorted(
+            pd.Timestamp(date_to), side='right')
+        return slice(start, stop)
+
+    def rows(self, bus_uid, type):
+        """Return the slice of rows of one bus and direction."""
+        start, stop = self.blocks.get(bus_uid, {}).get(type, (0, 0))
+        return slice(start, stop)
+
+    def bus_frame(self, bus_uid, type='input', date_from=None, date_to=None):
+        r"""Return the flows of one bus and direction in a time window.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One column per connected component (obj_uid), indexed by time.
+        """
+        rows = self.rows(bus_uid, type)
+        cols = self.window(date_from, date_to)
+        return pd.DataFrame(
+            np.array(self.values[rows, cols]).T,
+            index=self.time_idx[cols],
+            columns=[f['obj_uid'] for f in self.flows[rows]])
+
+    def region_buses(self, name):
+        """Return the uids of all buses of a region."""
+        for region in self.regions:
+            if region['name'] == name:
+                return region['buses']
+        raise KeyError(name)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling horizon optimisation of an energy system.
+
+Instead of one linear problem over the whole year the energy system is
+solved in overlapping windows (e.g. one week plus one day look-ahead). Only
+the first part of each window is kept, the storage level at the end of that
+part is passed to the next window as ``cap_initial``. The optimisation model
+of a window is discarded before the next one is built, so the peak memory
+depends on the window length and not on the length of the year.
+
+The stitched results replace ``esystem.results`` and have the same layout as
+the results of a single solve, so dump() and DataFramePlot work unchanged.
+
+@author: uwe
+"""
+import gc
+import logging
+from collections import UserDict
+
+import numpy as np
+
+from reegis_hp.tools import solver
+from reegis_hp.tools.typical_periods import SERIES_ATTRIBUTES
+
+
+def _storages(esystem):
+    from oemof.core.network.entities.components import transformers
+    return [e for e in esystem.entities
+            if isinstance(e, transformers.Storage)]
+
+
+def storage_level(esystem, storage, n):
+    r"""Return the storage level after the first `n` time steps of a window.
+
+    Uses the 'soc' entry of the results if the model provides it, otherwise
+    the level is calculated from the in- and outflows.
+    """
+    results = esystem.results
+    if 'soc' in results.get(storage, {}):
+        return float(results[storage]['soc'][n - 1])
+    inflow = np.asarray(results[storage.inputs[0]][storage][:n], dtype=float)
+    outflow = np.asarray(results[storage][storage.outputs[0]][:n],
+                         dtype=float)
+    level = float(storage.cap_initial or 0)
+    keep = 1 - (getattr(storage, 'cap_loss', 0) or 0)
+    for t in range(n):
+        level = (level * keep + inflow[t] * storage.eta_in -
+                 outflow[t] / storage.eta_out)
+    return level
+
+
+class RollingHorizon:
+    r"""Solve an energy system window by window.
+
+    Parameters
+    ----------
+    esystem : oemof.core.energy_system.EnergySystem
+        Energy system with the series of the full horizon.
+    window : int
+        Number of time steps kept from every solve (default: one week).
+    overlap : int
+        Additional look-ahead time steps of every solve (default: one day).
+        They avoid emptying the storages at the end of each window.
+    backend : reegis_hp.tools.solver.Backend, optional
+        Solver backend (default: ``esystem.optimize()``).
+    """
+
+    def __init__(self, esystem, window=168, overlap=24, backend=None):
+        self.esystem = esystem
+        self.window = window
+        self.overlap = overlap
+        self.backend = backend
+        self.window_objectives = []
+
+    def windows(self):
+        """Return (start, commit_end, horizon_end) of every window."""
+        n = len(self.esystem.time_idx)
+        return [(start, min(start + self.window, n),
+                 min(start + self.window + self.overlap, n))
+                for start in range(0, n, self.window)]
+
+    def _series(self):
+        series = {}
+        for entity in self.esystem.entities:
+            for attr in SERIES_ATTRIBUTES:
+                value = getattr(entity, attr, None)
+                if value is not None and np.ndim(value) == 1 and (
+                        len(value) == len(self.esystem.time_idx)):
+                    series[(entity, attr)] = value
+        return series
+
+    def optimize(self):
+        r"""Solve all windows and stitch the results.
+
+        Returns
+        -------
+        EnergySystem
+        """
+        es = self.esystem
+        storages = _storages(es)
+        if storages and storages[0].optimization_options.get('investment'):
+            logging.warning('Storage investment is optimised for every window '
+                            'separately in a rolling horizon run.')
+        time_idx = es.time_idx
+        timesteps = es.simulation.timesteps
+        series = self._series()
+        initial = {s: s.cap_initial for s in storages}
+        level = dict(initial)
+        stitched = UserDict()
+        self.window_objectives = []
+
+        try:
+            for start, commit, end in self.windows():
+                logging.info('Rolling horizon: solving hours {0} to {1} '
+                             '(keeping {0} to {2}).'.format(
+                                 start, end, commit))
+                # Positional slices, a pandas series would keep the labels
+                # of the full horizon and val[0] would fail after the first
+                # window.
+                for (entity, attr), value in series.items():
+                    setattr(entity, attr, np.asarray(value)[start:end])
+                for sto in storages:
+                    sto.cap_initial = level[sto]
+                es.time_idx = time_idx[start:end]
+                es.simulation.timesteps = list(range(end - start))
+
+                if self.backend is None:
+                    es.optimize()
+                else:
+                    solver.optimize(es, backend=self.backend)
+                self.window_objectives.append(
+                    getattr(es.results, 'objective', None))
+
+                n = commit - start
+                for sto in storages:
+                    level[sto] = storage_level(es, sto, n)
+                for entity, flows in es.results.items():
+                    target = stitched.setdefault(entity, UserDict())
+                    for key, values in flows.items():
+                        if np.ndim(values) == 1 and len(values) == end - start:
+                            target.setdefault(key, []).extend(values[:n])
+                es.results = None
+                gc.collect()
+        finally:
+            for (entity, attr), value in series.items():
+                setattr(entity, attr, value)
+            for sto in storages:
+                sto.cap_initial = initial[sto]
+            es.time_idx = time_idx
+            es.simulation.timesteps = timesteps
+
+        # The window objectives include the look-ahead, their sum is no
+        # valid objective of the full horizon.
+        stitched.objective = None
+        es.results = stitched
+        return es
+
+
+def optimize(esystem, window=168, overlap=24, backend=None):
+    """Shortcut for ``RollingHorizon(esystem, ...).optimize()``."""
+    return RollingHorizon(esystem, window, overlap, backend).optimize()
@@ -2,32 +2,47 @@
 """
 Created on Wed Mar 23 14:35:28 2016
 
+Export the result of a query to a csv or parquet file, e.g.
+
+    python small_requests.py alkis_gebaeude.csv \
+        --sql "SELECT DISTINCT gebaeude_1 FROM berlin.alkis_gebaeude"
+
 @author: uwe
 """
-import logging
-import time
-import pandas as pd
+import argparse
+
+
+def add_arguments(parser):
+    """Add the arguments of the export to an argparse parser."""
+    parser.add_argument('filename', help='output file (.csv or .parquet)')
+    parser.add_argument('--sql',
+                        default="SELECT DISTINCT gebaeude_1 "
+                                "FROM berlin.alkis_gebaeude",
+                        help='query to export')
+    parser.add_argument('--batch-size', type=int, default=50000,
+                        help='rows fetched and written at once')
+    return parser
 
-from oemof import db
-from oemof.tools import logger
 
+def export(args):
+    """Export the query of the parsed arguments."""
+    from oemof import db
+    from reegis_hp.tools import db_export
 
-logger.define_logging()
-conn = db.connection()
-start = time.time()
+    conn = db.connection()
+    return db_export.export_query(conn, args.sql, args.filename,
+                                  batch_size=args.batch_size)
 
-filename = "/home/uwe/data.csv"
 
-sql = "SELECT DISTINCT gebaeude_1 FROM berlin.alkis_gebaeude"
+def main(argv=None):
+    from oemof.tools import logger
 
-logging.info("SQL query: {0}".format(sql))
-logging.info("Retrieving data from db...")
-results = (conn.execute(sql))
-columns = results.keys()
+    parser = add_arguments(argparse.ArgumentParser(
+        description='Export the result of a query to a file.'))
+    args = parser.parse_args(argv)
+    logger.define_logging()
+    export(args)
 
-data = pd.DataFrame(results.fetchall(), columns=columns)
 
-# Store results to csv file
-logging.info("Store results to {0}".format(filename))
-data.to_csv(filename)
-logging.info("Elapsed time: {0}".format(time.time() - start))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Solver backends for the optimisation models.
+
+``EnergySystem.optimize()`` writes an LP file and calls the solver named in
+the simulation. A Backend passes the model in memory instead where pyomo
+has a direct interface (appsi_highs for HiGHS, gurobi_direct for gurobi).
+If that interface is not available, or for CBC and GLPK which pyomo only
+drives through files, the file based interface is used as fallback. HiGHS
+has no file based interface in pyomo.
+
+    backend = solver.Backend('highs', threads=4, time_limit=600,
+                             mip_gap=0.001)
+    stats = solver.optimize(energysystem, backend=backend)
+
+@author: uwe
+"""
+import logging
+import time
+
+# Pyomo interfaces per backend: in memory first, then file based.
+INTERFACES = {
+    'highs': [('appsi_highs', 'memory'), ('highs', 'memory')],
+    'gurobi': [('gurobi_direct', 'memory'), ('gurobi', 'file')],
+    'cbc': [('cbc', 'file')],
+    'glpk': [('glpk', 'file')],
+    'cplex': [('cplex_direct', 'memory'), ('cplex', 'file')]}
+
+# Names of the common options per backend (None: not supported).
+OPTION_NAMES = {
+    'highs': {'threads': 'threads', 'time_limit': 'time_limit',
+              'mip_gap': 'mip_rel_gap'},
+    'gurobi': {'threads': 'Threads', 'time_limit': 'TimeLimit',
+               'mip_gap': 'MIPGap'},
+    'cbc': {'threads': 'threads', 'time_limit': 'sec',
+            'mip_gap': 'ratioGap'},
+    'glpk': {'threads': None, 'time_limit': 'tmlim', 'mip_gap': 'mipgap'},
+    'cplex': {'threads': 'threads', 'time_limit': 'timelimit',
+              'mip_gap': 'mip_tolerances_mipgap'}}
+
+
+class Backend:
+    r"""Solver, handoff and common options of a solve.
+
+    Parameters
+    ----------
+    name : str
+        One of 'highs', 'cbc', 'gurobi', 'glpk' or 'cplex'.
+    threads : int, optional
+    time_limit : float, optional
+        Seconds.
+    mip_gap : float, optional
+        Relative MIP gap.
+    handoff : str
+        'memory' (fall back to a file if not possible) or 'file'.
+    options : dict, optional
+        Further solver specific options.
+    """
+
+    def __init__(self, name='highs', threads=None, time_limit=None,
+                 mip_gap=None, handoff='memory', options=None):
+        if name not in INTERFACES:
+            raise ValueError('Unknown solver backend {0}. Use one of {1}.'
+                             .format(name, sorted(INTERFACES)))
+        self.name = name
+        self.threads = threads
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.handoff = handoff
+        self.options = dict(options or {})
+
+    def solver_options(self):
+        r"""Return the options with the solver specific names."""
+        options = {}
+        for key, native in OPTION_NAMES[self.name].items():
+            value = getattr(self, key)
+            if value is None:
+                continue
+            if native is None:
+                logging.warning('{0} is not supported by {1}.'.format(
+                    key, self.name))
+                continue
+            options[native] = value
+        options.update(self.options)
+        return options
+
+    def interface(self):
+        r"""Return the solver, its pyomo name and the handoff of the first
+        available interface.
+        """
+        import pyomo.environ as po
+        candidates = INTERFACES[self.name]
+        if self.handoff == 'file':
+            candidates = [c for c in candidates if c[1] == 'file']
+        for pyomo_name, handoff in candidates:
+            try:
+                opt = po.SolverFactory(pyomo_name)
+                if opt.available(exception_flag=False):
+                    return opt, pyomo_name, handoff
+            except Exception as e:
+                logging.debug('{0} not available: {1}'.format(pyomo_name, e))
+            logging.info('Solver interface {0} not available.'.format(
+                pyomo_name))
+        raise RuntimeError('No interface of {0} is available.'.format(
+            self.name))
+
+
+def statistics(results, backend, pyomo_name, handoff, wall_time):
+    r"""Collect the solver statistics of a pyomo results object."""
+    info = results.solver
+    stats = {'backend': backend.name, 'interface': pyomo_name,
+             'handoff': handoff, 'wall_time': wall_time,
+             'status': str(info.status),
+             'termination': str(info.termination_condition)}
+    for key in ('time', 'wallclock_time', 'user_time'):
+        value = getattr(info, key, None)
+        if isinstance(value, (int, float)):
+            stats['solver_' + key] = value
+    problem = results.problem
+    for key in ('lower_bound', 'upper_bound', 'number_of_variables',
+                'number_of_constraints'):
+        value = getattr(problem, key, None)
+        if isinstance(value, (int, float)):
+            stats[key] = value
+    lower, upper = stats.get('lower_bound'), stats.get('upper_bound')
+    if lower is not None and upper is not None and upper:
+        stats['gap'] = abs(upper - lower) / abs(upper)
+    return stats
+
+
+def solve(om, backend=None, tee=False):
+    r"""Solve an optimisation model and return the solver statistics.
+
+    Parameters
+    ----------
+    om : oemof.solph.optimization_model.OptimizationModel
+    backend : Backend, optional
+        Default: HiGHS in memory.
+    tee : bool
+        Stream the solver output.
+
+    Returns
+    -------
+    dict
+    """
+    backend = backend or Backend()
+    opt, pyomo_name, handoff = backend.interface()
+    start = time.time()
+    results = opt.solve(om, tee=tee, options=backend.solver_options(),
+                        load_solutions=True)
+    stats = statistics(results, backend, pyomo_name, handoff,
+                       time.time() - start)
+    logging.info('Solved with {interface} ({handoff}) in {wall_time:.1f} s: '
+                 '{termination}'.format(**stats))
+    return stats
+
+
+def optimize(esystem, om=None, backend=None, tee=False):
+    r"""Replacement of ``esystem.optimize()`` using a solver backend.
+
+    Builds the model if `om` is not given, solves it and sets
+    ``esystem.results``.
+
+    Returns
+    -------
+    dict
+        Solver statistics.
+    """
+    if om is None:
+        from oemof.solph.optimization_model import OptimizationModel
+        om = OptimizationModel(energysystem=esystem)
+    stats = solve(om, backend, tee=tee)
+    esystem.results = om.results()
+    return stats
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Parameter sweeps over one energy system.
+
+The base system is built once (data loading and topology). A scenario is a
+set of parameter changes (a delta) per entity uid::
+
+    deltas = {
+        'capex_low': {'sto_simple': {'capex': 500}},
+        'gas_high': {'rgas': {'opex_var': 12e10},
+                     'chp_gas': {'out_max': [0.4e10, 0.6e10]}},
+        'rod_20': {'heatrod_oil': functools.partial(heatrod, fraction=0.2)}}
+    table = sweep.run(energysystem, deltas, workers=4)
+
+Derived parameters (like the `fraction` of heatrod_oil in example.py, which
+sets out_max and ub_out from the oil heat demand) are given as a callable
+``f(entity, esystem)`` returning the attribute dict. It has to be picklable,
+so use a module level function (with functools.partial).
+
+The scenarios run in a process pool with at most `workers` processes. The
+workers get the base system once at start-up; each scenario applies its
+delta, optimises and restores the original values before the next one, so
+nothing is loaded or built again.
+
+@author: uwe
+"""
+import itertools
+import logging
+import time
+
+import pandas as pd
+
+from reegis_hp.tools import parallel
+
+_template = None
+
+
+def _entities(esystem, uid):
+    r"""All entities with the uid (the scripts create more than one 'rgas'
+    commodity)."""
+    lookup = getattr(esystem.entities, 'lookup', None)
+    if lookup is not None:
+        entities = lookup(uid)
+    else:
+        entities = [e for e in esystem.entities if e.uid == uid]
+    if not entities:
+        raise KeyError('No entity with uid {0}.'.format(uid))
+    return entities
+
+
+def apply_delta(esystem, delta, undo=None):
+    r"""Set the parameters of a scenario.
+
+    The changes of a uid are applied to every entity with this uid.
+
+    Parameters
+    ----------
+    undo : list, optional
+        Every change is appended as soon as it is made, so the changes made
+        before an error can be undone as well.
+
+    Returns
+    -------
+    list of tuple
+        (entity, attribute, old value) to undo the changes with
+        :func:`restore`.
+    """
+    undo = [] if undo is None else undo
+    for uid, changes in delta.items():
+        for entity in _entities(esystem, uid):
+            values = changes(entity, esystem) if callable(changes) \
+                else changes
+            for attr, value in values.items():
+                undo.append((entity, attr, getattr(entity, attr)))
+                setattr(entity, attr, value)
+    return undo
+
+
+def restore(undo):
+    r"""Undo the changes returned by :func:`apply_delta`."""
+    for entity, attr, value in reversed(undo):
+        setattr(entity, attr, value)
+
+
+def objective(esystem):
+    r"""Default KPI: the objective value."""
+    return {'objective': esystem.results.objective}
+
+
+def grid(parameters):
+    r"""Create the deltas of all combinations of parameter values.
+
+    Parameters
+    ----------
+    parameters : dict
+        Values per (uid, attribute), e.g.
+        ``{('sto_simple', 'capex'): [500, 1000], ('rgas', 'opex_var'): [..]}``
+
+    Returns
+    -------
+    dict
+        Delta per scenario name.
+    """
+    keys = list(parameters)
+    deltas = {}
+    for values in itertools.product(*(parameters[k] for k in keys)):
+        delta = {}
+        for (uid, attr), value in zip(keys, values):
+            delta.setdefault(uid, {})[attr] = value
+        name = ', '.join('{0}.{1}={2}'.format(uid, attr, value)
+                         for (uid, attr), value in zip(keys, values))
+        deltas[name] = delta
+    return deltas
+
+
+def run_scenario(esystem, name, delta, kpis=objective):
+    r"""Optimise one scenario of `esystem` and return its KPIs."""
+    start = time.time()
+    undo = []
+    try:
+        apply_delta(esystem, delta, undo)
+        esystem.optimize()
+        result = dict(kpis(esystem), status='ok')
+    except Exception as e:
+        logging.error('Scenario {0} failed: {1}'.format(name, e))
+        result = {'status': 'failed: {0}'.format(e)}
+    finally:
+        restore(undo)
+    result['scenario'] = name
+    result['time'] = time.time() - start
+    return result
+
+
+def _init(template):
+    global _template
+    _template = template
+
+
+def _run(args):
+    name, delta, kpis = args
+    return run_scenario(_template, name, delta, kpis)
+
+
+def run(esystem, deltas, workers=None, kpis=objective):
+    r"""Optimise all scenarios and collect their KPIs.
+
+    Parameters
+    ----------
+    esystem : oemof.core.energy_system.EnergySystem
+        Base system. Its parameters are restored after every scenario.
+    deltas : dict
+        Delta per scenario name (see module doc or :func:`grid`).
+    workers : int, optional
+        Maximum number of scenarios solved at the same time (default:
+        number of cores). With 1 the scenarios run in this process.
+    kpis : callable
+        ``kpis(esystem)`` returns a dict of KPIs of a solved system.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scenario with the KPIs, the status and the run time.
+    """
+    start = time.time()
+    jobs = [(name, delta, kpis) for name, delta in deltas.items()]
+    if workers == 1:
+        rows = [run_scenario(esystem, *job) for job in jobs]
+    else:
+        with parallel.process_pool(workers, initializer=_init,
+                                   initargs=(esystem,)) as pool:
+            rows = list(pool.map(_run, jobs))
+    logging.info('Solved {0} scenarios in {1:.1f} s.'.format(
+        len(rows), time.time() - start))
+    return pd.DataFrame(rows).set_index('scenario')
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic energy systems of configurable size.
+
+The systems use the same components as experimental/example.py (gas and
+oil commodities, power plants, CHP, heat buses, heat storage rods, storages,
+wind and pv) and the Berlin/Brandenburg model (several regions connected by
+transports). All series are generated, so no database, csv file or
+commercial solver is needed.
+
+@author: uwe
+"""
+import numpy as np
+import pandas as pd
+
+from oemof.solph import predefined_objectives as predefined_objectives
+from oemof.core import energy_system as es
+from oemof.core.network.entities import Bus
+from oemof.core.network.entities.buses import HeatBus
+from oemof.core.network.entities.components import sinks as sink
+from oemof.core.network.entities.components import sources as source
+from oemof.core.network.entities.components import transformers as transformer
+from oemof.core.network.entities.components import transports as transport
+
+from reegis_hp.tools import entity_registry
+from reegis_hp.tools import regions
+
+
+def profiles(timesteps, seed=0):
+    r"""Return synthetic hourly series for demand, heat, wind and pv.
+
+    The values are normalised to a maximum of one.
+    """
+    rnd = np.random.RandomState(seed)
+    t = np.arange(timesteps)
+    day = np.sin((t % 24 - 6) / 24 * 2 * np.pi)
+    season = np.cos(t / 8760 * 2 * np.pi)
+    df = pd.DataFrame({
+        'elec': 0.6 + 0.3 * day + 0.1 * rnd.rand(timesteps),
+        'heat': 0.5 + 0.4 * season + 0.1 * rnd.rand(timesteps),
+        'wind': np.clip(rnd.weibull(2, timesteps) / 2.5, 0, 1),
+        'pv': np.clip(day, 0, None) * (0.6 - 0.4 * season) * rnd.uniform(
+            0.5, 1, timesteps)})
+    return df / df.max()
+
+
+def create_energy_system(n_regions=2, plants_per_region=5, timesteps=168,
+                         storage=True, chp=True, heat=True, solver='cbc',
+                         seed=0, links=None):
+    r"""Create a synthetic energy system.
+
+    Parameters
+    ----------
+    n_regions : int
+        Number of regions, connected as a chain by transports.
+    plants_per_region : int
+        Number of gas power plants per region.
+    timesteps : int
+        Number of hourly time steps.
+    storage, chp, heat : bool
+        Add a storage, a CHP plant and a district heating system (HeatBus,
+        boiler, heating rod) to every region.
+    solver : str
+        Solver of the simulation (an open-source solver by default).
+    links : pandas.DataFrame, optional
+        Transports between regions (see reegis_hp.tools.regions.link_table)
+        with the names region_0, region_1, ... Default: a chain.
+
+    Returns
+    -------
+    oemof.core.energy_system.EnergySystem
+    """
+    rnd = np.random.RandomState(seed)
+    time_index = pd.date_range('1/1/2010', periods=timesteps,
+                               freq=pd.offsets.Hour())
+    simulation = es.Simulation(
+        solver=solver, timesteps=list(range(timesteps)),
+        objective_options={'function': predefined_objectives.minimize_cost})
+    energysystem = es.EnergySystem(simulation=simulation,
+                                   time_idx=time_index)
+    entity_registry.index_entities(energysystem)
+
+    bgas = Bus(uid=('bus', 'global', 'gas'), type='gas', price=0,
+               balanced=True, excess=False)
+    source.Commodity(uid=('commodity', 'global', 'gas'), outputs=[bgas],
+                     out_max=[float('+inf')], opex_var=60)
+
+    series = profiles(timesteps, seed)
+    elec_buses = []
+    for r in range(n_regions):
+        name = 'region_{0}'.format(r)
+        region = es.Region(geom=None, name=name)
+        energysystem.regions.append(region)
+        scale = rnd.uniform(500, 1500)
+
+        bel = Bus(uid=('bus', name, 'elec'), type='elec', excess=True,
+                  regions=[region])
+        elec_buses.append(bel)
+        sink.Simple(uid=('sink', name, 'elec'), inputs=[bel],
+                    val=series['elec'] * scale, regions=[region])
+        for stype in ('wind', 'pv'):
+            source.FixedSource(uid=('FixedSrc', name, stype + '_pwr'),
+                               outputs=[bel], val=series[stype],
+                               out_max=[scale * rnd.uniform(0.2, 0.5)],
+                               regions=[region])
+        for p in range(plants_per_region):
+            transformer.Simple(
+                uid=('transformer', name, 'natural_gas', p), inputs=[bgas],
+                outputs=[bel], out_max=[scale / plants_per_region],
+                eta=[rnd.uniform(0.35, 0.58)],
+                opex_var=rnd.uniform(1, 5), regions=[region])
+        if storage:
+            transformer.Storage(
+                uid=('sto_simple', name, 'elec'), inputs=[bel], outputs=[bel],
+                eta_in=1, eta_out=0.8, cap_loss=0.00, opex_fix=35,
+                opex_var=0, capex=1000, cap_max=scale * 6, cap_initial=0,
+                c_rate_in=1/6, c_rate_out=1/6, regions=[region])
+        if heat:
+            bheat = HeatBus(uid=('bus', name, 'heat'), type='distr_heat',
+                            temperature=370, excess=True, regions=[region])
+            sink.Simple(uid=('sink', name, 'heat'), inputs=[bheat],
+                        val=series['heat'] * scale, regions=[region])
+            transformer.Simple(
+                uid=('boiler', name, 'natural_gas'), inputs=[bgas],
+                outputs=[bheat], opex_var=0, out_max=[scale * 1.2],
+                eta=[0.88], regions=[region])
+            transformer.Simple(
+                uid=('heatrod', name, 'elec'), inputs=[bel], outputs=[bheat],
+                opex_var=0, out_max=[scale * 0.2], eta=[0.95],
+                regions=[region])
+            if chp:
+                transformer.CHP(
+                    uid=('chp', name, 'natural_gas'), inputs=[bgas],
+                    outputs=[bel, bheat], opex_var=0,
+                    out_max=[scale * 0.3, scale * 0.5], eta=[0.3, 0.5],
+                    regions=[region])
+
+    if links is None:
+        for bus1, bus2 in zip(elec_buses[:-1], elec_buses[1:]):
+            energysystem.connect(bus1, bus2, in_max=10 ** 5, out_max=10 ** 5,
+                                 eta=0.97, transport_class=transport.Simple)
+    else:
+        regions.connect(energysystem, links)
+
+    for entity in energysystem.entities:
+        entity.uid = str(entity.uid)
+    energysystem.entities.reindex()
+    return energysystem
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Time series aggregation to typical periods (days or weeks).
+
+The hourly input series of all entities are cut into periods, clustered
+with k-means and every cluster is represented by its medoid, i.e. one real
+period of the year. The model is built on the concatenated representative
+periods only. Each representative carries the number of periods it stands
+for as its weight. After the optimisation the results are expanded back to
+the original time index so that dump() and the plot scripts work unchanged.
+
+The costs of every time step are multiplied with the weight of its period,
+so the objective is the cost of the full year and investments are valued
+against a full year of operation.
+
+Storages are kept consistent by forcing the energy balance of every storage
+to zero within each representative period. Every period then starts at
+``cap_initial``, no matter in which order the periods occur in the year, and
+no energy is shifted between periods (no seasonal storage).
+
+@author: uwe
+"""
+import logging
+import numpy as np
+import pandas as pd
+
+# Attributes of oemof entities that hold time series
+SERIES_ATTRIBUTES = ('val', 'ub_out', 'lb_out', 'ub_in', 'temperature',
+                     're_temperature')
+
+
+def _as_periods(values, period_length, n_periods):
+    """Reshape (hours x columns) to (periods x hours*columns) with padding."""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    missing = n_periods * period_length - len(values)
+    if missing:
+        values = np.concatenate([values, values[-missing:]])
+    return values.reshape(n_periods, period_length, values.shape[1])
+
+
+def _kmeans(x, k, n_iter, seed):
+    """Plain k-means with k-means++ initialisation. Returns the labels."""
+    rnd = np.random.RandomState(seed)
+    centres = [x[rnd.randint(len(x))]]
+    for _ in range(1, k):
+        dist = np.min([((x - c) ** 2).sum(axis=1) for c in centres], axis=0)
+        prob = dist / dist.sum() if dist.sum() > 0 else None
+        centres.append(x[rnd.choice(len(x), p=prob)])
+    centres = np.array(centres)
+    labels = None
+    for _ in range(n_iter):
+        dist = ((x[:, np.newaxis, :] - centres[np.newaxis]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for c in range(k):
+            if (labels == c).any():
+                centres[c] = x[labels == c].mean(axis=0)
+    return labels, centres
+
+
+class TypicalPeriods:
+    r"""Result of the clustering of hourly series into typical periods.
+
+    Attributes
+    ----------
+    period_length : int
+        Hours per period (24 for days, 168 for weeks).
+    n_hours : int
+        Length of the original series.
+    order : numpy.ndarray
+        Cluster of every original period (chronological).
+    representatives : numpy.ndarray
+        Original period index of the medoid of every cluster.
+    weights : numpy.ndarray
+        Number of original periods represented by every cluster.
+    """
+
+    def __init__(self, period_length, n_hours, order, representatives):
+        self.period_length = period_length
+        self.n_hours = n_hours
+        self.order = np.asarray(order)
+        self.representatives = np.asarray(representatives)
+        self.weights = np.bincount(self.order,
+                                   minlength=len(self.representatives))
+
+    @property
+    def n_periods(self):
+        return len(self.representatives)
+
+    @property
+    def timesteps(self):
+        """Number of time steps of the reduced model."""
+        return self.n_periods * self.period_length
+
+    def timestep_weights(self):
+        """Weight of every time step of the reduced model."""
+        return np.repeat(self.weights, self.period_length).astype(float)
+
+    def reduce(self, series):
+        """Cut the representative periods out of a full length series."""
+        periods = _as_periods(series, self.period_length, len(self.order))
+        reduced = periods[self.representatives].reshape(
+            self.timesteps, periods.shape[2])
+        if np.ndim(series) == 1:
+            reduced = reduced[:, 0]
+        if isinstance(series, pd.DataFrame):
+            return pd.DataFrame(reduced, columns=series.columns)
+        if isinstance(series, pd.Series):
+            return pd.Series(reduced, name=series.name)
+        return reduced
+
+    def expand(self, values, index=None):
+        """Map a series of the reduced model back to the original length."""
+        arr = np.asarray(values, dtype=float)
+        periods = arr.reshape((self.n_periods, self.period_length) +
+                              arr.shape[1:])
+        full = periods[self.order].reshape((-1,) + arr.shape[1:])
+        full = full[:self.n_hours]
+        if isinstance(values, pd.DataFrame):
+            return pd.DataFrame(full, columns=values.columns, index=index)
+        if isinstance(values, pd.Series) or index is not None:
+            return pd.Series(full, index=index)
+        return full
+
+
+def cluster(df, n_periods, period_length=24, n_iter=100, seed=42):
+    r"""Cluster the hourly series in `df` into `n_periods` typical periods.
+
+    Every column is scaled to its maximum absolute value first so that a
+    demand in Wh does not outweigh a normalised feed-in series. A trailing
+    incomplete period (e.g. the last 24 h of a year of 52 weeks) is filled
+    up with the last hours of the series.
+
+    Returns
+    -------
+    TypicalPeriods
+    """
+    n_hours = len(df)
+    n_original = -(-n_hours // period_length)
+    if n_periods >= n_original:
+        raise ValueError('{0} typical periods requested but the series only '
+                         'has {1} periods.'.format(n_periods, n_original))
+    values = np.asarray(df, dtype=float)
+    scale = np.abs(values).max(axis=0)
+    scale[scale == 0] = 1
+    x = _as_periods(values / scale, period_length, n_original).reshape(
+        n_original, -1)
+    labels, centres = _kmeans(x, n_periods, n_iter, seed)
+
+    # Empty clusters are dropped, the labels are renumbered.
+    used = np.unique(labels)
+    labels = np.searchsorted(used, labels)
+    representatives = []
+    for c, centre in enumerate(centres[used]):
+        members = np.flatnonzero(labels == c)
+        dist = ((x[members] - centre) ** 2).sum(axis=1)
+        representatives.append(members[dist.argmin()])
+    return TypicalPeriods(period_length, n_hours, labels, representatives)
+
+
+def series_of_entities(esystem, n_hours):
+    r"""Collect all hourly series attributes of the entities.
+
+    Returns a DataFrame with one column per (uid, attribute).
+    """
+    data = {}
+    for entity in esystem.entities:
+        for attr in SERIES_ATTRIBUTES:
+            value = getattr(entity, attr, None)
+            if value is not None and np.ndim(value) == 1 and (
+                    len(value) == n_hours):
+                data[(entity.uid, attr)] = np.asarray(value, dtype=float)
+    return pd.DataFrame(data)
+
+
+def reduce_energy_system(esystem, n_periods, period_length=24, **kwargs):
+    r"""Cluster the series of all entities and shrink the energy system.
+
+    The series attributes of the entities are replaced by their reduced
+    versions, the original values are kept in ``entity._full_series``. The
+    time index and the time steps of the simulation are set to the reduced
+    horizon.
+
+    Returns
+    -------
+    TypicalPeriods
+    """
+    n_hours = len(esystem.time_idx)
+    series = series_of_entities(esystem, n_hours)
+    tp = cluster(series, n_periods, period_length, **kwargs)
+    logging.info('Reduced {0} hours to {1} typical periods of {2} hours '
+                 '(weights: {3}).'.format(n_hours, tp.n_periods,
+                                          period_length, list(tp.weights)))
+    for entity in esystem.entities:
+        for attr in SERIES_ATTRIBUTES:
+            value = getattr(entity, attr, None)
+            if value is not None and np.ndim(value) == 1 and (
+                    len(value) == n_hours):
+                if not hasattr(entity, '_full_series'):
+                    entity._full_series = {}
+                entity._full_series[attr] = value
+                setattr(entity, attr, tp.reduce(value))
+    tp.time_index = esystem.time_idx
+    esystem.time_idx = esystem.time_idx[:tp.timesteps]
+    esystem.simulation.timesteps = list(range(tp.timesteps))
+    return tp
+
+
+def weight_objective(om, tp):
+    r"""Weight the costs of every time step with the periods it stands for.
+
+    The objective is rebuilt from its linear terms. The coefficient of every
+    variable indexed by a time step (the last index, e.g. ``om.w[a, b, t]``)
+    is multiplied with the weight of the step, the other terms (e.g.
+    investment) are kept. The weights add up to the hours of the original
+    horizon, so the objective is the cost of the full year.
+    """
+    import pyomo.environ as po
+    from pyomo.core.util import quicksum
+    from pyomo.repn import generate_standard_repn
+
+    weights = tp.timestep_weights()
+    weights *= tp.n_hours / weights.sum()
+    objective = next(om.component_data_objects(po.Objective, active=True))
+    repn = generate_standard_repn(objective.expr, quadratic=False)
+    if not repn.is_linear():
+        raise ValueError('The objective is not linear.')
+    coefs = []
+    for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+        index = var.index()
+        t = index[-1] if isinstance(index, tuple) else index
+        if isinstance(t, int) and 0 <= t < len(weights):
+            coef *= weights[t]
+        coefs.append(coef)
+    objective.deactivate()
+    om.weighted_objective = po.Objective(
+        expr=repn.constant + quicksum(
+            c * v for c, v in zip(coefs, repn.linear_vars)),
+        sense=objective.sense)
+    return om
+
+
+def add_storage_period_constraints(om, tp):
+    r"""Add a zero energy balance per typical period to every storage.
+
+    Every storage ends each period with the energy it started with, so it
+    can only shift energy within a period (no seasonal storage). Without
+    the constraint a storage could charge in one representative and
+    discharge in another, which is not possible in the original year. Uses
+    the flow variables ``om.w[from_uid, to_uid, t]`` of the model, the
+    constraint is exact for storages without ``cap_loss``.
+    """
+    import pyomo.environ as po
+    from oemof.core.network.entities.components import transformers
+
+    storages = {e.uid: e for e in om.energysystem.entities
+                if isinstance(e, transformers.Storage)}
+    periods = range(tp.n_periods)
+    L = tp.period_length
+
+    def balance_rule(model, uid, p):
+        sto = storages[uid]
+        bus_in = sto.inputs[0].uid
+        bus_out = sto.outputs[0].uid
+        return sum(model.w[bus_in, uid, t] * sto.eta_in -
+                   model.w[uid, bus_out, t] / sto.eta_out
+                   for t in range(p * L, (p + 1) * L)) == 0
+
+    om.typical_period_storage = po.Constraint(
+        list(storages), periods, rule=balance_rule)
+    if storages:
+        logging.info('{0} storages are balanced within every period of {1} '
+                     'hours.'.format(len(storages), L))
+    return om
+
+
+def optimize(esystem, tp, backend=None, storage_balance=True):
+    """Build the reduced model with weighted costs and solve it.
+
+    The costs of every time step are weighted (see :func:`weight_objective`)
+    and, with storage_balance, the storages are balanced per period (see
+    :func:`add_storage_period_constraints`). ``esystem.results.objective``
+    is the weighted objective, i.e. the cost of the full year. With a
+    solver backend (reegis_hp.tools.solver.Backend) the model is solved by
+    the backend instead of ``esystem.optimize()``.
+    """
+    import pyomo.environ as po
+    from oemof.solph.optimization_model import OptimizationModel
+
+    om = OptimizationModel(energysystem=esystem)
+    weight_objective(om, tp)
+    if storage_balance:
+        add_storage_period_constraints(om, tp)
+    if backend is not None:
+        from reegis_hp.tools import solver
+        solver.optimize(esystem, om, backend)
+    else:
+        esystem.optimize(om=om)
+    esystem.results.objective = po.value(om.weighted_objective)
+    logging.info('Objective of the full year ({0} typical periods): '
+                 '{1}'.format(tp.n_periods, esystem.results.objective))
+    return esystem
+
+
+def expand_energy_system(esystem, tp):
+    r"""Expand the results and the series attributes to the original horizon.
+
+    Afterwards ``esystem`` looks like the result of a full solve.
+    """
+    for entity, flows in esystem.results.items():
+        for key, values in flows.items():
+            if np.ndim(values) == 1 and len(values) == tp.timesteps:
+                flows[key] = list(tp.expand(values))
+    for entity in esystem.entities:
+        for attr, value in getattr(entity, '_full_series', {}).items():
+            setattr(entity, attr, value)
+        if hasattr(entity, '_full_series'):
+            del entity._full_series
+    esystem.time_idx = tp.time_index
+    esystem.simulation.timesteps = list(range(tp.n_hours))
+    return esystem
+
+
+def results_to_frame(esystem):
+    r"""Return all flows of the results as a DataFrame (one column per flow).
+
+    The columns are named 'from_uid -> to_uid' so that frames of different
+    runs can be compared.
+    """
+    data = {}
+    for entity, flows in esystem.results.items():
+        for other, values in flows.items():
+            if np.ndim(values) == 1:
+                name = '{0} -> {1}'.format(getattr(entity, 'uid', entity),
+                                           getattr(other, 'uid', other))
+                data[name] = values
+    return pd.DataFrame(data, index=esystem.time_idx)
+
+
+def results_error(full, reduced):
+    r"""Compare the flows of a full solve with an expanded reduced solve.
+
+    Parameters
+    ----------
+    full, reduced : pandas.DataFrame
+        Frames created by :func:`results_to_frame`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Sum of every flow in both runs, the relative error of the sums and
+        the root mean squared error of the hourly values.
+    """
+    columns = full.columns.intersection(reduced.columns)
+    full = full[columns].astype(float)
+    reduced = reduced[columns].astype(float).set_axis(full.index, axis=0)
+    error = pd.DataFrame({'sum_full': full.sum(),
+                          'sum_reduced': reduced.sum()})
+    error['rel_error'] = (error.sum_reduced - error.sum_full) / (
+        error.sum_full.where(error.sum_full != 0))
+    error['rmse'] = np.sqrt(((reduced - full) ** 2).mean())
+    return error
@@ -8,5 +8,9 @@ setup(name='reegis-hp',
       author_email='uwe.krien@rl-institut.de',
       description='A local heat and power system',
       package_dir={'reegis_hp': 'reegis_hp'},
-      install_requires=['oemof >= 0.0.6']
+      packages=['reegis_hp', 'reegis_hp.berlin_hp', 'reegis_hp.buildings',
+                'reegis_hp.tools'],
+      install_requires=['oemof >= 0.0.6', 'pyomo', 'demandlib'],
+      entry_points={
+          'console_scripts': ['reegis-hp = reegis_hp.cli:main']}
       )
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Optimised energy system with stand-ins for the oemof entities.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reegis_hp.tools import results_store
+
+
+class Entity:
+    """Stand-in for an oemof entity (hashable by identity)."""
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class Bus(Entity):
+    pass
+
+
+def component(*uid, **attributes):
+    return Entity(uid=uid, **attributes)
+
+
+@pytest.fixture
+def esystem(monkeypatch):
+    monkeypatch.setattr(results_store, '_bus_class', lambda: Bus)
+    hours = 48
+    rnd = np.random.RandomState(0)
+    be = Bus(uid=('bus', 'BE', 'elec'), type='elec')
+    heat = Bus(uid=('bus', 'BE', 'heat'), type='heat')
+    bb = Bus(uid=('bus', 'BB', 'elec'), type='elec')
+    lignite = component('transformer', 'BB', 'lignite', out_max=[900.0])
+    gas = Bus(uid=('bus', 'global', 'natural_gas'), type='natural_gas')
+    chp = component('transformer', 'BE', 'natural_gas',
+                    out_max=[200.0, 300.0], outputs=[be, heat])
+    commodity = component('commodity', 'global', 'natural_gas',
+                          out_max=[float('+inf')])
+    wind = component('FixedSrc', 'BB', 'wind_pwr', out_max=[50.0],
+                     val=rnd.uniform(0, 1, hours))
+    demand_be = component('sink', 'BE', 'elec')
+    demand_bb = component('sink', 'BB', 'elec')
+    demand_heat = component('sink', 'BE', 'heat')
+    to_be = component('transport', 'bus', 'BB', 'elec', 'bus', 'BE', 'elec')
+    to_bb = component('transport', 'bus', 'BE', 'elec', 'bus', 'BB', 'elec')
+    be.inputs, be.outputs = [chp, to_be], [demand_be, to_bb]
+    heat.inputs, heat.outputs = [chp], [demand_heat]
+    gas.inputs, gas.outputs = [commodity], [chp]
+    bb.inputs, bb.outputs = [lignite, wind, to_bb], [demand_bb, to_be]
+    results = {}
+    for bus in (be, bb, heat, gas):
+        for i in bus.inputs:
+            results.setdefault(i, {})[bus] = list(rnd.uniform(0, 1, hours))
+        results[bus] = {o: list(rnd.uniform(0, 1, hours))
+                        for o in bus.outputs}
+    return SimpleNamespace(
+        entities=[be, bb, heat, lignite, chp, wind, demand_be, demand_bb,
+                  demand_heat, to_be, to_bb, gas, commodity],
+        results=results, regions=[
+            SimpleNamespace(name='BE', entities=[be, heat, chp, demand_be]),
+            SimpleNamespace(name='BB', entities=[bb, lignite, wind])],
+        time_idx=pd.date_range('2010-01-01', periods=hours,
+                               freq=pd.offsets.Hour()))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+The array evaluation of buildings against the scalar evaluation.
+"""
+import logging
+import math
+
+import pandas as pd
+import pytest
+
+from reegis_hp.buildings import evaluation
+
+
+@pytest.fixture
+def buildings():
+    return pd.DataFrame({
+        'population_density': [52, 80, 120, 52, 20, 200],
+        'area': [166.7, 90.0, 450.0, 1200.0, 60.0, 300.0],
+        'perimeter': [61.166, 38.0, 86.0, 150.0, 31.0, 70.0],
+        'length': [23.485, 10.0, 25.0, 50.0, 8.0, 20.0],
+        'floors': [3.5, 1, 5, 8, 2, 1.5],
+        'year_of_construction': [2004, 1890, 1950, 2004, 1980, 1965]},
+        index=[10, 11, 12, 13, 14, 15])
+
+
+def lookup_evaluator(population_density, area, perimeter, length, floors,
+                     year_of_construction):
+    """Scalar evaluator with table lookups like the Open_eQuarter one."""
+    if year_of_construction < 1950:
+        u_wall = 1.4
+    elif year_of_construction < 1980:
+        u_wall = 1.0
+    else:
+        u_wall = 0.4
+    common_walls = min(2, math.log(population_density) / 2)
+    wall = (perimeter - common_walls * area / length) * floors * 3
+    return {'wall_area': wall, 'wall_loss': wall * u_wall * 80,
+            'living_area': area * floors * 0.8}
+
+
+def branching_evaluator(population_density, area, perimeter, length, floors,
+                        year_of_construction):
+    """Branches on the geometry, so it cannot take arrays."""
+    return {'roof_area': area * 1.2 if floors > 2 else area}
+
+
+def _scalar(evaluator, df):
+    return pd.DataFrame(
+        [evaluator(**row) for row in df.to_dict('records')], index=df.index)
+
+
+def test_lookups_get_scalars(buildings, caplog):
+    with caplog.at_level(logging.WARNING):
+        array = evaluation.evaluate_buildings(buildings, lookup_evaluator)
+    assert not caplog.records
+    assert array.index.equals(buildings.index)
+    pd.testing.assert_frame_equal(array, _scalar(lookup_evaluator,
+                                                 buildings))
+
+
+def test_fallback_to_rows(buildings, caplog):
+    with caplog.at_level(logging.WARNING):
+        result = evaluation.evaluate_buildings(buildings,
+                                               branching_evaluator)
+    assert 'one by one' in caplog.text
+    pd.testing.assert_frame_equal(result, _scalar(branching_evaluator,
+                                                  buildings))
+
+
+def test_compare_with_scalar(buildings):
+    deviation = evaluation.compare_with_scalar(buildings, lookup_evaluator)
+    assert (deviation == 0).all()
+
+
+@pytest.mark.parametrize('module', ['building_evaluation', 'energy_demand'])
+def test_open_e_quarter(buildings, module):
+    evaluator = pytest.importorskip(
+        'Open_eQuarterPy.stat_util.{0}'.format(module)).evaluate_building
+    columns = evaluation.COLUMNS
+    if module == 'energy_demand':
+        columns = ('population_density', 'area', 'floors',
+                   'year_of_construction')
+    evaluation.compare_with_scalar(buildings, evaluator, columns, rtol=1e-9)
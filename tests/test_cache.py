@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Keys and eviction of the disk cache.
+"""
+import os
+
+import pandas as pd
+import pytest
+import shapely
+
+from reegis_hp.tools import cache
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield cache.DiskCache(str(tmp_path / 'cache'), max_size=10 ** 9)
+    cache._sizes.pop(os.path.abspath(str(tmp_path / 'cache')), None)
+
+
+def table():
+    return pd.DataFrame({'a': [1, 2, 3], 'b': [4.0, 5.0, 6.0]},
+                        index=['x', 'y', 'z'])
+
+
+def test_fingerprint_equal_tables():
+    assert cache.fingerprint(table()) == cache.fingerprint(table())
+
+
+@pytest.mark.parametrize('change', [
+    lambda df: df.rename(columns={'a': 'c'}),
+    lambda df: df.iloc[::-1],
+    lambda df: df.set_axis(['x', 'y', 'w']),
+    lambda df: df.rename_axis('cell'),
+    lambda df: df[['b', 'a']],
+    lambda df: df.assign(a=[1, 2, 4]),
+    lambda df: df['a']])
+def test_fingerprint_changed_tables(change):
+    assert cache.fingerprint(change(table())) != cache.fingerprint(table())
+
+
+def test_call_without_connection(store):
+    calls = []
+
+    def polygon(conn, nuts):
+        calls.append(nuts)
+        return shapely.box(0, 0, 1, 1)
+
+    conn = cache.LazyConnection(lambda: pytest.fail('connected'))
+    for n in range(2):
+        assert store.call(polygon, conn, 'DE3', tag=2012).equals(
+            shapely.box(0, 0, 1, 1))
+    assert calls == ['DE3']
+    assert not conn.connected
+    pd.testing.assert_frame_equal(store.call(lambda t: t, table()), table())
+
+
+def test_scan_only_over_limit(store, monkeypatch):
+    scans = []
+    entries = cache.DiskCache.entries
+
+    def counted(self):
+        scans.append(1)
+        return entries(self)
+
+    monkeypatch.setattr(cache.DiskCache, 'entries', counted)
+    for n in range(5):
+        store.set('key{0}'.format(n), table())
+    assert len(scans) == 1
+    store.max_size = store.size() // 2
+    del scans[:]
+    store.set('key5', table())
+    assert scans
+    assert store.size() <= store.max_size
+
+
+def test_evict_least_recently_used(store):
+    for n in range(4):
+        store.set('key{0}'.format(n), table())
+        path = os.path.join(store.path, 'key{0}'.format(n), 'manifest.json')
+        os.utime(path, (n, n))
+    store.get('key0')
+    # The manifests may differ by a few bytes.
+    store.max_size = store.size() // 2 + 100
+    store.evict()
+    assert store.has('key0') and store.has('key3')
+    assert not store.has('key1') and not store.has('key2')
+
+
+def test_scan_during_writes(store, monkeypatch):
+    store.set('key0', table())
+    store.set('key1', table())
+    # An entry being written, one without manifest yet and a stray file.
+    os.makedirs(os.path.join(store.path, 'key2.123.tmp'))
+    os.makedirs(os.path.join(store.path, 'key3'))
+    open(os.path.join(store.path, 'key4'), 'w').close()
+    assert sorted(store.entries()['key']) == ['key0', 'key1']
+
+    # key1 is removed by another process after the scan.
+    entries = cache.DiskCache.entries
+
+    def scanned(self):
+        found = entries(self)
+        cache.shutil.rmtree(os.path.join(self.path, 'key1'))
+        return found
+
+    monkeypatch.setattr(cache.DiskCache, 'entries', scanned)
+    store.max_size = 1
+    cache._sizes[store._size_key()] = 2
+    store.evict()
+    assert not store.has('key0') and not store.has('key1')
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk queries of DataAccess against the oemof.db functions.
+
+Both run on a SQLite database with the tables of oemof.db. The PostGIS
+functions used by the queries are registered as SQLite functions based on
+shapely, geometries are stored as WKT.
+"""
+import sqlite3
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import shapely
+
+from reegis_hp.tools import data_access
+
+db_pps = pytest.importorskip('oemof.db.powerplants')
+db_tools = pytest.importorskip('oemof.db.tools')
+
+
+def box(x0, y0, x1, y1):
+    return shapely.box(x0, y0, x1, y1).wkt
+
+
+def point(x, y):
+    return shapely.Point(x, y).wkt
+
+
+class Union:
+    def __init__(self):
+        self.geoms = []
+
+    def step(self, wkt):
+        self.geoms.append(shapely.from_wkt(wkt))
+
+    def finalize(self):
+        return shapely.union_all(self.geoms).wkt
+
+
+def register(conn, path):
+    conn.create_function('ST_GeomFromText', 2, lambda wkt, srid: wkt)
+    conn.create_function('ST_PointFromText', 2, lambda wkt, srid: wkt)
+    conn.create_function('ST_Transform', 2, lambda wkt, srid: wkt)
+    conn.create_function('ST_AsText', 1, lambda wkt: wkt)
+    conn.create_function('ST_X', 1, lambda wkt: shapely.from_wkt(wkt).x)
+    conn.create_function('ST_Y', 1, lambda wkt: shapely.from_wkt(wkt).y)
+    conn.create_function('ST_Contains', 2, lambda a, b: int(
+        shapely.contains(shapely.from_wkt(a), shapely.from_wkt(b))))
+    conn.create_aggregate('ST_Union', 1, Union)
+    for schema in ('oemof', 'oemof_test'):
+        conn.execute("ATTACH DATABASE '{0}' AS {1}".format(
+            path / '{0}.db'.format(schema), schema))
+
+
+# Two regions, DE3 of two rows, with plants inside, outside and on the
+# border of the regions (not counted, like ST_Contains).
+NUTS = [('DE3', box(0, 0, 2, 1)), ('DE3', box(0, 1, 2, 2)),
+        ('DE4', box(2, 0, 4, 2)), ('DE5', box(9, 9, 10, 10))]
+BNETZA = [('Braunkohle', None, 800.0, point(0.5, 0.5)),
+          ('Erdgas', 'Öl', 120.0, point(1.5, 1.5)),
+          ('Steinkohle', None, 300.0, point(2.0, 1.0)),
+          ('Erdgas', None, 40.0, point(3.5, 0.5)),
+          ('Abfall', None, 20.0, point(3.2, 1.2)),
+          ('Braunkohle', None, 900.0, point(5.0, 5.0))]
+ENERGYMAP = [('Solarstrom', 'Dach', 0.5, point(0.2, 0.2)),
+             ('Solarstrom', 'Dach', 0.25, point(0.7, 0.3)),
+             ('Windkraft', None, 3.0, point(1.6, 0.4)),
+             ('Windkraft', None, 2.0, point(1.0, 0.5)),
+             ('Solarstrom', None, 1.0, point(3.5, 1.5)),
+             ('Windkraft', None, 7.5, point(2.5, 0.5)),
+             ('Wasserkraft', None, 5.0, point(2.6, 0.6))]
+WINDZONES = [(1, box(0, 0, 2.2, 5)), (3, box(2.2, 0, 5, 5))]
+# Weather cells of 1 x 1.
+CELLS = [SimpleNamespace(name=10 * i + j, geometry=shapely.box(i, j, i + 1,
+                                                               j + 1))
+         for i in range(4) for j in range(2)]
+
+
+@pytest.fixture
+def database(tmp_path):
+    with sqlite3.connect(tmp_path / 'oemof.db') as conn:
+        pd.DataFrame(NUTS, columns=['nuts_id', 'geom']).to_sql(
+            'geo_nuts_rg_2013', conn, index=False)
+    with sqlite3.connect(tmp_path / 'oemof_test.db') as conn:
+        pd.DataFrame(BNETZA, columns=[
+            'auswertung', 'ersatzbrennstoff', 'el_nennleistung', 'geom']
+            ).to_sql('geo_power_plant_bnetza_2014', conn, index=False)
+        pd.DataFrame(ENERGYMAP, columns=[
+            'anlagentyp', 'anuntertyp', 'p_nenn_kwp', 'geom']).to_sql(
+            'energy_map', conn, index=False)
+        pd.DataFrame(WINDZONES, columns=['zone', 'geom']).to_sql(
+            'windzones', conn, index=False)
+    conn = sqlite3.connect(tmp_path / 'main.db')
+    register(conn, tmp_path)
+
+    from sqlalchemy import event
+    access = data_access.DataAccess(
+        'sqlite:///{0}'.format(tmp_path / 'main.db'), pool_size=1)
+    event.listen(access.engine, 'connect',
+                 lambda dbapi, record: register(dbapi, tmp_path))
+    yield conn, access
+    access.dispose()
+    conn.close()
+
+
+def rows(df):
+    """Sorted rows with None for missing subtypes (NULL is NaN or None)."""
+    return sorted((t, s if isinstance(s, str) else None, float(c))
+                  for t, s, c in df.itertuples(index=False))
+
+
+def test_polygons(database):
+    conn, access = database
+    geoms = access.polygons(['DE3', 'DE4'])
+    for nuts, geom in geoms.items():
+        assert geom.equals(db_tools.get_polygon_from_nuts(conn, nuts))
+
+
+def test_power_plants(database):
+    conn, access = database
+    geoms = access.polygons(['DE3', 'DE4', 'DE5'])
+    pps = access.power_plants(geoms)
+    for nuts, geom in geoms.items():
+        expected = db_pps.get_bnetza_pps(conn, geom)
+        result = pps[nuts]
+        assert list(result.columns) == list(expected.columns)
+        assert rows(result) == rows(expected)
+    # Translated like the de_en dict of oemof.db.
+    assert set(pps['DE4']['type']) == {'natural_gas', 'waste'}
+    assert len(pps['DE5']) == 0
+
+
+def test_res_capacities(database):
+    conn, access = database
+    geoms = access.polygons(['DE3', 'DE4'])
+    weather = {nuts: [w for w in CELLS if w.geometry.intersects(geom) and
+                      not w.geometry.touches(geom)]
+               for nuts, geom in geoms.items()}
+    tables = access.res_capacities(geoms, weather)
+    for nuts, geom in geoms.items():
+        table = tables[nuts].set_index('cell')
+        assert list(table.index) == [w.name for w in weather[nuts]]
+        for w in weather[nuts]:
+            # Like feedin_pg: the plants within the cell and the region.
+            pps = db_pps.get_energymap_pps(conn, geometry1=w.geometry,
+                                           geometry2=geom)
+            cap = pps.groupby('type')['cap'].sum()
+            assert table.loc[w.name, 'pv_pwr'] == pytest.approx(
+                cap.get('solar_power', 0))
+            assert table.loc[w.name, 'wind_pwr'] == pytest.approx(
+                cap.get('wind_power', 0))
+            assert table.loc[w.name, 'wind_class'] == \
+                db_tools.get_windzone(conn, w.geometry)
+    # The plant at (1, 0.5) is on the border of two cells and not counted.
+    assert tables['DE3']['wind_pwr'].sum() == pytest.approx(3.0)
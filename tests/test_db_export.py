@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming export of queries to csv and parquet files.
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from reegis_hp.tools import db_export
+
+# The capacity is NULL in the first rows only and the subtype in all rows
+# of the first batch (batch_size=2).
+PLANTS = [('Braunkohle', None, None), ('Erdgas', None, None),
+          ('Erdgas', 'Öl', 120), ('Steinkohle', None, 300),
+          ('Abfall', 'Holz', 20)]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    engine = create_engine('sqlite:///{0}'.format(tmp_path / 'db.sqlite'))
+    with engine.begin() as c:
+        pd.DataFrame(PLANTS, columns=['type', 'subtype', 'cap']).to_sql(
+            'pps', c, index=False)
+    with engine.connect() as c:
+        yield c
+    engine.dispose()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_export(conn, tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'pps.{0}'.format(fmt))
+    rows = db_export.export_query(conn, text('SELECT * FROM pps'), filename,
+                                  batch_size=2)
+    assert rows == len(PLANTS)
+    df = getattr(pd, 'read_{0}'.format(fmt))(filename)
+    assert list(df['type']) == [p[0] for p in PLANTS]
+    assert list(df['subtype'].fillna('-')) == [p[1] or '-' for p in PLANTS]
+    assert list(df['cap'].fillna(-1)) == [
+        -1 if p[2] is None else p[2] for p in PLANTS]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_empty_export_has_header(conn, tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'pps.{0}'.format(fmt))
+    rows = db_export.export_query(
+        conn, text("SELECT * FROM pps WHERE type = 'none'"), filename)
+    assert rows == 0
+    df = getattr(pd, 'read_{0}'.format(fmt))(filename)
+    assert len(df) == 0
+    assert list(df.columns) == ['type', 'subtype', 'cap']
+
+
+def test_parquet_schema(conn, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    filename = str(tmp_path / 'pps.parquet')
+    schema = pa.schema([('type', pa.string()), ('subtype', pa.string()),
+                        ('cap', pa.float32())])
+    db_export.export_query(conn, text('SELECT * FROM pps'), filename,
+                           batch_size=2, schema=schema)
+    assert pq.read_schema(filename).field('cap').type == pa.float32()
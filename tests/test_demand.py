@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Demand of many building entries from the demandlib profiles.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+bdew = pytest.importorskip('demandlib.bdew')
+
+from reegis_hp.tools import demand  # noqa: E402
+
+ELEC = [{'annual_elec_demand': 2000, 'selp_type': 'h0', 'region': 'A'},
+        {'annual_elec_demand': 1000, 'selp_type': 'g0', 'region': 'A'},
+        {'annual_elec_demand': 3000, 'selp_type': 'i0', 'region': 'B'},
+        {'annual_elec_demand': 500, 'selp_type': 'h0', 'region': 'B'}]
+HEAT = [{'building_class': 11, 'wind_class': 0, 'annual_heat_demand': 5000,
+         'shlp_type': 'efh'},
+        {'building_class': 0, 'wind_class': 1, 'annual_heat_demand': 3000,
+         'shlp_type': 'ghd'}]
+
+
+def temperature(year, offset=0):
+    index = demand.time_index(year)
+    t = np.arange(len(index))
+    return pd.Series(8 - 10 * np.cos(2 * np.pi * t / len(index)) +
+                     4 * np.sin(2 * np.pi * t / 24) + offset, index=index)
+
+
+def test_leap_year():
+    assert len(demand.time_index(2012)) == 8784
+    assert len(demand.elec_profiles(2012)) == 8784
+
+
+def test_elec_profile_is_demandlib():
+    expected = bdew.ElecSlp(2010).slp_frame['g0']
+    expected = expected.resample(pd.offsets.Hour()).sum()
+    profile = demand.DemandEngine().elec_profile(2010, 'g0')
+    np.testing.assert_allclose(profile.to_numpy(),
+                               expected.to_numpy() / expected.sum())
+
+
+def test_heat_profile_is_demandlib():
+    temp = temperature(2010)
+    expected = bdew.HeatBuilding(
+        temp.index, temperature=temp, shlp_type='efh', wind_class=0,
+        building_class=11, annual_heat_demand=1000,
+        holidays={}).get_bdew_profile()
+    profile = demand.heat_profile(temp, 'efh', 0, 11)
+    np.testing.assert_allclose(profile.to_numpy(),
+                               expected.to_numpy() / expected.sum())
+
+
+def test_heat_profile_follows_temperature():
+    cold = demand.heat_profile(temperature(2010, -5), 'efh', 0, 11)
+    warm = demand.heat_profile(temperature(2010, 5), 'efh', 0, 11)
+    winter = slice('2010-01-01', '2010-02-28')
+    assert cold[winter].sum() != pytest.approx(warm[winter].sum())
+    # Within a day the hourly shares depend on the temperature as well.
+    day = '2010-01-15'
+    assert not np.allclose(cold[day] / cold[day].sum(),
+                           warm[day] / warm[day].sum())
+
+
+def test_aggregate_per_region():
+    engine = demand.DemandEngine()
+    df = engine.aggregate(ELEC, 'elec', 2010)
+    assert list(df.columns) == ['A', 'B']
+    np.testing.assert_allclose(df.sum(), [3000, 3500])
+    matrix = engine.building_matrix(ELEC, 'elec', 2010)
+    np.testing.assert_allclose(matrix[[0, 1]].sum(axis=0), df['A'])
+
+
+def test_region_demand():
+    d = demand.DemandEngine().region_demand(
+        2012, ELEC, HEAT, temperature(2012), region='B')
+    assert len(d) == 8784
+    np.testing.assert_allclose(d.sum(), [3500, 8000])
+
+
+def test_profiles_are_memoised(monkeypatch):
+    calls = []
+    elec_profiles = demand.elec_profiles
+
+    def count(*args, **kwargs):
+        calls.append(args)
+        return elec_profiles(*args, **kwargs)
+
+    monkeypatch.setattr(demand, 'elec_profiles', count)
+    engine = demand.DemandEngine()
+    engine.aggregate(ELEC, 'elec', 2010)
+    engine.region_demand(2010, ELEC, region='A')
+    assert len(calls) == 1
+
+
+def test_unknown_type():
+    with pytest.raises(ValueError):
+        demand.DemandEngine().elec_profile(2010, 'x0')
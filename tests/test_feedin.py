@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Batched feed-in against Feedin().aggregate_cap_val of oemof.db.
+
+Both run on stand-ins of the feedinlib power plants, the weather cells and
+the energymap queries, so no database or feedinlib models are needed.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from reegis_hp.tools import feedin
+
+SITE = {'module_name': 'Yingli_YL210__2008__E__', 'azimuth': 0, 'tilt': 0,
+        'albedo': 0.2, 'hoy': 8760, 'h_hub': 135, 'd_rotor': 127,
+        'wka_model': 'ENERCON E 126 7500',
+        'h_hub_dc': {1: 135, 2: 78, 3: 98, 4: 138, 0: 135},
+        'd_rotor_dc': {1: 127, 2: 82, 3: 82, 4: 82, 0: 127},
+        'wka_model_dc': {1: 'ENERCON E 126 7500', 2: 'ENERCON E 82 3000',
+                         3: 'ENERCON E 82 2300', 4: 'ENERCON E 82 2300',
+                         0: 'ENERCON E 126 7500'}}
+
+CALLS = []
+
+
+class WindPowerPlant:
+    nominal = {'ENERCON E 126 7500': 7.5e6, 'ENERCON E 82 3000': 3e6,
+               'ENERCON E 82 2300': 2.3e6}
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+    def feedin(self, weather, installed_capacity):
+        CALLS.append(('wind', weather.name))
+        v = weather.data['v_wind'] * (self.h_hub / 10) ** 0.2
+        power = np.clip((v - 3) / 9, 0, 1) ** 3 * self.d_rotor ** 2
+        return power / self.nominal[self.wind_conv_type] * installed_capacity
+
+
+class Photovoltaic:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+    def feedin(self, weather, peak_power):
+        CALLS.append(('pv', weather.name))
+        ghi = weather.data['dhi'] + weather.data['dirhi']
+        return ghi / 1000 * (1 - self.albedo / 10) * peak_power
+
+
+PLANTS = SimpleNamespace(WindPowerPlant=WindPowerPlant,
+                         Photovoltaic=Photovoltaic)
+
+
+def cell(gid, x, seed):
+    rnd = np.random.RandomState(seed)
+    index = pd.date_range('1/1/2010', periods=48, freq=pd.offsets.Hour())
+    data = pd.DataFrame({'v_wind': rnd.uniform(0, 15, 48),
+                         'dhi': rnd.uniform(0, 200, 48),
+                         'dirhi': rnd.uniform(0, 300, 48),
+                         'temp_air': 280.0}, index=index)
+    return SimpleNamespace(name=gid, data=data, geometry=shapely.Point(x, 0),
+                           data_height={'v_wind': 10})
+
+
+CELLS = [cell(1, 0.5, 0), cell(2, 1.5, 1), cell(3, 2.5, 2)]
+# Capacity (pv, wind) and wind zone per cell.
+CAPACITY = {1: (2e6, 6e6), 2: (0.0, 3e6), 3: (5e5, 0.0)}
+ZONES = {1: 0, 2: 2, 3: 3}
+
+
+def capacities(cells):
+    return pd.DataFrame(
+        [(w.name, CAPACITY[w.name][0], CAPACITY[w.name][1], ZONES[w.name])
+         for w in cells],
+        columns=['cell', 'pv_pwr', 'wind_pwr', 'wind_class'])
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    del CALLS[:]
+
+
+def test_same_as_aggregate_cap_val(monkeypatch):
+    feedin_pg = pytest.importorskip('oemof.db.feedin_pg')
+    by_point = {w.geometry.wkt: w for w in CELLS}
+
+    def energymap(conn, geometry1, geometry2=None):
+        pv, wind = CAPACITY[by_point[geometry1.wkt].name]
+        return pd.DataFrame({'type': ['solar_power', 'wind_power'],
+                             'cap': [pv, wind]})
+
+    monkeypatch.setattr(feedin_pg.coastdat, 'get_weather',
+                        lambda conn, geom, year: list(CELLS))
+    monkeypatch.setattr(feedin_pg.pg_pp, 'get_energymap_pps', energymap)
+    monkeypatch.setattr(feedin_pg.tools, 'get_windzone',
+                        lambda conn, geom: ZONES[by_point[geom.wkt].name])
+    monkeypatch.setattr(feedin_pg, 'pp', PLANTS)
+    region = SimpleNamespace(geom=shapely.box(0, -1, 3, 1), name='A')
+    expected, expected_cap = feedin_pg.Feedin().aggregate_cap_val(
+        None, region=region, year=2010, bustype='elec', **SITE)
+
+    stage = feedin.FeedinStage(plants=PLANTS)
+    result, cap = stage.aggregate(CELLS, 2010, SITE, capacities(CELLS))
+    np.testing.assert_allclose(result['pv_pwr'], expected['pv_pwr'])
+    np.testing.assert_allclose(result['wind_pwr'], expected['wind_pwr'])
+    assert cap.to_dict() == expected_cap.to_dict()
+
+
+def test_wind_classes():
+    techs = feedin.technologies(SITE)
+    assert techs[('wind_pwr', 2)] == feedin.Technology(
+        'wind', 'ENERCON E 82 3000', 78, 82, None, None, None)
+    stage = feedin.FeedinStage(plants=PLANTS)
+    plant = stage.power_plant(techs[('wind_pwr', 3)], SITE)
+    assert (plant.wind_conv_type, plant.h_hub, plant.d_rotor) == (
+        'ENERCON E 82 2300', 98, 82)
+
+
+def test_cells_are_computed_once(tmp_path):
+    stage = feedin.FeedinStage(str(tmp_path), plants=PLANTS)
+    first = stage.aggregate(CELLS[:2], 2010, SITE, capacities(CELLS[:2]))[0]
+    # Cell 2 is shared with the second region.
+    stage.aggregate(CELLS[1:], 2010, SITE, capacities(CELLS[1:]))
+    assert sorted(CALLS) == sorted(
+        [(kind, gid) for kind in ('pv', 'wind') for gid in (1, 2, 3)])
+
+    # A new process reads the cells from the disk cache.
+    del CALLS[:]
+    again = feedin.FeedinStage(str(tmp_path), plants=PLANTS).aggregate(
+        CELLS[:2], 2010, SITE, capacities(CELLS[:2]))[0]
+    assert CALLS == []
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_no_capacity():
+    caps = capacities(CELLS).assign(pv_pwr=0.0)
+    result, cap = feedin.FeedinStage(plants=PLANTS).aggregate(
+        CELLS, 2010, SITE, caps)
+    assert cap['pv_pwr'] == 0
+    assert (result['pv_pwr'] == 0).all()
+
+
+def test_no_cells():
+    with pytest.raises(ValueError):
+        feedin.FeedinStage(plants=PLANTS).aggregate(
+            CELLS, 2010, SITE, capacities([]))
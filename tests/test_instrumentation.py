@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Timed phases and profiling of a run report.
+"""
+import json
+import logging
+import os
+
+from reegis_hp.tools import instrumentation
+
+
+def test_phases(tmp_path):
+    run = instrumentation.RunReport(directory=str(tmp_path))
+    with run.phase('optimize'):
+        with run.phase('solve') as p:
+            p.counts['variables'] = 3
+    run.begin('write results')
+    run.end(flows=10)
+    filename = str(tmp_path / 'report.json')
+    run.write(filename)
+    with open(filename) as f:
+        phases = {p['name']: p for p in json.load(f)['phases']}
+    assert set(phases) == {'optimize', 'optimize/solve', 'write results'}
+    assert phases['optimize/solve']['counts'] == {'variables': 3}
+    assert phases['write results']['counts'] == {'flows': 10}
+
+
+def test_disabled(tmp_path):
+    run = instrumentation.RunReport(enabled=False, profile='solve',
+                                    directory=str(tmp_path))
+    with run.phase('solve') as p:
+        p.counts['variables'] = 3
+    run.write(str(tmp_path / 'report.json'))
+    assert run.phases == []
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_profile_without_report(tmp_path):
+    run = instrumentation.RunReport(profile='optimize/solve',
+                                    directory=str(tmp_path))
+    with run.phase('optimize'):
+        with run.phase('solve'):
+            sum(range(1000))
+    run.write()
+    assert os.listdir(str(tmp_path)) == ['profile_optimize_solve.prof']
+
+
+def test_unknown_profile_phase(tmp_path, caplog):
+    run = instrumentation.RunReport(profile='model built',
+                                    directory=str(tmp_path))
+    with run.phase('model build'):
+        pass
+    with caplog.at_level(logging.WARNING):
+        run.write()
+    assert 'No phase model built to profile' in caplog.text
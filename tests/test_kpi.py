@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Key figures of a results store against the flows of the energy system.
+"""
+import numpy as np
+import pytest
+
+from reegis_hp.tools import kpi, results_query, results_store
+
+WINDOW = ('2010-01-01 06:00', '2010-01-01 17:00')
+
+
+@pytest.fixture
+def results(esystem):
+    return results_query.FlowResults(
+        results_store.ResultsStore.from_energy_system(esystem))
+
+
+def window(esystem, values):
+    steps = esystem.time_idx.slice_indexer(*WINDOW)
+    return np.asarray(values, dtype=float)[steps]
+
+
+def test_multi_output_capacity(results, esystem):
+    be, bb, heat, lignite, chp = esystem.entities[:5]
+    table = kpi.summary(results)
+    row = table.loc[('BE', 'transformer', 'natural_gas')]
+    energy = (np.sum(esystem.results[chp][be]) +
+              np.sum(esystem.results[chp][heat]))
+    assert row['capacity'] == 500.0
+    assert row['energy'] == pytest.approx(energy)
+    assert row['full_load_hours'] == pytest.approx(energy / 500.0)
+    assert table.loc[('BB', 'transformer', 'lignite'),
+                     'capacity'] == 900.0
+
+
+@pytest.mark.parametrize('dates', [(None, None), WINDOW])
+def test_potential_of_the_window(results, esystem, dates):
+    bb, wind = esystem.entities[1], esystem.entities[5]
+    table = kpi.summary(results, date_from=dates[0], date_to=dates[1])
+    row = table.loc[('BB', 'FixedSrc', 'wind_pwr')]
+    feedin, val = esystem.results[wind][bb], wind.val
+    if dates[0] is not None:
+        feedin, val = window(esystem, feedin), window(esystem, val)
+    assert row['energy'] == pytest.approx(np.sum(feedin))
+    assert row['potential'] == pytest.approx(np.sum(val) * 50.0)
+    assert row['curtailment'] == pytest.approx(
+        max(np.sum(val) * 50.0 - np.sum(feedin), 0))
+
+
+def test_emissions_and_costs(results, esystem):
+    be, bb, heat, lignite, chp = esystem.entities[:5]
+    gas = esystem.entities[11]
+    params = kpi.parameters(co2_emissions={'natural_gas': 0.2},
+                            opex_var={'natural_gas': 3},
+                            price={'natural_gas': 20})
+    table = kpi.summary(results, params, date_from=WINDOW[0],
+                        date_to=WINDOW[1])
+    row = table.loc[('BE', 'transformer', 'natural_gas')]
+    fuel = np.sum(window(esystem, esystem.results[gas][chp]))
+    energy = (np.sum(window(esystem, esystem.results[chp][be])) +
+              np.sum(window(esystem, esystem.results[chp][heat])))
+    assert row['fuel'] == pytest.approx(fuel)
+    assert row['emissions'] == pytest.approx(0.2 * fuel)
+    assert row['costs'] == pytest.approx(3 * energy + 20 * fuel)
+
+
+def test_summaries(esystem, tmp_path):
+    paths = [results_store.write(esystem, str(tmp_path / name))
+             for name in ('base', 'high')]
+    table = kpi.summaries(paths)
+    assert list(table.index.unique('scenario')) == ['base', 'high']
+    single = kpi.summary(results_query.FlowResults(
+        results_store.ResultsStore(paths[0])))
+    np.testing.assert_allclose(table.loc['base'].to_numpy(dtype=float),
+                               single.to_numpy(dtype=float))
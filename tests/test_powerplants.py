@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Aggregation of power plant tables.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reegis_hp.tools import powerplants
+
+ETA = {'lignite': 0.35, 'natural_gas': 0.45}
+
+
+@pytest.fixture
+def pps():
+    return pd.DataFrame({
+        'region': ['BE', 'BE', 'BE', 'BB', 'BB', 'BB'],
+        'type': ['natural_gas', 'natural_gas', 'lignite', 'lignite',
+                 'lignite', 'natural_gas'],
+        'subtype': [None] * 6,
+        'cap': [100.0, 300.0, 500.0, 800.0, 200.0, 0.0],
+        'eta': [0.5, np.nan, 0.3, 0.4, 0.34, np.nan]})
+
+
+def test_aggregate(pps):
+    agg = powerplants.aggregate_power_plants(pps, ETA).set_index(
+        ['region', 'type'])
+    assert list(agg.index) == [('BB', 'lignite'), ('BB', 'natural_gas'),
+                               ('BE', 'lignite'), ('BE', 'natural_gas')]
+    assert agg.loc[('BE', 'natural_gas'), 'cap'] == 400.0
+    # Capacity weighted, the missing efficiency is the default.
+    assert agg.loc[('BE', 'natural_gas'), 'eta'] == pytest.approx(
+        (100 * 0.5 + 300 * 0.45) / 400)
+    assert agg.loc[('BB', 'lignite'), 'n_plants'] == 2
+    # Without capacity the plain mean.
+    assert agg.loc[('BB', 'natural_gas'), 'eta'] == 0.45
+    report = powerplants.aggregation_report(pps, agg, timesteps=10)
+    assert report['variables_saved'] == 2 * 2 * 10
+    assert report['capacity_after'] == report['capacity_before']
+
+
+def test_eta_outside_of_the_bins(pps, caplog):
+    bins = [0.32, 0.42, 0.48]
+    with caplog.at_level(logging.WARNING):
+        agg = powerplants.aggregate_power_plants(pps, ETA, eta_bins=bins)
+    # 0.3 and 0.5 are outside of the bins and go to the edge classes
+    # instead of being dropped.
+    assert '2 power plants' in caplog.text
+    assert agg['cap'].sum() == pps['cap'].sum()
+    assert agg['n_plants'].sum() == len(pps)
+    classes = agg.set_index(['region', 'type'])['eta_class']
+    assert classes[('BE', 'lignite')] == 'eta32-42'
+    assert classes[('BE', 'natural_gas')] == 'eta42-48'
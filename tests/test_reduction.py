@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Reduction of the entity graph with stand-ins for the oemof classes.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from reegis_hp.tools import reduction
+
+HOURS = 6
+
+
+class Entity:
+    def __init__(self, uid, inputs=(), outputs=(), **attributes):
+        self.uid = uid
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.__dict__.update(attributes)
+
+
+class Bus(Entity):
+    pass
+
+
+class Sink(Entity):
+    pass
+
+
+class Transformer(Entity):
+    pass
+
+
+class Transport(Entity):
+    pass
+
+
+def connect(source, target):
+    source.outputs.append(target)
+    target.inputs.append(source)
+
+
+@pytest.fixture(autouse=True)
+def classes(monkeypatch):
+    monkeypatch.setattr(reduction, '_classes', lambda: (
+        Bus, SimpleNamespace(Simple=Sink),
+        SimpleNamespace(Simple=Transformer),
+        SimpleNamespace(Simple=Transport)))
+
+
+@pytest.fixture
+def esystem():
+    r"""gas -> two equal plants -> be -> line -> bb -> demand
+
+    A chp feeds be and a heat bus without demand, a plant feeds a bus
+    without any consumer.
+    """
+    gas = Bus('gas')
+    be = Bus('be', type='elec')
+    bb = Bus('bb', type='elec')
+    heat = Bus('heat', type='heat')
+    island = Bus('island', type='elec')
+    plants = [Transformer('plant{0}'.format(i), eta=[0.5], out_max=[c],
+                          in_max=[2 * c]) for i, c in enumerate((100., 300.))]
+    chp = Transformer('chp', eta=[0.4, 0.4], out_max=[50., 50.])
+    lonely = Transformer('lonely', eta=[0.5], out_max=[10.])
+    line = Transport('line', eta=[1], out_max=[float('+inf')])
+    demand = Sink('demand')
+    for plant in plants:
+        connect(gas, plant)
+        connect(plant, be)
+    connect(gas, chp)
+    connect(chp, be)
+    connect(chp, heat)
+    connect(gas, lonely)
+    connect(lonely, island)
+    connect(be, line)
+    connect(line, bb)
+    connect(bb, demand)
+    return SimpleNamespace(
+        entities=[gas, be, bb, heat, island] + plants +
+        [chp, lonely, line, demand], results=None, time_idx=range(HOURS))
+
+
+def by_uid(esystem):
+    return {e.uid: e for e in esystem.entities}
+
+
+def test_reduce(esystem):
+    e = by_uid(esystem)
+    red = reduction.reduce(esystem)
+    uids = [x.uid for x in esystem.entities]
+    # Dead ends are removed, the heat bus of the chp is kept.
+    assert 'lonely' not in uids and 'island' not in uids
+    assert 'heat' in uids
+    # The plants are merged into the first one.
+    assert 'plant1' not in uids
+    assert e['plant0'].out_max == [400.]
+    assert e['plant0'].in_max == [800.]
+    # The lossless line is folded, the demand takes from be.
+    assert 'line' not in uids and 'bb' not in uids
+    assert e['demand'].inputs == [e['be']]
+    assert red.report()['entities'] == (11, 6)
+
+
+def test_restore(esystem):
+    e = by_uid(esystem)
+    entities = list(esystem.entities)
+    links = {x: (list(x.inputs), list(x.outputs)) for x in entities}
+    red = reduction.reduce(esystem)
+    flow = np.arange(HOURS, dtype=float)
+    esystem.results = {
+        e['gas']: {e['plant0']: 2 * flow, e['chp']: flow},
+        e['plant0']: {e['be']: flow},
+        e['chp']: {e['be']: flow, e['heat']: flow},
+        e['be']: {e['demand']: 2 * flow}}
+    red.restore(esystem)
+    assert esystem.entities == entities
+    assert {x: (x.inputs, x.outputs) for x in entities} == links
+    assert e['plant0'].out_max == [100.]
+    results = esystem.results
+    # The flow of the merged plant is shared by capacity.
+    np.testing.assert_allclose(results[e['plant0']][e['be']], flow / 4)
+    np.testing.assert_allclose(results[e['plant1']][e['be']], flow * 3 / 4)
+    np.testing.assert_allclose(results[e['gas']][e['plant1']],
+                               2 * flow * 3 / 4)
+    # The folded chain carries the flow of its consumers.
+    for source, target in (('be', 'line'), ('line', 'bb'), ('bb', 'demand')):
+        np.testing.assert_allclose(results[e[source]][e[target]], 2 * flow)
+    assert e['demand'] not in results[e['be']]
+    # Removed entities get zero flows.
+    assert results[e['lonely']][e['island']] == [0.] * HOURS
+    assert results[e['gas']][e['lonely']] == [0.] * HOURS
+
+
+def test_no_fold_of_priced_bus(esystem):
+    e = by_uid(esystem)
+    e['bb'].price = 10
+    reduction.reduce(esystem)
+    assert e['bb'] in esystem.entities
+    assert e['demand'].inputs == [e['bb']]
+
+
+def test_no_merge_of_own_series(esystem):
+    e = by_uid(esystem)
+    e['plant1'].ub_out = [np.ones(HOURS)]
+    reduction.reduce(esystem)
+    assert e['plant1'] in esystem.entities
+    assert e['plant0'].out_max == [100.]
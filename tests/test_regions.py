@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Neighbours of regions and the link table.
+"""
+import pandas as pd
+import pytest
+import shapely
+
+from reegis_hp.tools import regions
+
+# 2 x 2 grid, A and D (B and C) only share a corner. E is separated from B
+# by a sliver of 0.01.
+GEOMS = {'A': shapely.box(0, 0, 1, 1), 'B': shapely.box(1, 0, 2, 1),
+         'C': shapely.box(0, 1, 1, 2), 'D': shapely.box(1, 1, 2, 2),
+         'E': shapely.box(2.01, 0, 3, 1)}
+
+
+def test_common_border():
+    assert regions.adjacency(GEOMS) == [('A', 'B'), ('A', 'C'), ('B', 'D'),
+                                        ('C', 'D')]
+
+
+def test_corners():
+    pairs = regions.adjacency(GEOMS, min_border=0)
+    assert ('A', 'D') in pairs and ('B', 'C') in pairs
+    assert len(pairs) == 6
+
+
+def test_tolerance():
+    pairs = regions.adjacency(GEOMS, tolerance=0.02)
+    assert ('B', 'E') in pairs
+    assert ('A', 'D') not in pairs
+    assert regions.adjacency(GEOMS, tolerance=0.02, min_border=2) == []
+
+
+def test_link_table():
+    table = pd.DataFrame([('C', 'A', 5.0, 0.8)],
+                         columns=['region1', 'region2', 'in_max', 'eta'])
+    links = regions.link_table(regions.adjacency(GEOMS), table,
+                               capacity=100, eta=0.9).set_index(
+        ['region1', 'region2'])
+    assert links.loc[('A', 'C')].tolist() == [5.0, 100.0, 0.8]
+    assert links.loc[('B', 'D')].tolist() == [100.0, 100.0, 0.9]
+
+
+@pytest.mark.parametrize('n', [1, 7, 30])
+def test_grid(n):
+    side = int(n ** 0.5 + 0.999)
+    geoms = {i: shapely.box(i % side, i // side, i % side + 1,
+                            i // side + 1) for i in range(n)}
+    expected = sorted((a, b) for a in geoms for b in geoms if a < b and
+                      geoms[a].intersection(geoms[b]).length > 0)
+    assert regions.adjacency(geoms) == expected
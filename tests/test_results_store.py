@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Results store and the flow index of results_query.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from reegis_hp.tools import results_query, results_store
+
+
+def expected(esystem, flows):
+    """Frame of (bus, obj, type) flows straight from the results."""
+    series = {}
+    for bus, obj, type in flows:
+        values = (esystem.results[obj][bus] if type == 'input' else
+                  esystem.results[bus][obj])
+        series[str(obj.uid)] = values
+    return pd.DataFrame(series, index=esystem.time_idx)
+
+
+@pytest.fixture(params=['file', 'memory'])
+def store(request, esystem, tmp_path):
+    if request.param == 'memory':
+        return results_store.ResultsStore.from_energy_system(esystem)
+    results_store.write(esystem, str(tmp_path / 'results'))
+    return results_store.ResultsStore(str(tmp_path / 'results'))
+
+
+def test_bus_frame(store, esystem):
+    be = esystem.entities[0]
+    df = store.bus_frame(str(be.uid), 'output', '2010-01-01 05:00',
+                         '2010-01-02 03:00')
+    pd.testing.assert_frame_equal(
+        df, expected(esystem, [(be, o, 'output') for o in be.outputs]).loc[
+            '2010-01-01 05:00':'2010-01-02 03:00'], check_freq=False)
+    assert store.region_buses('BB') == [str(esystem.entities[1].uid)]
+
+
+def test_parameters(store, esystem):
+    meta = {(m['bus_uid'], m['obj_uid']): m for m in store.flows
+            if m['type'] == 'input'}
+    be, bb, heat, lignite, chp, wind = esystem.entities[:6]
+    assert meta[str(bb.uid), str(wind.uid)]['out_max'] == 50.0
+    assert meta[str(bb.uid), str(lignite.uid)]['out_max'] == 900.0
+    # One capacity per output of the CHP plant.
+    assert meta[str(be.uid), str(chp.uid)]['out_max'] == 200.0
+    assert meta[str(heat.uid), str(chp.uid)]['out_max'] == 300.0
+    potential = store.bus_frame(str(bb.uid), 'potential')
+    assert list(potential.columns) == [str(wind.uid)]
+    np.testing.assert_allclose(potential.iloc[:, 0], wind.val * 50.0)
+
+
+def test_select_contiguous(store, esystem):
+    results = results_query.FlowResults(store)
+    bb = esystem.entities[1]
+    rows = results.rows(bus=str(bb.uid), direction='input')
+    assert isinstance(rows, slice)
+    df = results.select(bus=str(bb.uid), direction='input', columns='uid')
+    pd.testing.assert_frame_equal(
+        df, expected(esystem, [(bb, i, 'input') for i in bb.inputs])[
+            df.columns], check_freq=False, check_names=False)
+
+
+def test_select_rows(store, esystem):
+    results = results_query.FlowResults(store)
+    be, bb = esystem.entities[:2]
+    rows = results.rows(component='transport', direction='input')
+    assert not isinstance(rows, slice)
+    df = results.select(component='transport', direction='input',
+                        columns='uid', date_from='2010-01-01 10:00',
+                        date_to='2010-01-01 20:00')
+    transports = [(be, be.inputs[1], 'input'), (bb, bb.inputs[2], 'input')]
+    pd.testing.assert_frame_equal(
+        df, expected(esystem, transports).loc[
+            '2010-01-01 10:00':'2010-01-01 20:00'][df.columns],
+        check_freq=False, check_names=False)
+    assert set(df.columns) == {str(t[1].uid) for t in transports}
+    keys = results.select(component='transport', direction='input').columns
+    assert set(keys.get_level_values('region')) == {'BE', 'BB'}
+
+
+def test_select_nothing(store):
+    results = results_query.FlowResults(store)
+    assert results.select(region='HH').shape == (len(store.time_idx), 0)
+    with pytest.raises(KeyError):
+        results.rows(country='DE')
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling horizon runs on a small stand-in energy system (no oemof needed).
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from reegis_hp.tools import rolling_horizon
+
+
+class Entity:
+    def __init__(self, uid, **attrs):
+        self.uid = uid
+        self.inputs = []
+        self.outputs = []
+        self.__dict__.update(attrs)
+
+
+class EnergySystem:
+    """Solves by copying the source series into the results, the storage
+    stores the whole source feed-in."""
+
+    def __init__(self, n):
+        self.time_idx = pd.date_range('1/1/2010', periods=n,
+                                      freq=pd.offsets.Hour())
+        self.simulation = SimpleNamespace(timesteps=list(range(n)))
+        self.bus = Entity('bus')
+        # Labelled like the series of the regions (time index).
+        self.source = Entity('pv', val=pd.Series(
+            np.arange(n, dtype=float), index=self.time_idx))
+        self.storage = Entity('storage', cap_initial=0, cap_loss=0,
+                              eta_in=1, eta_out=1, optimization_options={})
+        self.storage.inputs = [self.bus]
+        self.storage.outputs = [self.bus]
+        self.entities = [self.bus, self.source, self.storage]
+        self.results = None
+        self.initial_levels = []
+
+    def optimize(self):
+        val = self.source.val
+        steps = self.simulation.timesteps
+        self.initial_levels.append(self.storage.cap_initial)
+        self.results = {
+            self.source: {self.bus: [val[t] for t in steps]},
+            self.bus: {self.storage: [val[t] for t in steps]},
+            self.storage: {self.bus: [0.0 for t in steps]}}
+        return self
+
+
+def run(monkeypatch, n, window, overlap):
+    es = EnergySystem(n)
+    monkeypatch.setattr(rolling_horizon, '_storages',
+                        lambda esystem: [esystem.storage])
+    rh = rolling_horizon.RollingHorizon(es, window=window, overlap=overlap)
+    return rh, rh.optimize()
+
+
+def test_windows_are_stitched(monkeypatch):
+    rh, es = run(monkeypatch, n=60, window=24, overlap=6)
+    assert len(rh.windows()) == 3
+    assert len(rh.window_objectives) == 3
+    assert es.results[es.source][es.bus] == list(np.arange(60.0))
+
+
+def test_storage_level_is_passed_on(monkeypatch):
+    rh, es = run(monkeypatch, n=60, window=24, overlap=6)
+    hours = np.arange(60.0)
+    assert es.initial_levels == [0, hours[:24].sum(), hours[:48].sum()]
+
+
+def test_series_are_restored(monkeypatch):
+    rh, es = run(monkeypatch, n=48, window=24, overlap=12)
+    assert isinstance(es.source.val, pd.Series)
+    assert es.source.val.index.equals(es.time_idx)
+    assert len(es.time_idx) == 48
+    assert es.simulation.timesteps == list(range(48))
+    assert es.storage.cap_initial == 0
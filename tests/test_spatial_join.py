@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Offline spatial join of footprints and ALKIS buildings.
+"""
+import pandas as pd
+import pytest
+import shapely
+
+from reegis_hp.buildings import spatial_join
+
+# ALKIS buildings and footprints around points, one outside of all
+# buildings. Every geometry has a fractional coordinate, the hex WKB of
+# integer coordinates has only digits and would be read as a number from
+# csv.
+ALKIS = pd.DataFrame({
+    'gid': [1, 2, 3],
+    'geom': shapely.to_wkb([shapely.box(0.25, 0.25, 10, 10),
+                            shapely.box(10, 0.25, 20, 10),
+                            shapely.box(0.25, 10, 10, 20)], hex=True)})
+CENTRES = [(2, 2), (8, 3), (12, 5), (5, 15), (30, 30), (4, 18), (15, 1)]
+FOOTPRINTS = pd.DataFrame({
+    'gid': range(100, 100 + len(CENTRES)),
+    'geom': shapely.to_wkb([shapely.box(x - 0.75, y - 0.75, x + 0.75, y + 0.75)
+                            for x, y in CENTRES], hex=True)})
+PAIRS = [(100, 1), (101, 1), (102, 2), (103, 3), (105, 3), (106, 2)]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_read_table_chunks(tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'footprints.{0}'.format(fmt))
+    getattr(FOOTPRINTS, 'to_{0}'.format(fmt))(filename, index=False)
+    chunks = list(spatial_join.read_table(filename, chunksize=3,
+                                          columns=['gid', 'geom']))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), FOOTPRINTS,
+        check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_join_files(tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    files = {}
+    for name, df in (('alkis', ALKIS), ('footprints', FOOTPRINTS)):
+        files[name] = str(tmp_path / '{0}.{1}'.format(name, fmt))
+        getattr(df, 'to_{0}'.format(fmt))(files[name], index=False)
+    filename = str(tmp_path / 'pairs.csv')
+    n = spatial_join.join_files(files['footprints'], files['alkis'],
+                                filename, chunksize=2)
+    assert n == len(PAIRS)
+    pairs = pd.read_csv(filename).sort_values('gid')
+    assert list(pairs.itertuples(index=False, name=None)) == PAIRS
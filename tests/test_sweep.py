@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Scenario deltas and parameter sweeps on a stand-in energy system.
+"""
+import functools
+from types import SimpleNamespace
+
+import pytest
+
+from reegis_hp.tools import entity_registry, sweep
+
+
+class Entity:
+    def __init__(self, uid, **attributes):
+        self.uid = uid
+        self.__dict__.update(attributes)
+
+
+class System:
+    """Objective: the variable costs of the fixed flows."""
+
+    def __init__(self):
+        self.entities = entity_registry.EntityIndex([
+            Entity('rgas', opex_var=10, flow=100),
+            Entity('rgas', opex_var=10, flow=50),
+            Entity('rcoal', opex_var=5, flow=200),
+            Entity('sto_simple', capex=1000, flow=0)])
+        self.results = None
+
+    def optimize(self):
+        self.results = SimpleNamespace(objective=sum(
+            getattr(e, 'opex_var', 0) * e.flow for e in self.entities))
+
+
+def double_flow(entity, esystem, factor=2):
+    return {'flow': entity.flow * factor}
+
+
+def state(esystem):
+    return [dict(vars(e)) for e in esystem.entities]
+
+
+@pytest.mark.parametrize('index', [True, False])
+def test_all_entities_of_a_uid(index):
+    esystem = System()
+    if not index:
+        esystem.entities = list(esystem.entities)
+    before = state(esystem)
+    undo = sweep.apply_delta(esystem, {
+        'rgas': {'opex_var': 12},
+        'rcoal': functools.partial(double_flow, factor=3)})
+    assert [e.opex_var for e in esystem.entities[:2]] == [12, 12]
+    assert esystem.entities[2].flow == 600
+    sweep.restore(undo)
+    assert state(esystem) == before
+
+
+def test_failed_scenario_is_undone():
+    esystem = System()
+    before = state(esystem)
+    result = sweep.run_scenario(esystem, 'broken', {
+        'rgas': {'opex_var': 0}, 'rlignite': {'opex_var': 1}})
+    assert result['status'].startswith('failed')
+    assert 'rlignite' in result['status']
+    assert state(esystem) == before
+
+
+def test_grid():
+    deltas = sweep.grid({('rgas', 'opex_var'): [10, 20],
+                         ('sto_simple', 'capex'): [500]})
+    assert deltas == {
+        'rgas.opex_var=10, sto_simple.capex=500': {
+            'rgas': {'opex_var': 10}, 'sto_simple': {'capex': 500}},
+        'rgas.opex_var=20, sto_simple.capex=500': {
+            'rgas': {'opex_var': 20}, 'sto_simple': {'capex': 500}}}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run(workers):
+    esystem = System()
+    deltas = dict(sweep.grid({('rgas', 'opex_var'): [10, 20]}),
+                  double={'rcoal': double_flow})
+    table = sweep.run(esystem, deltas, workers=workers)
+    assert table.loc['rgas.opex_var=10', 'objective'] == 2500
+    assert table.loc['rgas.opex_var=20', 'objective'] == 4000
+    assert table.loc['double', 'objective'] == 3500
+    assert (table['status'] == 'ok').all()
+    assert state(esystem) == state(System())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Clustering of hourly series into typical periods.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reegis_hp.tools import typical_periods as tsa
+
+HOURS = 24 * 30 + 5
+
+
+class Entity:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+@pytest.fixture
+def series():
+    rnd = np.random.RandomState(1)
+    hour = np.arange(HOURS)
+    # Two kinds of days (weekday and weekend) plus a little noise.
+    weekend = (hour // 24) % 7 >= 5
+    demand = (np.where(weekend, 50, 100) * (1 + np.sin(hour / 24 * 2 *
+                                                          np.pi)) +
+              rnd.uniform(0, 1, HOURS)) * 1e6
+    wind = rnd.uniform(0, 1, HOURS)
+    return pd.DataFrame({'demand': demand, 'wind': wind})
+
+
+def test_cluster(series):
+    tp = tsa.cluster(series, 4)
+    assert tp.n_periods <= 4
+    assert len(tp.order) == 31
+    assert tp.weights.sum() == 31
+    # Every representative stands for itself.
+    assert (tp.order[tp.representatives] == np.arange(tp.n_periods)).all()
+    assert tp.timestep_weights().sum() == 31 * 24
+
+
+def test_reduce_and_expand(series):
+    tp = tsa.cluster(series, 4)
+    reduced = tp.reduce(series)
+    assert reduced.shape == (tp.timesteps, 2)
+    first = tp.representatives[0]
+    np.testing.assert_array_equal(
+        reduced['demand'][:24], series['demand'][first * 24:first * 24 + 24])
+    full = tp.expand(reduced, index=series.index)
+    assert full.shape == series.shape
+    # The representatives are expanded to the periods they stand for.
+    for period in (tp.representatives[1], 17):
+        day = slice(period * 24, period * 24 + 24)
+        rep = tp.representatives[tp.order[period]] * 24
+        np.testing.assert_array_equal(full['wind'][day],
+                                      series['wind'][rep:rep + 24])
+    assert isinstance(tp.reduce(series['wind'].to_numpy()), np.ndarray)
+
+
+def test_too_many_periods(series):
+    with pytest.raises(ValueError):
+        tsa.cluster(series, 31)
+
+
+def test_energy_system(series):
+    source = Entity(uid='wind', val=list(series['wind']))
+    sink = Entity(uid='demand', val=series['demand'].to_numpy())
+    esystem = SimpleNamespace(
+        entities=[source, sink, Entity(uid='bus')],
+        time_idx=pd.date_range('2010-01-01', periods=HOURS,
+                               freq=pd.offsets.Hour()),
+        simulation=SimpleNamespace(timesteps=list(range(HOURS))))
+    tp = tsa.reduce_energy_system(esystem, 4)
+    assert len(source.val) == len(sink.val) == tp.timesteps
+    assert len(esystem.time_idx) == len(esystem.simulation.timesteps) == \
+        tp.timesteps
+
+    flow = np.arange(tp.timesteps, dtype=float)
+    esystem.results = {source: {sink: list(flow)}}
+    tsa.expand_energy_system(esystem, tp)
+    assert len(esystem.time_idx) == HOURS
+    assert len(source.val) == HOURS and not hasattr(source, '_full_series')
+    period, cluster = 20, tp.order[20]
+    np.testing.assert_array_equal(
+        esystem.results[source][sink][period * 24:period * 24 + 24],
+        flow[cluster * 24:cluster * 24 + 24])
+    frame = tsa.results_to_frame(esystem)
+    assert list(frame.columns) == ['wind -> demand']
+    error = tsa.results_error(frame, frame)
+    assert (error['rel_error'].fillna(0) == 0).all()
+    assert (error['rmse'] == 0).all()